@@ -0,0 +1,52 @@
+"""
+Compares serial and parallel decoding of a (synthetic) large result payload.
+
+    python -m example.decode_benchmark --rows 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+
+from src.duneapi.decode import DecodeOptions, decode_records
+
+
+def synthetic_payload(rows: int) -> bytes:
+    """FindResultDataByJob response with rows records"""
+    records = [
+        {
+            "data": {
+                "number": i,
+                "block_hash": f"0x{i:064x}",
+                "tx_fees": i / 7,
+                "time": "2022-03-19T07:11:37+00:00",
+            }
+        }
+        for i in range(rows)
+    ]
+    data = {
+        "query_results": [{"id": "result", "job_id": "job", "runtime": 0}],
+        "get_result_by_job_id": records,
+        "query_errors": [],
+    }
+    return json.dumps({"data": data}).encode("utf-8")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser("Result Decoding Benchmark")
+    parser.add_argument("--rows", type=int, default=500_000)
+    args = parser.parse_args()
+
+    content = synthetic_payload(args.rows)
+    print(f"Payload of {len(content) / 2**20:.1f} MiB ({args.rows} rows)")
+
+    start = time.perf_counter()
+    json.loads(content)
+    print(f"serial: {time.perf_counter() - start:.2f}s")
+
+    for workers in range(1, (os.cpu_count() or 1) + 1):
+        start = time.perf_counter()
+        decode_records(content, DecodeOptions(workers=workers))
+        print(f"{workers} worker(s): {time.perf_counter() - start:.2f}s")
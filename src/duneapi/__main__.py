@@ -0,0 +1,51 @@
+"""
+Command line interface.
+
+Usage: python -m duneapi run manifest.json
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from typing import Optional
+
+from .api import DuneAPI
+from .pool import QueryIdPool
+from .runner import Manifest, run_manifest, summary
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Runs the command given by argv, returning the exit status"""
+    parser = argparse.ArgumentParser(prog="duneapi")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser(
+        "run", help="Execute a manifest of queries and write results to files"
+    )
+    run_parser.add_argument("manifest", type=str, help="JSON or YAML manifest file")
+    run_parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=None,
+        help="Overrides max_concurrency of the manifest",
+    )
+    args = parser.parse_args(argv)
+
+    manifest = Manifest.from_file(args.manifest)
+    if args.max_concurrency is not None:
+        manifest.max_concurrency = args.max_concurrency
+    start = time.monotonic()
+    results = []
+    for result in run_manifest(
+        DuneAPI.new_from_environment(thread_safe=True),
+        manifest,
+        QueryIdPool.from_environment(),
+    ):
+        print(result)
+        results.append(result)
+    print(f"{summary(results)} (total {time.monotonic() - start:.1f}s)")
+    return 1 if any(r.error is not None for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
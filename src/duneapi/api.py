@@ -5,28 +5,67 @@ at commit bdccd5ba543a8f3679e2c81e18cee846af47bc52
 """
 from __future__ import annotations
 
+import json
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
 
 from dotenv import load_dotenv
-from requests import Session, Response
+from requests import RequestException, Session, Response
 
+from .constants import EXECUTE_QUERY_FIELD, UPSERT_QUERY_FIELD
+from .credentials import CachedCredentials, CredentialCache
+from .decode import DecodeOptions, decode_results
+from .journal import JobJournal
+from .lazy import LazyResults
 from .logger import set_log
+from .pool import QueryIdPool
 from .response import (
+    parse_response_data,
+    validate_and_parse_batch_response,
     validate_and_parse_dict_response,
     validate_and_parse_list_response,
 )
-from .types import DuneRecord, QueryResults, DuneQuery, Post
+from .retry import ErrorKind, RetriesExceededError, RetryPolicy, failed_response
+from .singleflight import SingleFlight
+from .throttle import CircuitBreaker, RateLimiter
+from .util import parse_iso_datetime, token_expiry
+from .types import (
+    DuneRecord,
+    MetaData,
+    QueryResults,
+    DuneQuery,
+    Network,
+    Post,
+    QueryParameter,
+)
 
 log = set_log(__name__)
 
+T = TypeVar("T")
+
 BASE_URL = "https://dune.xyz"
 GRAPH_URL = "https://core-hsr.dune.xyz/v1/graphql"
+# Seconds an auth token is reused for (when it does not state its expiry)
+TOKEN_TTL = 60.0
+# Seconds before their expiry at which auth tokens are refreshed
+TOKEN_EXPIRY_MARGIN = 30.0
 
 
+# pylint: disable=too-many-instance-attributes,too-many-public-methods
 class DuneAPI:
     """
     Acts as API client for dune.xyz. All requests to be made through this class.
+
+    With `thread_safe=True` a single instance may be shared by many threads
+    (e.g. the workers of a ThreadPoolExecutor). Authentication state is then
+    guarded by a lock, every thread posts through its own Session and the
+    authorization header is attached per request instead of being written
+    to shared session headers.
     """
 
     def __init__(
@@ -35,21 +74,57 @@ class DuneAPI:
         password: str,
         max_retries: int = 2,
         ping_frequency: int = 5,
-    ):
+        *,
+        credential_cache: Optional[CredentialCache] = None,
+        thread_safe: bool = False,
+        journal: Optional[JobJournal] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        single_flight: Optional[SingleFlight] = None,
+        decode_options: Optional[DecodeOptions] = None,
+    ):  # pylint: disable=too-many-arguments
         """
         Initialize the object
         :param username: username for dune.xyz
         :param password: password for dune.xyz
+        :param credential_cache: optional store used to reuse sessions across processes
+        :param thread_safe: allow instance to be shared across threads
+        :param journal: record of submitted jobs, used to resume (rather than
+            re-execute) queries whose results have not yet been fetched.
+            Defaults to an in-memory journal, so that retries resume the same job.
+        :param retry_policy: error classification and backoff between attempts
+        :param rate_limiter: throttles graphQL requests per operation type
+            (may be shared with other clients, threads or processes)
+        :param circuit_breaker: fails fast after repeated throttling or server errors
+        :param single_flight: coalesces concurrent fetches of identical queries
+        :param decode_options: opt-in parallel decoding of large query results
         """
-        self.csrf = None
-        self.auth_refresh = None
-        self.token = None
+        self.csrf: Optional[str] = None
+        self.auth_refresh: Optional[str] = None
+        self.token: Optional[str] = None
         self.username = username
         self.password = password
         self.session = Session()
         self.max_retries = max_retries
         self.ping_frequency = ping_frequency
-        headers = {
+        self.credential_cache = credential_cache
+        self.thread_safe = thread_safe
+        self.journal = journal if journal is not None else JobJournal()
+        self.decode_options = decode_options
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.single_flight = single_flight
+        # Guards csrf, auth_refresh, token and the cookies of self.session
+        self._auth_lock = threading.RLock()
+        # Token attached to graphQL requests and the time it is refreshed at
+        self._token_cache: tuple[Optional[str], float] = (None, 0.0)
+        self._local = threading.local()
+        # Background re-executions of fetch_latest, keyed by query and parameters
+        self._revalidations: dict[str, threading.Thread] = {}
+        self._revalidation_lock = threading.Lock()
+        self.headers = {
             "origin": BASE_URL,
             "sec-ch-ua": "empty",
             "sec-ch-ua-mobile": "?0",
@@ -58,22 +133,37 @@ class DuneAPI:
             "sec-fetch-site": "same-site",
             "dnt": "1",
         }
-        self.session.headers.update(headers)
+        self.session.headers.update(self.headers)
 
     @staticmethod
-    def new_from_environment() -> DuneAPI:
+    def new_from_environment(thread_safe: bool = False) -> DuneAPI:
         """Initialize & authenticate a Dune client from the current environment"""
         load_dotenv()
         dune = DuneAPI(
             os.environ["DUNE_USER"],
             os.environ["DUNE_PASSWORD"],
+            credential_cache=CredentialCache.from_environment(),
+            thread_safe=thread_safe,
+            journal=JobJournal.from_environment(),
         )
         # loging and fetch_auth token don't really need to be here
         dune.login()
         return dune
 
     def login(self) -> None:
-        """Attempt to log in to dune.xyz & get the token"""
+        """
+        Attempt to log in to dune.xyz & get the token.
+        When a credential cache is configured, the cached session is tried first
+        and the full login is only performed if it is rejected.
+        """
+        with self._auth_lock:
+            self._token_cache = (None, 0.0)
+            if self.login_from_cache():
+                return
+            self._login()
+
+    def _login(self) -> None:
+        """Performs the full login handshake (caller must hold the auth lock)"""
         login_url = BASE_URL + "/auth/login"
         csrf_url = BASE_URL + "/api/auth/csrf"
         auth_url = BASE_URL + "/api/auth"
@@ -96,22 +186,106 @@ class DuneAPI:
 
         self.session.post(auth_url, data=form_data)
         self.auth_refresh = self.session.cookies.get("auth-refresh")
+        self._cache_credentials()
+
+    def login_from_cache(self) -> bool:
+        """
+        Restores the session from the credential cache (if configured).
+        The cached credentials are validated by fetching a fresh auth token.
+        :return: True if the cached session was accepted
+        """
+        if self.credential_cache is None:
+            return False
+        with self._auth_lock:
+            cached = self.credential_cache.load(self.username)
+            if cached is None:
+                return False
+            self.session.cookies.set("auth-refresh", cached.auth_refresh)
+            self.auth_refresh, self.token = cached.auth_refresh, cached.token
+            try:
+                self.fetch_auth_token()
+            except SystemExit as err:
+                log.info(f"Cached session rejected with {err}, logging in again")
+                self.token = None
+            if self.token is None:
+                self.auth_refresh = None
+                self.session.cookies.clear()
+                self.credential_cache.clear(self.username)
+                return False
+        log.debug(f"Restored cached session for {self.username}")
+        return True
+
+    def _cache_credentials(self) -> None:
+        """Persists the current session credentials (if caching is configured)"""
+        if self.credential_cache is None or self.auth_refresh is None:
+            return
+        self.credential_cache.store(
+            self.username,
+            CachedCredentials(auth_refresh=self.auth_refresh, token=self.token),
+        )
 
     def fetch_auth_token(self) -> None:
         """Fetch authorization token for the user"""
         session_url = BASE_URL + "/api/auth/session"
 
-        response = self.session.post(session_url)
-        if response.status_code == 200:
-            self.token = response.json().get("token")
-        else:
-            # TODO - should probably raise a different exception here.
-            raise SystemExit(response)
+        with self._auth_lock:
+            response = self.session.post(session_url)
+            if response.status_code == 200:
+                token = response.json().get("token")
+                if token != self.token:
+                    self.token = token
+                    self._cache_credentials()
+            else:
+                # TODO - should probably raise a different exception here.
+                raise SystemExit(response)
 
-    def refresh_auth_token(self) -> None:
-        """Set authorization token for the user"""
-        self.fetch_auth_token()
-        self.session.headers.update({"authorization": f"Bearer {self.token}"})
+    def refresh_auth_token(self) -> Optional[str]:
+        """
+        Set authorization token for the user
+        :return: the refreshed token
+        """
+        with self._auth_lock:
+            self.fetch_auth_token()
+            token = self.token
+            if not self.thread_safe:
+                self.session.headers.update({"authorization": f"Bearer {token}"})
+        return token
+
+    def auth_token(self) -> Optional[str]:
+        """
+        Token to authorize graphQL requests with. The token is reused until
+        (shortly before) it expires, or until the next login (e.g. after an
+        authentication error). Only refreshing it takes the auth lock.
+        """
+        token, refresh_at = self._token_cache
+        if token is not None and time.time() < refresh_at:
+            return token
+        with self._auth_lock:
+            token, refresh_at = self._token_cache
+            if token is None or time.time() >= refresh_at:
+                token = self.refresh_auth_token()
+                expiry = token_expiry(token) if token else None
+                refresh_at = (
+                    expiry - TOKEN_EXPIRY_MARGIN
+                    if expiry is not None
+                    else time.time() + TOKEN_TTL
+                )
+                self._token_cache = (token, refresh_at)
+            return token
+
+    def graph_session(self) -> Session:
+        """
+        Session used to post graphQL requests.
+        In thread safe mode, each thread is given its own session.
+        """
+        if not self.thread_safe:
+            return self.session
+        session: Optional[Session] = getattr(self._local, "session", None)
+        if session is None:
+            session = Session()
+            session.headers.update(self.headers)
+            self._local.session = session
+        return session
 
     def initiate_query(self, query: DuneQuery) -> bool:
         """
@@ -130,35 +304,105 @@ class DuneAPI:
         validate_and_parse_dict_response(response, post_data.key_map)
         return str(response.json()["data"]["execute_query"]["job_id"])
 
-    def get_results(self, job_id: str) -> list[DuneRecord]:
-        """Fetch the result for a query by id"""
+    def initiate_queries(self, queries: list[DuneQuery], batch_size: int = 20) -> None:
+        """
+        Initiates (upserts) many queries, combining up to batch_size
+        of them into each request.
+        """
+        for i in range(0, len(queries), batch_size):
+            post_data = DuneQuery.upsert_queries_post(queries[i : i + batch_size])
+            response = self.post_dune_request(post_data)
+            validate_and_parse_batch_response(
+                response, post_data.key_map, UPSERT_QUERY_FIELD
+            )
+
+    def execute_queries(
+        self, queries: list[DuneQuery], batch_size: int = 20
+    ) -> list[str]:
+        """
+        Executes many queries, combining up to batch_size of them into each request.
+        :return: job ids (in order of queries)
+        """
+        job_ids = []
+        for i in range(0, len(queries), batch_size):
+            post_data = DuneQuery.execute_queries_post(queries[i : i + batch_size])
+            response = self.post_dune_request(post_data)
+            job_ids += [
+                str(result[EXECUTE_QUERY_FIELD]["job_id"])
+                for result in validate_and_parse_batch_response(
+                    response, post_data.key_map, EXECUTE_QUERY_FIELD
+                )
+            ]
+        return job_ids
+
+    def await_job(self, job_id: str) -> None:
+        """Waits until job_id has left the execution queue"""
         queue_position_post = DuneQuery.get_queue_position(job_id)
 
         queue_position = self.post_dune_request(queue_position_post)
-        while queue_position.json()["data"]["jobs_by_pk"] is not None:
+        while parse_response_data(queue_position)["jobs_by_pk"] is not None:
             log.debug("Waiting for queue to end...")
             time.sleep(self.ping_frequency)
             queue_position = self.post_dune_request(queue_position_post)
 
+    def get_results(self, job_id: str) -> list[DuneRecord]:
+        """Fetch the result for a query by id"""
+        self.await_job(job_id)
         find_result_post = DuneQuery.find_result_by_job(job_id)
         response = self.post_dune_request(find_result_post)
-        parsed_response = validate_and_parse_list_response(
-            response, find_result_post.key_map
-        )
-        return QueryResults(parsed_response).data
+        return decode_results(
+            response, find_result_post.key_map, self.decode_options
+        ).data
+
+    def get_lazy_results(self, job_id: str) -> LazyResults:
+        """
+        Fetch the result for a query by id, without decoding its records
+        until they are accessed (see LazyResults)
+        """
+        self.await_job(job_id)
+        find_result_post = DuneQuery.find_result_by_job(job_id)
+        response = self.post_dune_request(find_result_post)
+        return LazyResults.from_response(response, find_result_post.key_map)
 
     def post_dune_request(self, post: Post) -> Response:
         """
-        Refresh Authorization Token and posts query.
+        Posts query (authorized by the current, or a refreshed, token).
         Parses response for errors by key and raises runtime error if they exist.
         Only successful responses are returned
         :param post: JSON content and validation parameters for request
         :return: response in json format
         """
-        self.refresh_auth_token()
-        log.debug(f"Posting Dune Request {post.data}")
-        response = self.session.post(GRAPH_URL, json=post.data)
-        log.debug(f"Received Response {response.json()}")
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.before_request()
+        try:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(str(post.data.get("operationName")))
+            token = self.auth_token()
+            log.debug(f"Posting Dune Request {post.data}")
+            response = self.graph_session().post(
+                GRAPH_URL,
+                json=post.data,
+                headers={"authorization": f"Bearer {token}"},
+            )
+        except BaseException as err:
+            # Any failure must resolve a half-open trial, or the circuit never
+            # closes, but only transport and server errors count as failures.
+            if self.circuit_breaker is not None:
+                failed = failed_response(err)
+                if isinstance(err, RequestException) or (
+                    failed is not None and CircuitBreaker.is_failure(failed.status_code)
+                ):
+                    self.circuit_breaker.record_failure()
+                else:
+                    self.circuit_breaker.end_trial()
+            raise
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record(response.status_code)
+        # Logging the decoded body would decode (large) results twice.
+        log.debug(
+            f"Received Response {response.status_code} "
+            f"({len(response.content or b'')} bytes)"
+        )
 
         return response
 
@@ -167,25 +411,302 @@ class DuneAPI:
         Executes query by ID and awaits completion.
         :return: parsed list of dict records returned from query
         """
-        job_id = self.execute_query(query)
-        data_set = self.get_results(job_id)
+        return self._await_journaled(query, self._resume_or_execute(query))
+
+    def _await_journaled(self, query: DuneQuery, job_id: str) -> list[DuneRecord]:
+        """Awaits the results of (journaled) job_id executing query"""
+        try:
+            data_set = self.get_results(job_id)
+        except RuntimeError:
+            # Query errors are final for this job, any other failure leaves
+            # the job pending so that the next attempt resumes it.
+            self.journal.failed(query, job_id)
+            raise
+        self.journal.complete(query, job_id)
         log.info(f"got {len(data_set)} records from last query")
         return data_set
 
-    def fetch(self, query: DuneQuery) -> list[DuneRecord]:
+    def _resume_or_execute(self, query: DuneQuery) -> str:
+        """
+        Returns the job_id of a journaled (pending) execution of query,
+        or executes query and journals the new job.
+        """
+        pending = self.journal.pending(query)
+        if pending is not None:
+            log.info(f"Resuming job {pending.job_id} for {query.name}")
+            return pending.job_id
+        job_id = self.execute_query(query)
+        log.debug(f"Submitted job {job_id} for {query.name}")
+        self.journal.submitted(query, job_id)
+        return job_id
+
+    def fetch(
+        self, query: DuneQuery, query_pool: Optional[QueryIdPool] = None
+    ) -> list[DuneRecord]:
         """
         Pushes new query, executes and awaiting query completion
+        :param query_pool: when provided, the query is run on a query id leased
+            from the pool (instead of query.query_id) for the duration of the fetch
         :return: list query records as dictionaries
+        With single flight enabled, concurrent fetches of queries with identical
+        raw_sql, network and parameters share one execution (and result list).
+        """
+        if self.single_flight is not None:
+            return self.single_flight.do(
+                query.fingerprint(), lambda: self._fetch(query, query_pool)
+            )
+        return self._fetch(query, query_pool)
+
+    def preview(
+        self, query: DuneQuery, rows: int = 10, query_pool: Optional[QueryIdPool] = None
+    ) -> list[DuneRecord]:
+        """
+        Fetches only the first rows of query (see DuneQuery.limit),
+        for a quick look at large results.
         """
+        return self.fetch(query.limit(rows), query_pool)
+
+    def _fetch(
+        self, query: DuneQuery, query_pool: Optional[QueryIdPool]
+    ) -> list[DuneRecord]:
+        """Uncoalesced fetch (see fetch)"""
+        pending = self.journal.pending(query)
+        if pending is not None:
+            # Query content is already stored and executing, so no upsert is
+            # needed. Only the pending job is awaited: executing query again
+            # would run it on a query id which is not leased.
+            log.info(f"Resuming {query.name} on {query.network}...")
+            return self._with_retries(
+                lambda: self._await_journaled(query, pending.job_id)
+            )
+
+        if query_pool is not None:
+            with query_pool.lease() as query_id:
+                return self._fetch(replace(query, query_id=query_id), None)
+
         log.info(f"Fetching {query.name} on {query.network}...")
-        self.initiate_query(query)
-        for _ in range(0, self.max_retries):
+        self._with_retries(lambda: self.initiate_query(query))
+        return self._execute_with_retries(query)
+
+    def _execute_with_retries(self, query: DuneQuery) -> list[DuneRecord]:
+        """
+        Executes (already initiated) query and awaits results.
+        Retried attempts resume the journaled job rather than re-executing.
+        """
+        return self._with_retries(lambda: self.execute_and_await_results(query))
+
+    def _with_retries(self, action: Callable[[], T]) -> T:
+        """
+        Attempts action up to max_retries times, recovering from failures
+        according to their kind (see RetryPolicy)
+        """
+        for attempt in range(0, self.max_retries):
             try:
-                return self.execute_and_await_results(query)
-            except RuntimeError as err:
-                log.warning(
-                    f"failed with {err}. Re-establishing connection and trying again"
-                )
-                self.login()
-                self.refresh_auth_token()
+                return action()
+            except (Exception, SystemExit) as err:  # pylint: disable=broad-except
+                kind = self.retry_policy.classify(err)
+                if not self.retry_policy.should_retry(kind):
+                    raise
+                if attempt + 1 == self.max_retries:
+                    raise RetriesExceededError(
+                        f"Maximum retries ({self.max_retries}) exceeded", kind
+                    ) from err
+                log.warning(f"failed with {kind.value} error {err}, trying again")
+                if kind == ErrorKind.AUTH:
+                    log.info("Re-establishing connection")
+                    self.login()
+                elif kind == ErrorKind.TRANSIENT:
+                    time.sleep(self.retry_policy.delay(attempt))
         raise Exception(f"Maximum retries ({self.max_retries}) exceeded")
+
+    def sweep(
+        self,
+        query: DuneQuery,
+        parameter_sets: Iterable[list[QueryParameter]],
+        max_in_flight: int = 4,
+    ) -> Iterator[tuple[list[QueryParameter], list[DuneRecord]]]:
+        """
+        Upserts query once and executes it concurrently for every parameter set.
+        Best used with a thread safe client.
+        :param parameter_sets: parameter values for each execution of query
+        :param max_in_flight: maximum number of concurrent executions
+        :return: (parameters, results) pairs in order of completion
+        """
+        log.info(f"Sweeping {query.name} on {query.network}...")
+        self.initiate_query(query)
+
+        def execute(parameters: list[QueryParameter]) -> list[DuneRecord]:
+            return self.execute_and_await_results(replace(query, parameters=parameters))
+
+        executor = ThreadPoolExecutor(max_workers=max_in_flight)
+        try:
+            jobs = {
+                executor.submit(execute, parameters): parameters
+                for parameters in parameter_sets
+            }
+            for job in as_completed(jobs):
+                yield jobs[job], job.result()
+        finally:
+            # Abandoned (or failed) sweeps don't start any remaining executions.
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def iter_partitioned(
+        self,
+        query: DuneQuery,
+        start_key: str,
+        end_key: str,
+        partitions: int,
+        max_in_flight: Optional[int] = None,
+    ) -> Iterator[DuneRecord]:
+        """
+        Splits the range between the `start_key` and `end_key` parameters of query
+        (both date or both number type) into contiguous partitions, executes them
+        concurrently and yields the records of each partition in range order.
+        Integer ranges are split into disjoint inclusive partitions. Date
+        partitions share their boundaries with neighbours, so the query should
+        select the half-open range (i.e. >= start and < end) to avoid duplicates.
+        :param partitions: (maximum) number of partitions to split range into
+        :param max_in_flight: maximum concurrent executions (default all partitions)
+        """
+        partition_queries = query.partition(start_key, end_key, partitions)
+        log.info(
+            f"Fetching {query.name} on {query.network} "
+            f"in {len(partition_queries)} partitions..."
+        )
+        self.initiate_query(query)
+        executor = ThreadPoolExecutor(
+            max_workers=max_in_flight or len(partition_queries)
+        )
+        try:
+            jobs = [
+                executor.submit(self._execute_with_retries, partition)
+                for partition in partition_queries
+            ]
+            for job in jobs:
+                yield from job.result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def fetch_partitioned(
+        self,
+        query: DuneQuery,
+        start_key: str,
+        end_key: str,
+        partitions: int,
+        max_in_flight: Optional[int] = None,
+    ) -> list[DuneRecord]:
+        """
+        Partitioned equivalent of fetch (see iter_partitioned)
+        :return: list query records as dictionaries
+        """
+        return list(
+            self.iter_partitioned(query, start_key, end_key, partitions, max_in_flight)
+        )
+
+    def latest_results(
+        self, query_id: int, parameters: Optional[list[QueryParameter]] = None
+    ) -> Optional[QueryResults]:
+        """
+        Reads the results of the most recent execution of query_id with
+        parameters (without executing), or None if there is no such execution
+        or it failed.
+        """
+        post = DuneQuery.get_result_post(query_id, parameters or [])
+        response = self.post_dune_request(post)
+        latest = validate_and_parse_dict_response(response, post.key_map)
+        job_id = latest["get_result_v2"]["job_id"]
+        if job_id is None:
+            return None
+        if latest["get_result_v2"]["error_id"] is not None:
+            log.info(f"Latest execution {job_id} of query {query_id} failed")
+            return None
+        find_result_post = DuneQuery.find_result_by_job(job_id)
+        response = self.post_dune_request(find_result_post)
+        try:
+            return QueryResults(
+                validate_and_parse_list_response(response, find_result_post.key_map)
+            )
+        except RuntimeError as err:
+            # Query errors of the latest execution (e.g. reported without error_id)
+            log.info(f"Latest execution {job_id} of query {query_id} failed: {err}")
+            return None
+
+    def fetch_latest(
+        self,
+        query_id: int,
+        max_age: timedelta,
+        parameters: Optional[list[QueryParameter]] = None,
+        revalidate: bool = True,
+    ) -> list[DuneRecord]:
+        """
+        Returns the most recent results of the (stored) query at query_id,
+        executing it only when there are no results younger than max_age.
+        Best used with a thread safe client.
+        :param revalidate: return stale results immediately and re-execute the
+            query in the background, instead of waiting for fresh results
+        :return: list query records as dictionaries
+        """
+        parameters = parameters or []
+        latest = self._with_retries(lambda: self.latest_results(query_id, parameters))
+        if latest is not None and latest.meta is not None:
+            age = datetime.now(timezone.utc) - self._generated_at(latest.meta)
+            if age <= max_age:
+                log.info(f"Using results of query {query_id} from {age} ago")
+                return latest.data
+            if revalidate:
+                log.info(f"Using stale results of query {query_id} from {age} ago")
+                self._revalidate(query_id, parameters)
+                return latest.data
+        log.info(f"Executing query {query_id} for fresh results")
+        return self._with_retries(lambda: self._execute_stored(query_id, parameters))
+
+    @staticmethod
+    def _generated_at(meta: MetaData) -> datetime:
+        generated_at = meta.generated_at
+        if not isinstance(generated_at, datetime):
+            generated_at = parse_iso_datetime(str(generated_at))
+        if generated_at.tzinfo is None:
+            # Dune timestamps are UTC
+            generated_at = generated_at.replace(tzinfo=timezone.utc)
+        return generated_at
+
+    def _execute_stored(
+        self, query_id: int, parameters: list[QueryParameter]
+    ) -> list[DuneRecord]:
+        """Executes the SQL stored at query_id (as is) and awaits results"""
+        # Execution only refers to query id and parameters.
+        stored = DuneQuery(
+            name=f"query {query_id}",
+            description="",
+            raw_sql="",
+            network=Network.MAINNET,
+            parameters=parameters,
+            query_id=query_id,
+        )
+        return self.get_results(self.execute_query(stored))
+
+    def _revalidate(
+        self, query_id: int, parameters: list[QueryParameter]
+    ) -> threading.Thread:
+        """
+        Re-executes query_id in a background thread, unless a re-execution
+        with the same parameters is already in progress.
+        """
+        key = json.dumps([query_id, [p.to_dict() for p in parameters]])
+
+        def run() -> None:
+            try:
+                self._with_retries(lambda: self._execute_stored(query_id, parameters))
+            except Exception as err:  # pylint: disable=broad-except
+                log.warning(f"Background execution of query {query_id} failed: {err}")
+            finally:
+                with self._revalidation_lock:
+                    self._revalidations.pop(key, None)
+
+        with self._revalidation_lock:
+            thread = self._revalidations.get(key)
+            if thread is None:
+                thread = threading.Thread(target=run, daemon=True)
+                self._revalidations[key] = thread
+                thread.start()
+        return thread
@@ -174,3 +174,100 @@ FIND_QUERY_POST = """
       }
     }
 """
+
+# UpsertQuery (and ExecuteQuery) mutations are assembled from these parts,
+# so that many of them can be combined into a single (aliased) request.
+UPSERT_QUERY_FIELD = "insert_queries_one"
+UPSERT_QUERY_SELECTION = """{
+  ...Query
+  favorite_queries(where: { user_id: { _eq: $session_id } }, limit: 1) {
+    created_at
+  }
+}"""
+UPSERT_QUERY_FRAGMENTS = """
+fragment Query on queries {
+  ...BaseQuery
+  ...QueryVisualizations
+  ...QueryForked
+  ...QueryUsers
+  ...QueryFavorites
+}
+fragment BaseQuery on queries {
+  id
+  dataset_id
+  name
+  description
+  query
+  is_private
+  is_temp
+  is_archived
+  created_at
+  updated_at
+  schedule
+  tags
+  parameters
+}
+fragment QueryVisualizations on queries {
+  visualizations {
+    id
+    type
+    name
+    options
+    created_at
+  }
+}
+fragment QueryForked on queries {
+  forked_query {
+    id
+    name
+    user {
+      name
+    }
+  }
+}
+fragment QueryUsers on queries {
+  user {
+    ...User
+  }
+}
+fragment User on users {
+  id
+  name
+  profile_image_url
+}
+fragment QueryFavorites on queries {
+  query_favorite_count_all @include(if: $favs_all_time) {
+    favorite_count
+  }
+  query_favorite_count_last_24h @include(if: $favs_last_24h) {
+    favorite_count
+  }
+  query_favorite_count_last_7d @include(if: $favs_last_7d) {
+    favorite_count
+  }
+  query_favorite_count_last_30d @include(if: $favs_last_30d) {
+    favorite_count
+  }
+}
+"""
+UPSERT_QUERY_KEYS = {
+    "id",
+    "dataset_id",
+    "name",
+    "description",
+    "query",
+    "is_private",
+    "is_temp",
+    "is_archived",
+    "created_at",
+    "updated_at",
+    "schedule",
+    "tags",
+    "parameters",
+    "visualizations",
+    "forked_query",
+    "user",
+    "query_favorite_count_all",
+    "favorite_queries",
+}
+EXECUTE_QUERY_FIELD = "execute_query"
@@ -0,0 +1,84 @@
+"""
+Local, permission restricted cache of Dune session credentials.
+
+Allows new processes to reuse an existing `auth-refresh` cookie
+instead of performing the full login handshake every time.
+"""
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from .logger import set_log
+from .util import write_atomic
+
+log = set_log(__name__)
+
+# Cache file is only ever readable and writable by its owner.
+CACHE_FILE_MODE = 0o600
+
+
+@dataclass
+class CachedCredentials:
+    """Session credentials persisted for a single user"""
+
+    auth_refresh: str
+    token: Optional[str] = None
+
+
+class CredentialCache:
+    """
+    JSON file of session credentials keyed by username. For example
+    {
+        "username": {"auth_refresh": "...", "token": "..."}
+    }
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _read(self) -> dict[str, dict[str, Optional[str]]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as cache_file:
+                content: dict[str, dict[str, Optional[str]]] = json.load(cache_file)
+                return content
+        except FileNotFoundError:
+            return {}
+        except ValueError as err:
+            log.warning(f"Ignoring unreadable credential cache {self.path}: {err}")
+            return {}
+
+    def _write(self, content: dict[str, dict[str, Optional[str]]]) -> None:
+        write_atomic(self.path, json.dumps(content, indent=2), mode=CACHE_FILE_MODE)
+
+    def load(self, username: str) -> Optional[CachedCredentials]:
+        """Returns cached credentials for `username` (if any)"""
+        entry = self._read().get(username)
+        if not entry or not entry.get("auth_refresh"):
+            return None
+        return CachedCredentials(
+            auth_refresh=str(entry["auth_refresh"]), token=entry.get("token")
+        )
+
+    def store(self, username: str, credentials: CachedCredentials) -> None:
+        """Persists `credentials` for `username`, leaving other users untouched"""
+        content = self._read()
+        content[username] = {
+            "auth_refresh": credentials.auth_refresh,
+            "token": credentials.token,
+        }
+        self._write(content)
+
+    def clear(self, username: str) -> None:
+        """Removes any cached credentials for `username`"""
+        content = self._read()
+        if content.pop(username, None) is not None:
+            self._write(content)
+
+    @classmethod
+    def from_environment(cls) -> Optional[CredentialCache]:
+        """Constructs cache from DUNE_CREDENTIAL_CACHE (if set)"""
+        path = os.environ.get("DUNE_CREDENTIAL_CACHE")
+        return cls(path) if path else None
@@ -4,13 +4,16 @@ from __future__ import annotations
 import argparse
 import json
 import os
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable, Optional
 
 from .api import DuneAPI
 from .constants import FIND_DASHBOARD_POST, FIND_QUERY_POST
 from .logger import set_log
+from .query_cache import QueryMetadataCache, query_updates_post
+from .response import validate_and_parse_list_response
 from .types import DuneQuery, DashboardTile, Post, Network, QueryParameter
-from .util import duplicates
+from .util import content_hash, duplicates, sync_files, topological_waves
 
 BASE_URL = "https://dune.xyz"
 log = set_log(__name__)
@@ -30,11 +33,22 @@ class DuneDashboard:
     name: str
     url: str
     queries: list[DuneQuery]
+    tiles: list[DashboardTile]
     api: DuneAPI
 
     def __init__(
-        self, api: DuneAPI, name: str, slug: str, user: str, queries: list[DuneQuery]
-    ):
+        self,
+        api: DuneAPI,
+        name: str,
+        slug: str,
+        user: str,
+        queries: list[DuneQuery],
+        tiles: Optional[list[DashboardTile]] = None,
+    ):  # pylint: disable=too-many-arguments
+        """
+        :param tiles: source files of queries (in the same order), from which
+            dependencies between queries are derived (see refresh_waves)
+        """
         dupes = duplicates([(q.raw_sql, q.network) for q in queries])
         if dupes:
             log.warning(f"Duplicate Query Detected {dupes}")
@@ -48,6 +62,9 @@ class DuneDashboard:
         self.slug = slug
         self.url = "/".join([BASE_URL, user, slug])
         self.queries = list(queries)
+        self.tiles = list(tiles) if tiles is not None else []
+        if self.tiles and len(self.tiles) != len(self.queries):
+            raise ValueError("Dashboard tiles must correspond to its queries")
         self.api = api
 
     def __eq__(self, other: object) -> bool:
@@ -70,11 +87,17 @@ class DuneDashboard:
 
     @classmethod
     def from_dune(
-        cls, api: DuneAPI, dashboard_slug: str, save_config: bool = True
+        cls,
+        api: DuneAPI,
+        dashboard_slug: str,
+        save_config: bool = True,
+        cache: Optional[QueryMetadataCache] = None,
     ) -> DuneDashboard:
         """
         Initialized instance by fetching existing Dashboard from Dune.
         When save_config is True, Saves dashboard config files in ./out
+        :param cache: when provided, full query metadata is only fetched for
+            queries updated since they were cached
         """
         post_data = {
             "operationName": "FindDashboard",
@@ -90,21 +113,14 @@ class DuneDashboard:
         )
         meta = response.json()["data"]["dashboards"][0]
         widgets = meta["visualization_widgets"]
-        queries = set()
-        for widget in widgets:
-            query_data = widget["visualization"]
-            query_id = query_data["query_details"]["query_id"]
-
-            post = Post(
-                data={
-                    "operationName": "FindQuery",
-                    "variables": {"session_id": 87, "id": query_id},
-                    "query": FIND_QUERY_POST,
-                },
-                key_map={},
+        query_ids = list(
+            dict.fromkeys(
+                widget["visualization"]["query_details"]["query_id"]
+                for widget in widgets
             )
-            response = api.post_dune_request(post)
-            query_data = response.json()["data"]["queries"][0]
+        )
+        queries = set()
+        for query_data in cls._find_queries(api, query_ids, cache):
             # Filtering out queries that are not owned by logged-in user.
             if query_data["user"]["name"] == api.username:
                 queries.add(
@@ -144,56 +160,111 @@ class DuneDashboard:
         )
 
     @staticmethod
-    def dump_config(name: str, owner: str, slug: str, queries: list[DuneQuery]) -> None:
-        """
-        Writes Dashboard Configuration to files.
-        Specifically to ./out/Dashboard-Slug
-        """
-        out_dir = f"./out/{slug}"
-        if not os.path.exists(out_dir):
-            os.makedirs(out_dir)
-        queries_seen = {}
-        with open(f"{out_dir}/_config.json", "w", encoding="utf-8") as config_file:
-            query_dicts = []
-            for query in queries:
+    def _find_queries(
+        api: DuneAPI, query_ids: list[int], cache: Optional[QueryMetadataCache]
+    ) -> list[dict[str, Any]]:
+        """
+        Fetches metadata (FindQuery) of all query_ids. With a cache, the
+        update times of all queries are fetched in a single request and only
+        queries updated since they were cached are fetched in full.
+        """
+        updated_at: dict[int, str] = {}
+        if cache is not None and query_ids:
+            post = query_updates_post(query_ids)
+            response = api.post_dune_request(post)
+            rows: list[dict[str, Any]] = validate_and_parse_list_response(
+                response, post.key_map
+            )["queries"]
+            updated_at = {row["id"]: row["updated_at"] for row in rows}
+
+        results, fetched = [], 0
+        for query_id in query_ids:
+            cached = None
+            if cache is not None and query_id in updated_at:
+                cached = cache.get(query_id, updated_at[query_id])
+            if cached is not None:
+                log.debug(f"Using cached metadata of query {query_id}")
+                results.append(cached)
+                continue
+            post = Post(
+                data={
+                    "operationName": "FindQuery",
+                    "variables": {"session_id": 87, "id": query_id},
+                    "query": FIND_QUERY_POST,
+                },
+                key_map={},
+            )
+            response = api.post_dune_request(post)
+            query_data = response.json()["data"]["queries"][0]
+            fetched += 1
+            if cache is not None:
+                cache.store(query_data)
+            results.append(query_data)
+        if cache is not None:
+            cache.save()
+            log.info(f"Fetched {fetched} of {len(query_ids)} queries (others cached)")
+        return results
+
+    @staticmethod
+    def dump_config(
+        name: str,
+        owner: str,
+        slug: str,
+        queries: list[DuneQuery],
+        out_dir: Optional[str] = None,
+    ) -> list[str]:
+        """
+        Writes Dashboard Configuration to files (by default to ./out/Dashboard-Slug).
+        Files are only (atomically) written when their content changed since the
+        last dump, according to the hashes recorded in the directory's manifest.
+        Files of previous dumps which are no longer part of the dashboard are removed.
+        :return: paths of the files written
+        """
+        out_dir = out_dir if out_dir is not None else f"./out/{slug}"
+        files: dict[str, str] = {}
+        query_files: dict[str, str] = {}
+        query_dicts = []
+        # Sorted, so that repeated dumps of the same dashboard are identical.
+        for query in sorted(queries, key=lambda q: q.query_id):
+            content = query.raw_sql.strip("\n") + "\n"
+            if content not in query_files:
                 query_file = f"{query.name.lower().replace(' ', '-')}.sql"
-                query_config = {
+                if query_file in files:
+                    # Same name, different SQL: disambiguate by content.
+                    query_file = query_file.replace(
+                        ".sql", f"-{content_hash(content)[:8]}.sql"
+                    )
+                files[query_file] = content
+                query_files[content] = query_file
+            query_dicts.append(
+                {
                     "id": query.query_id,
                     "name": query.name,
                     "description": query.description,
-                    "query_file": query_file,
+                    "query_file": query_files[content],
                     "network": str(query.network),
                     "parameters": [
                         {"key": p.key, "value": p.value, "type": p.type.value}
                         for p in query.parameters
                     ],
                 }
-                query_dicts.append(query_config)
-
-                if query.raw_sql not in queries_seen:
-                    # Whenever we encounter a new SQL query, write to file
-                    query_path = f"{out_dir}/{query_file}"
-                    with open(query_path, "w", encoding="utf-8") as q_file:
-                        q_file.write(query.raw_sql.strip("\n") + "\n")
-                    queries_seen[query.raw_sql] = query_file
-                else:
-                    # If already seen use the already existing file.
-                    query_config["query_file"] = queries_seen[query.raw_sql]
-
-            config_dict = {
-                "meta": {
-                    # Dashboards can be renamed but the slug doesn't change.
-                    "name": name,
-                    "slug": slug,
-                    "user": owner,
-                    "query_path": out_dir,
-                },
-                "queries": query_dicts,
-            }
-            config_file.write(
-                json.dumps(config_dict, indent=2, default=str).strip("\n") + "\n"
             )
 
+        config_dict = {
+            "meta": {
+                # Dashboards can be renamed but the slug doesn't change.
+                "name": name,
+                "slug": slug,
+                "user": owner,
+                "query_path": out_dir,
+            },
+            "queries": query_dicts,
+        }
+        files["_config.json"] = (
+            json.dumps(config_dict, indent=2, default=str).strip("\n") + "\n"
+        )
+        return sync_files(out_dir, files)
+
     @classmethod
     def from_json(cls, api: DuneAPI, json_obj: dict[str, Any]) -> DuneDashboard:
         """Constructs Dashboard from json file"""
@@ -210,13 +281,118 @@ class DuneDashboard:
             slug=meta.get("slug", name.replace(" ", "-")),
             user=meta["user"],
             queries=queries,
+            tiles=tiles,
         )
 
-    def update(self) -> None:
-        """Creates a dune connection and updates/refreshes all dashboard queries"""
-        for tile in self.queries:
-            self.api.initiate_query(tile)
-            self.api.execute_query(tile)
+    def dependencies(self) -> dict[int, set[int]]:
+        """
+        Indices of the queries each query (by index) requires, i.e. those
+        whose query file is the base file (`requires`) of the query.
+        """
+        providers: dict[str, set[int]] = {}
+        for index, tile in enumerate(self.tiles):
+            providers.setdefault(os.path.normpath(tile.select_file), set()).add(index)
+        dependencies: dict[int, set[int]] = {i: set() for i in range(len(self.queries))}
+        for index, tile in enumerate(self.tiles):
+            if tile.base_file is not None:
+                required = providers.get(os.path.normpath(tile.base_file), set())
+                dependencies[index] = required - {index}
+        return dependencies
+
+    def affected(self, changed_files: Iterable[str]) -> set[int]:
+        """
+        Indices of the queries built from any of changed_files (as query or
+        base file), together with all queries (transitively) requiring them.
+        """
+        changed = {os.path.normpath(file) for file in changed_files}
+        affected = {
+            index
+            for index, tile in enumerate(self.tiles)
+            if os.path.normpath(tile.select_file) in changed
+            or (
+                tile.base_file is not None
+                and os.path.normpath(tile.base_file) in changed
+            )
+        }
+        dependencies = self.dependencies()
+        while True:
+            dependents = {
+                index for index, required in dependencies.items() if required & affected
+            }
+            if dependents <= affected:
+                return affected
+            affected |= dependents
+
+    def _selected_dependencies(
+        self, changed_files: Optional[Iterable[str]]
+    ) -> dict[int, set[int]]:
+        """Dependencies between the queries to be refreshed (see refresh_waves)"""
+        dependencies = self.dependencies()
+        if changed_files is None:
+            return dependencies
+        selected = self.affected(changed_files)
+        return {
+            index: required & selected
+            for index, required in dependencies.items()
+            if index in selected
+        }
+
+    def refresh_waves(
+        self, changed_files: Optional[Iterable[str]] = None
+    ) -> list[list[DuneQuery]]:
+        """
+        Groups the queries to be refreshed into waves in dependency order.
+        Queries of a wave only depend on queries of earlier waves.
+        :param changed_files: when provided, only queries affected by these
+            files are refreshed (see affected)
+        """
+        return [
+            [self.queries[index] for index in wave]
+            for wave in topological_waves(self._selected_dependencies(changed_files))
+        ]
+
+    def update(
+        self,
+        max_workers: int = 1,
+        batch_size: int = 20,
+        changed_files: Optional[Iterable[str]] = None,
+        wait: bool = False,
+    ) -> None:
+        """
+        Creates a dune connection and updates/refreshes dashboard queries
+        in dependency order (see refresh_waves). The queries of each wave are
+        upserted and executed in batches of batch_size per request. Executions
+        of queries that later waves depend on are awaited before those waves.
+        :param max_workers: number of batches (and jobs awaited) concurrently
+        :param changed_files: refresh only queries affected by these files
+        :param wait: also await all other executions before returning
+        """
+
+        def refresh(batch: list[DuneQuery]) -> list[str]:
+            self.api.initiate_queries(batch, batch_size)
+            return self.api.execute_queries(batch, batch_size)
+
+        dependencies = self._selected_dependencies(changed_files)
+        required = set().union(*dependencies.values())
+        waves = topological_waves(dependencies)
+        log.info(
+            f"Refreshing {len(dependencies)} of {len(self.queries)} queries "
+            f"in {len(waves)} waves"
+        )
+        with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as pool:
+            for wave in waves:
+                batches = [
+                    [self.queries[index] for index in wave[i : i + batch_size]]
+                    for i in range(0, len(wave), batch_size)
+                ]
+                job_ids = [job for jobs in pool.map(refresh, batches) for job in jobs]
+                # Dependent queries must not run before those they depend on.
+                awaited = [
+                    job_id
+                    for index, job_id in zip(wave, job_ids)
+                    if wait or index in required
+                ]
+                list(pool.map(self.api.await_job, awaited))
 
     def __str__(self) -> str:
         names = "\n".join(
@@ -237,5 +413,7 @@ if __name__ == "__main__":
     args = parser.parse_args()
 
     dune = DuneAPI.new_from_environment()
-    dashboard = DuneDashboard.from_dune(dune, args.dashboard_slug)
+    dashboard = DuneDashboard.from_dune(
+        dune, args.dashboard_slug, cache=QueryMetadataCache.from_environment()
+    )
     print("Updated", dashboard)
@@ -0,0 +1,191 @@
+"""
+Parallel decoding of large query result payloads.
+
+The records of a FindResultDataByJob response (`get_result_by_job_id`) are
+split into byte ranges at record boundaries (`{"data":`), which are decoded
+by a pool of processes reading the payload from shared memory. The remaining
+(small) part of the response is decoded and validated as usual.
+
+Any payload which can not be split this way is decoded serially.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Optional
+
+from requests import Response
+
+from .logger import set_log
+from .response import (
+    parse_response_json,
+    validate_and_parse_list_response,
+    validate_list_data,
+)
+from .strings import StringPool
+from .types import DuneRecord, KeyMap, QueryResults
+
+log = set_log(__name__)
+
+RESULT_KEY = b'"get_result_by_job_id"'
+RECORD_START = re.compile(rb'\{\s*"data"\s*:')
+ARRAY_START = re.compile(rb"\s*:\s*\[")
+
+# Byte range [start, end) of a chunk of records (end is None for the last chunk)
+Chunk = tuple[int, Optional[int]]
+
+
+@dataclass
+class DecodeOptions:
+    """
+    Opt-in parallel decoding of query results
+    :param workers: number of decoding processes (default: all cores)
+    :param min_bytes: smaller payloads are decoded serially
+    :param chunks_per_worker: number of byte ranges per process
+    :param share_strings: share repeated strings of low cardinality
+        columns between records (see StringPool)
+    """
+
+    workers: Optional[int] = None
+    min_bytes: int = 16 * 2**20
+    chunks_per_worker: int = 4
+    share_strings: bool = False
+
+    @property
+    def max_workers(self) -> int:
+        """Number of decoding processes"""
+        return self.workers or os.cpu_count() or 1
+
+    def parallel(self, size: int) -> bool:
+        """Whether payloads of size bytes are decoded in parallel"""
+        return self.max_workers > 1 and size >= self.min_bytes
+
+
+def records_array_start(content: bytes) -> int:
+    """Returns the offset of the get_result_by_job_id array in content"""
+    key_position = content.find(RESULT_KEY)
+    if key_position < 0:
+        raise ValueError("Payload without get_result_by_job_id")
+    array = ARRAY_START.match(content, key_position + len(RESULT_KEY))
+    if array is None:
+        raise ValueError("get_result_by_job_id is not an array")
+    return array.end() - 1
+
+
+def split_records(content: bytes, chunks: int) -> tuple[int, list[Chunk]]:
+    """
+    Splits the get_result_by_job_id array of content into (at most) `chunks`
+    byte ranges of whole records.
+    :return: start of the array and its chunks
+    """
+    array_start = records_array_start(content)
+    boundaries = [array_start + 1]
+    step = max((len(content) - array_start) // chunks, 1)
+    for i in range(1, chunks):
+        record = RECORD_START.search(
+            content, max(array_start + i * step, boundaries[-1] + 1)
+        )
+        if record is None:
+            break
+        if record.start() > boundaries[-1]:
+            boundaries.append(record.start())
+    ends: list[Optional[int]] = [*boundaries[1:], None]
+    return array_start, list(zip(boundaries, ends))
+
+
+def decode_chunk(text: str, last: bool) -> tuple[list[DuneRecord], int]:
+    """
+    Decodes the records of a chunk, i.e. a comma separated sequence of
+    records (the last of which is terminated by the end of the array)
+    :return: record data and (for the last chunk) the byte offset of the
+        end of the array (relative to the start of the chunk)
+    """
+    if last:
+        records, end = json.JSONDecoder().raw_decode("[" + text)
+        # The closing bracket is at end - 1, i.e. at end - 2 within text.
+        array_end = len(text[: end - 2].encode("utf-8"))
+        return [record["data"] for record in records], array_end
+    records = json.loads("[" + text.rstrip().rstrip(",") + "]")
+    return [record["data"] for record in records], 0
+
+
+def _decode_shared_chunk(
+    shared_name: str, start: int, end: Optional[int]
+) -> tuple[list[DuneRecord], int]:
+    """Decodes a chunk of the payload held in shared memory (in a worker process)"""
+    shared = shared_memory.SharedMemory(name=shared_name)
+    try:
+        assert shared.buf is not None
+        text = bytes(shared.buf[start:end]).decode("utf-8")
+    finally:
+        shared.close()
+    return decode_chunk(text, end is None)
+
+
+def decode_records(
+    content: bytes, options: DecodeOptions
+) -> tuple[Any, list[DuneRecord]]:
+    """
+    Decodes a FindResultDataByJob response payload, decoding its records in parallel.
+    :return: the decoded payload without records and the (data of) the records
+    """
+    array_start, chunks = split_records(
+        content, options.max_workers * options.chunks_per_worker
+    )
+    shared = shared_memory.SharedMemory(create=True, size=len(content))
+    try:
+        assert shared.buf is not None
+        shared.buf[: len(content)] = content
+        with ProcessPoolExecutor(max_workers=options.max_workers) as pool:
+            futures = [
+                pool.submit(_decode_shared_chunk, shared.name, start, end)
+                for start, end in chunks
+            ]
+            decoded = [future.result() for future in futures]
+    finally:
+        shared.close()
+        shared.unlink()
+
+    records = [record for chunk_records, _ in decoded for record in chunk_records]
+    # Decoding the last chunk determined where the array ends.
+    array_end = chunks[-1][0] + decoded[-1][1]
+    remainder = json.loads(content[:array_start] + b"[]" + content[array_end + 1 :])
+    return remainder, records
+
+
+def decode_results(
+    response: Response, key_map: KeyMap, options: Optional[DecodeOptions] = None
+) -> QueryResults:
+    """
+    Validates and decodes a FindResultDataByJob response, decoding large
+    payloads in parallel (with options), or else serially.
+    """
+    results = _decode_results(response, key_map, options)
+    if options is not None and options.share_strings:
+        strings = StringPool()
+        for record in results.data:
+            strings.share_record(record)
+        log.info(strings.report())
+    return results
+
+
+def _decode_results(
+    response: Response, key_map: KeyMap, options: Optional[DecodeOptions]
+) -> QueryResults:
+    content = response.content
+    if options is not None and response.status_code == 200:
+        if options.parallel(len(content)):
+            try:
+                remainder, records = decode_records(content, options)
+            except (ValueError, KeyError, TypeError, OSError, BrokenExecutor) as err:
+                log.debug(f"Parallel decoding failed with {err}, decoding serially")
+            else:
+                data = parse_response_json(remainder)
+                results = QueryResults(validate_list_data(data, key_map))
+                results.data = records
+                return results
+    return QueryResults(validate_and_parse_list_response(response, key_map))
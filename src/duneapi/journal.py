@@ -0,0 +1,137 @@
+"""
+Journal of submitted query executions.
+
+Records the job_id of every execution until its results have been fetched,
+so that a restarted process resumes polling the existing job instead of
+executing the query again (and waiting in the queue once more).
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from typing import Optional
+
+from .logger import set_log
+from .types import DuneQuery
+from .util import write_atomic
+
+log = set_log(__name__)
+
+
+class JobState(Enum):
+    """Lifecycle of a journaled job"""
+
+    SUBMITTED = "submitted"
+    COMPLETE = "complete"
+    FAILED = "failed"
+
+
+@dataclass
+class JournalEntry:
+    """A single submitted job"""
+
+    fingerprint: str
+    query_id: int
+    job_id: str
+    submitted_at: str
+    state: str
+
+    @property
+    def age(self) -> timedelta:
+        """Time passed since the job was submitted"""
+        submitted = datetime.fromisoformat(self.submitted_at)
+        return datetime.now(timezone.utc) - submitted
+
+
+class JobJournal:
+    """
+    Thread safe journal of submitted jobs keyed by query fingerprint.
+    Kept in memory only, unless a file path is provided.
+    """
+
+    def __init__(
+        self, path: Optional[str] = None, max_age: timedelta = timedelta(hours=6)
+    ):
+        """
+        :param path: JSON file in which the journal is persisted
+        :param max_age: jobs submitted longer ago are neither resumed nor kept
+        """
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._entries: dict[str, JournalEntry] = self._read()
+
+    def _read(self) -> dict[str, JournalEntry]:
+        if self.path is None:
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as journal_file:
+                content = json.load(journal_file)
+        except FileNotFoundError:
+            return {}
+        except ValueError as err:
+            log.warning(f"Ignoring unreadable job journal {self.path}: {err}")
+            return {}
+        return {key: JournalEntry(**entry) for key, entry in content.items()}
+
+    def _write(self) -> None:
+        """Prunes expired entries and persists journal (caller must hold the lock)"""
+        self._entries = {
+            key: entry
+            for key, entry in self._entries.items()
+            if entry.age < self.max_age
+        }
+        if self.path is not None:
+            content = {key: asdict(entry) for key, entry in self._entries.items()}
+            write_atomic(self.path, json.dumps(content, indent=2))
+
+    def _record(self, query: DuneQuery, job_id: str, state: JobState) -> None:
+        key = query.fingerprint()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.job_id != job_id:
+                if state != JobState.SUBMITTED:
+                    # Entry was already superseded by another execution.
+                    return
+                entry = JournalEntry(
+                    fingerprint=key,
+                    query_id=query.query_id,
+                    job_id=job_id,
+                    submitted_at=datetime.now(timezone.utc).isoformat(),
+                    state=state.value,
+                )
+            entry.state = state.value
+            self._entries[key] = entry
+            self._write()
+
+    def pending(self, query: DuneQuery) -> Optional[JournalEntry]:
+        """Returns the (unexpired) submitted job for query, if any"""
+        with self._lock:
+            entry = self._entries.get(query.fingerprint())
+        if entry is None or entry.state != JobState.SUBMITTED.value:
+            return None
+        if entry.age >= self.max_age:
+            return None
+        return entry
+
+    def submitted(self, query: DuneQuery, job_id: str) -> None:
+        """Records a newly submitted job for query"""
+        self._record(query, job_id, JobState.SUBMITTED)
+
+    def complete(self, query: DuneQuery, job_id: str) -> None:
+        """Records the results of job_id as fetched"""
+        self._record(query, job_id, JobState.COMPLETE)
+
+    def failed(self, query: DuneQuery, job_id: str) -> None:
+        """Records job_id as failed, so that it is not resumed"""
+        self._record(query, job_id, JobState.FAILED)
+
+    @classmethod
+    def from_environment(cls) -> Optional[JobJournal]:
+        """Constructs journal persisted at DUNE_JOB_JOURNAL (if set)"""
+        path = os.environ.get("DUNE_JOB_JOURNAL")
+        return cls(path) if path else None
@@ -0,0 +1,157 @@
+"""
+Lazy views of query results.
+
+The records of a FindResultDataByJob response are indexed by their byte
+offsets in the raw payload (once), and only decoded when accessed. Taking
+`len()`, slicing or reading the first few rows of a large result therefore
+does not decode (or allocate dicts for) the remaining rows.
+"""
+from __future__ import annotations
+
+import json
+import re
+from array import array
+from typing import Iterator, Optional, Sequence, Union, overload
+
+from requests import Response
+
+from .decode import RECORD_START, records_array_start
+from .logger import set_log
+from .response import (
+    parse_response_json,
+    validate_and_parse_list_response,
+    validate_list_data,
+)
+from .types import DuneRecord, KeyMap, MetaData, QueryResults
+
+log = set_log(__name__)
+
+# Tokens determining the nesting depth (strings may contain brackets)
+TOKEN = re.compile(rb'"(?:[^"\\]|\\.)*"|[\[\]{}]', re.DOTALL)
+
+# Byte offsets of record starts and ends, and of the end of the records array
+RecordIndex = tuple["array[int]", "array[int]", int]
+
+
+def _index_by_record_start(content: bytes, array_start: int) -> Optional[RecordIndex]:
+    """
+    Indexes records by their (fast to find) `{"data":` prefix. Returns None
+    unless all records are separated by commas and balanced in braces, which
+    a prefix nested within a record (or following the array) is not.
+    """
+    starts = array(
+        "q", (m.start() for m in RECORD_START.finditer(content, array_start))
+    )
+    if not starts or content[array_start + 1 : starts[0]].strip():
+        return None
+    ends = array("q")
+    for start, next_start in zip(starts, starts[1:]):
+        end = content.rfind(b"}", start, next_start) + 1
+        if content.count(b"{", start, end) != content.count(b"}", start, end):
+            return None
+        if content[end:next_start].strip() != b",":
+            return None
+        ends.append(end)
+    tail = content[starts[-1] :].decode("utf-8")
+    _, end = json.JSONDecoder().raw_decode(tail)
+    ends.append(starts[-1] + len(tail[:end].encode("utf-8")))
+    array_end = content.find(b"]", ends[-1])
+    if array_end < 0 or content[ends[-1] : array_end].strip():
+        return None
+    return starts, ends, array_end
+
+
+def _index_by_tokens(content: bytes, array_start: int) -> RecordIndex:
+    """Indexes records by tracking the nesting depth of all tokens"""
+    starts, ends = array("q"), array("q")
+    depth = 0
+    for token in TOKEN.finditer(content, array_start + 1):
+        char = content[token.start()]
+        if char == ord('"'):
+            continue
+        if char in b"[{":
+            if depth == 0:
+                starts.append(token.start())
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 0:
+            ends.append(token.end())
+        elif depth < 0:
+            return starts, ends, token.start()
+    raise ValueError("Unterminated get_result_by_job_id array")
+
+
+def index_records(content: bytes, array_start: int) -> RecordIndex:
+    """
+    Indexes the records of the get_result_by_job_id array at array_start.
+    :return: record starts, record ends and the offset of the closing bracket
+    """
+    index = _index_by_record_start(content, array_start)
+    if index is None:
+        log.debug("Indexing records token by token")
+        index = _index_by_tokens(content, array_start)
+    return index
+
+
+class LazyResults(Sequence[DuneRecord]):
+    """
+    Read only sequence of the records of a FindResultDataByJob response,
+    each of which is decoded when accessed. Slices are views sharing the payload.
+    """
+
+    def __init__(
+        self,
+        content: bytes,
+        index: RecordIndex,
+        meta: Optional[MetaData] = None,
+        rows: Optional[range] = None,
+    ):
+        self._content = content
+        self._starts, self._ends, _ = index
+        self._index = index
+        self.meta = meta
+        self._rows = rows if rows is not None else range(len(self._starts))
+
+    @classmethod
+    def from_response(cls, response: Response, key_map: KeyMap) -> LazyResults:
+        """Validates response (except for its records) and indexes its records"""
+        if response.status_code != 200:
+            raise SystemExit("Dune post failed with", response)
+        content = response.content
+        try:
+            array_start = records_array_start(content)
+        except ValueError:
+            # Responses without records (e.g. errors) fail validation as usual.
+            validate_and_parse_list_response(response, key_map)
+            raise
+        index = index_records(content, array_start)
+        array_end = index[2]
+        remainder = json.loads(content[:array_start] + b"[]" + content[array_end + 1 :])
+        data = validate_list_data(parse_response_json(remainder), key_map)
+        return cls(content, index, QueryResults(data).meta)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @overload
+    def __getitem__(self, index: int) -> DuneRecord:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> LazyResults:
+        ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[DuneRecord, LazyResults]:
+        if isinstance(index, slice):
+            return LazyResults(self._content, self._index, self.meta, self._rows[index])
+        return self._record(self._rows[index])
+
+    def __iter__(self) -> Iterator[DuneRecord]:
+        for row in self._rows:
+            yield self._record(row)
+
+    def _record(self, row: int) -> DuneRecord:
+        record = json.loads(self._content[self._starts[row] : self._ends[row]])
+        data: DuneRecord = record["data"]
+        return data
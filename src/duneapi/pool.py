@@ -0,0 +1,282 @@
+"""
+Pools of scratch query ids and of Dune accounts.
+
+Every ad-hoc query is upserted into an existing query id before execution.
+Concurrent fetches sharing a single id overwrite each other's SQL, so each
+in-flight fetch leases its own id from the pool and returns it when done.
+
+Since a single account caps how many (and how quickly) jobs are run,
+the client pool spreads fetches over several accounts.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Optional, TypeVar
+
+from dotenv import load_dotenv
+
+from .logger import set_log
+from .retry import ErrorKind
+from .types import DuneQuery, DuneRecord
+
+if TYPE_CHECKING:
+    from .api import DuneAPI
+    from .dashboard import DuneDashboard
+
+log = set_log(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Waiter:
+    """A caller blocked in QueryIdPool.acquire, and the query id handed to it"""
+
+    ready: threading.Event
+    query_id: Optional[int] = None
+
+
+class QueryIdPool:
+    """
+    Thread safe pool of query ids, leased one per in-flight fetch.
+    Callers block (in FIFO order) when all ids are leased: released ids are
+    handed to the longest waiting caller.
+    """
+
+    def __init__(self, query_ids: Iterable[int]):
+        ids = list(dict.fromkeys(int(query_id) for query_id in query_ids))
+        if not ids:
+            raise ValueError("QueryIdPool requires at least one query id")
+        self.query_ids = tuple(ids)
+        self._available = deque(ids)
+        self._waiters: deque[_Waiter] = deque()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.query_ids)
+
+    @property
+    def available(self) -> int:
+        """Number of query ids not currently leased"""
+        with self._lock:
+            return len(self._available)
+
+    def acquire(self, timeout: Optional[float] = None) -> int:
+        """
+        Leases a query id, waiting for one to be released if necessary.
+        :param timeout: maximum number of seconds to wait (forever when None)
+        :return: the leased query id
+        """
+        with self._lock:
+            if self._available and not self._waiters:
+                return self._available.popleft()
+            waiter = _Waiter(threading.Event())
+            self._waiters.append(waiter)
+        log.debug("Query id pool exhausted, waiting for release")
+        waiter.ready.wait(timeout)
+        with self._lock:
+            if waiter.query_id is None:
+                self._waiters.remove(waiter)
+                raise TimeoutError(f"No query id available after {timeout} seconds")
+            return waiter.query_id
+
+    def release(self, query_id: int) -> None:
+        """Returns a leased query id to the pool (or the longest waiting caller)"""
+        with self._lock:
+            if query_id not in self.query_ids:
+                raise ValueError(f"Query id {query_id} does not belong to pool")
+            if query_id in self._available:
+                raise ValueError(f"Query id {query_id} is not leased")
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.query_id = query_id
+                waiter.ready.set()
+            else:
+                self._available.append(query_id)
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None) -> Iterator[int]:
+        """Context managed `acquire` that always releases the query id"""
+        query_id = self.acquire(timeout)
+        try:
+            yield query_id
+        finally:
+            self.release(query_id)
+
+    @staticmethod
+    def parse_ids(spec: str) -> list[int]:
+        """
+        Parses a comma separated list of query ids and inclusive ranges.
+        For example "1,5-7" -> [1, 5, 6, 7]
+        """
+        query_ids: list[int] = []
+        for part in spec.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            if "-" in part:
+                start, end = part.split("-", 1)
+                query_ids.extend(range(int(start), int(end) + 1))
+            else:
+                query_ids.append(int(part))
+        return query_ids
+
+    @classmethod
+    def from_environment(cls) -> QueryIdPool:
+        """
+        Constructs pool from DUNE_QUERY_IDS (e.g. "123,200-209"),
+        falling back to the single DUNE_QUERY_ID.
+        """
+        load_dotenv()
+        spec = os.environ.get("DUNE_QUERY_IDS") or os.environ["DUNE_QUERY_ID"]
+        return cls(cls.parse_ids(spec))
+
+
+class PoolSaturatedError(Exception):
+    """Raised when the client pool sheds load"""
+
+
+@dataclass
+class PoolMember:
+    """An authenticated account of the client pool and its scratch query ids"""
+
+    api: DuneAPI
+    query_ids: QueryIdPool
+    in_flight: int = 0
+    failures: int = 0
+    unhealthy_until: float = 0.0
+
+    @property
+    def load(self) -> float:
+        """Fraction of the account's capacity in use"""
+        return self.in_flight / len(self.query_ids)
+
+    def healthy(self, now: float) -> bool:
+        """Whether the account is not cooling down after failures"""
+        return self.unhealthy_until <= now
+
+
+class DuneClientPool:
+    """
+    Routes work to the least loaded of several Dune accounts.
+    The capacity of each account is its number of scratch query ids.
+    Accounts failing with transient or authentication errors are taken out of
+    rotation for `cooldown` seconds and the work is retried on another account.
+    Any other error is raised without penalizing the account.
+    When all accounts are busy, at most `max_queued` callers wait for capacity
+    and any further callers are rejected with PoolSaturatedError.
+    """
+
+    def __init__(
+        self,
+        members: list[tuple[DuneAPI, QueryIdPool]],
+        max_queued: Optional[int] = None,
+        cooldown: float = 60.0,
+    ):
+        if not members:
+            raise ValueError("DuneClientPool requires at least one account")
+        self.members = [PoolMember(api, query_ids) for api, query_ids in members]
+        self.max_queued = max_queued
+        self.cooldown = cooldown
+        self._condition = threading.Condition()
+        self._queued = 0
+
+    def _available(self, exclude: list[PoolMember]) -> list[PoolMember]:
+        """Healthy accounts with spare capacity (caller must hold the lock)"""
+        now = time.monotonic()
+        return [
+            member
+            for member in self.members
+            if member not in exclude
+            and member.healthy(now)
+            and member.in_flight < len(member.query_ids)
+        ]
+
+    def _acquire(self, exclude: list[PoolMember]) -> PoolMember:
+        """Waits for, and reserves capacity on, the least loaded healthy account"""
+        with self._condition:
+            candidates = self._available(exclude)
+            if not candidates:
+                now = time.monotonic()
+                if not any(m.healthy(now) for m in self.members if m not in exclude):
+                    raise PoolSaturatedError("No healthy Dune account available")
+                if self.max_queued is not None and self._queued >= self.max_queued:
+                    raise PoolSaturatedError(
+                        f"All accounts busy and {self._queued} callers queued"
+                    )
+                self._queued += 1
+                try:
+                    while not candidates:
+                        self._condition.wait(self.cooldown)
+                        candidates = self._available(exclude)
+                finally:
+                    self._queued -= 1
+            member = min(candidates, key=lambda m: m.load)
+            member.in_flight += 1
+            return member
+
+    def _release(self, member: PoolMember, err: Optional[BaseException]) -> None:
+        with self._condition:
+            member.in_flight -= 1
+            if err is None:
+                member.failures = 0
+            else:
+                member.failures += 1
+                member.unhealthy_until = time.monotonic() + self.cooldown
+                log.warning(
+                    f"Account {member.api.username} failed with {err}, "
+                    f"cooling down for {self.cooldown} seconds"
+                )
+            self._condition.notify_all()
+
+    def _run(
+        self,
+        action: Callable[[PoolMember], T],
+        exclude: Optional[list[PoolMember]] = None,
+    ) -> T:
+        """
+        Runs action on the least loaded account, failing over to the others
+        :param exclude: accounts on which action must not be run
+        """
+        tried = list(exclude) if exclude is not None else []
+        while True:
+            member = self._acquire(exclude=tried)
+            tried.append(member)
+            try:
+                result = action(member)
+            except Exception as err:  # pylint: disable=broad-except
+                kind = member.api.retry_policy.classify(err)
+                # Only account (or connection) problems warrant failover;
+                # query and fatal errors would fail on any account.
+                failover = kind in {ErrorKind.TRANSIENT, ErrorKind.AUTH}
+                self._release(member, err if failover else None)
+                if not failover or len(tried) == len(self.members):
+                    raise
+                continue
+            self._release(member, None)
+            return result
+
+    def fetch(self, query: DuneQuery) -> list[DuneRecord]:
+        """Fetches query on the least loaded account (see DuneAPI.fetch)"""
+        return self._run(lambda m: m.api.fetch(query, query_pool=m.query_ids))
+
+    def update_dashboard(self, dashboard: DuneDashboard) -> None:
+        """
+        Refreshes dashboard on the account owning it (dashboard queries can
+        only be updated by their owner), accounting for that account's load.
+        """
+        owners = [m for m in self.members if m.api.username == dashboard.api.username]
+        if not owners:
+            raise ValueError(f"No account for dashboard owner {dashboard.api.username}")
+
+        def update(member: PoolMember) -> None:
+            dashboard.api = member.api
+            dashboard.update()
+
+        # Failover is only possible to (other clients of) the owner's account.
+        self._run(update, exclude=[m for m in self.members if m not in owners])
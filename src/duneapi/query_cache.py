@@ -0,0 +1,91 @@
+"""
+Local cache of query metadata (FindQuery responses) keyed by query id.
+
+Entries are only valid for the `updated_at` they were fetched at, so that
+dashboard pulls fetch full query bodies only for queries changed since.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from typing import Any, Optional
+
+from dotenv import load_dotenv
+
+from .logger import set_log
+from .types import Post
+from .util import read_json_file, write_atomic
+
+log = set_log(__name__)
+
+FIND_QUERY_UPDATES_POST = """
+    query FindQueryUpdates($ids: [Int!]!) {
+      queries(where: {id: {_in: $ids}}) {
+        id
+        updated_at
+      }
+    }
+"""
+
+
+def query_updates_post(query_ids: list[int]) -> Post:
+    """Returns json data for a post of type FindQueryUpdates"""
+    return Post(
+        data={
+            "operationName": "FindQueryUpdates",
+            "variables": {"ids": query_ids},
+            "query": FIND_QUERY_UPDATES_POST,
+        },
+        key_map={"queries": {"id", "updated_at"}},
+    )
+
+
+class QueryMetadataCache:
+    """
+    Thread safe cache of query metadata, kept in memory only
+    unless a (JSON) file path is provided.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict[str, Any]] = self._read()
+        self._dirty = False
+
+    def _read(self) -> dict[str, dict[str, Any]]:
+        try:
+            entries: Optional[dict[str, dict[str, Any]]] = read_json_file(self.path)
+        except ValueError as err:
+            log.warning(f"Ignoring unreadable query cache {self.path}: {err}")
+            return {}
+        return entries or {}
+
+    def get(self, query_id: int, updated_at: str) -> Optional[dict[str, Any]]:
+        """Returns cached metadata of query_id, if it is as recent as updated_at"""
+        with self._lock:
+            entry = self._entries.get(str(query_id))
+        if entry is None or entry.get("updated_at") != updated_at:
+            return None
+        return entry
+
+    def store(self, query_data: dict[str, Any]) -> None:
+        """Caches metadata (which must contain id and updated_at)"""
+        with self._lock:
+            self._entries[str(query_data["id"])] = query_data
+            self._dirty = True
+
+    def save(self) -> None:
+        """Persists cache (if it has a path and changed)"""
+        with self._lock:
+            if self.path is None or not self._dirty:
+                return
+            write_atomic(self.path, json.dumps(self._entries, indent=2))
+            self._dirty = False
+
+    @classmethod
+    def from_environment(cls) -> Optional[QueryMetadataCache]:
+        """Constructs cache persisted at DUNE_QUERY_CACHE (if set)"""
+        load_dotenv()
+        path = os.environ.get("DUNE_QUERY_CACHE")
+        return cls(path) if path else None
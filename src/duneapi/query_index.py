@@ -0,0 +1,249 @@
+"""
+Local index of the account's saved queries.
+
+Answers "does this query already exist?" by id, name or SQL without network
+calls. The index is refreshed incrementally, fetching only queries updated
+since the most recent update time it has seen. Queries are paged by the
+keyset (updated_at, id), so that queries sharing an update time with the
+end of a page are not skipped.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass
+from typing import Any, Optional
+
+from dotenv import load_dotenv
+
+from .api import DuneAPI
+from .logger import set_log
+from .response import validate_and_parse_list_response
+from .types import DuneQuery, Post
+from .util import content_hash, write_atomic
+
+log = set_log(__name__)
+
+LIST_QUERIES_POST = """
+    query ListQueries(
+      $user: String!, $since: timestamptz!, $after_id: Int!, $limit: Int!
+    ) {
+      queries(
+        where: {
+          user: {name: {_eq: $user}}
+          _or: [
+            {updated_at: {_gt: $since}}
+            {updated_at: {_eq: $since}, id: {_gt: $after_id}}
+          ]
+        }
+        order_by: [{updated_at: asc}, {id: asc}]
+        limit: $limit
+      ) {
+        id
+        name
+        dataset_id
+        parameters
+        query
+        is_archived
+        updated_at
+      }
+    }
+"""
+# Update time preceding all queries
+EPOCH = "1970-01-01T00:00:00+00:00"
+
+
+def list_queries_post(user: str, since: str, after_id: int, limit: int) -> Post:
+    """
+    Returns json data for a post of type ListQueries, fetching queries
+    after (since, after_id) in (updated_at, id) order
+    """
+    return Post(
+        data={
+            "operationName": "ListQueries",
+            "variables": {
+                "user": user,
+                "since": since,
+                "after_id": after_id,
+                "limit": limit,
+            },
+            "query": LIST_QUERIES_POST,
+        },
+        key_map={
+            "queries": {
+                "id",
+                "name",
+                "dataset_id",
+                "parameters",
+                "query",
+                "is_archived",
+                "updated_at",
+            }
+        },
+    )
+
+
+def sql_hash(raw_sql: str) -> str:
+    """Hash by which queries with the same SQL are found"""
+    return content_hash(raw_sql.strip())
+
+
+def parameter_keys(parameters: list[dict[str, Any]]) -> list[tuple[str, str, str]]:
+    """Comparable (key, type, value) of (stored or request) query parameters"""
+    return sorted((str(p["key"]), str(p["type"]), str(p["value"])) for p in parameters)
+
+
+@dataclass
+class IndexedQuery:
+    """Summary of a saved query"""
+
+    query_id: int
+    name: str
+    network: int
+    parameters: list[dict[str, Any]]
+    sql_hash: str
+    updated_at: str
+
+    @classmethod
+    def from_dict(cls, obj: dict[str, Any]) -> IndexedQuery:
+        """Constructs entry from (ListQueries) query data"""
+        return cls(
+            query_id=int(obj["id"]),
+            name=obj["name"],
+            network=int(obj["dataset_id"]),
+            parameters=list(obj["parameters"] or []),
+            sql_hash=sql_hash(obj["query"]),
+            updated_at=obj["updated_at"],
+        )
+
+
+class QueryIndex:
+    """
+    Thread safe index of the account's (unarchived) queries,
+    kept in memory only unless a (JSON) file path is provided.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._by_id: dict[int, IndexedQuery] = {}
+        self._by_name: dict[str, set[int]] = {}
+        self._by_sql: dict[str, set[int]] = {}
+        self.updated_at = EPOCH
+        # Largest id of the queries updated at updated_at
+        self.after_id = 0
+        self._read()
+
+    def _clear(self) -> None:
+        self._by_id, self._by_name, self._by_sql = {}, {}, {}
+        self.updated_at, self.after_id = EPOCH, 0
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def _read(self) -> None:
+        if self.path is None:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as index_file:
+                content = json.load(index_file)
+        except FileNotFoundError:
+            return
+        except ValueError as err:
+            log.warning(f"Ignoring unreadable query index {self.path}: {err}")
+            return
+        self.updated_at = content["updated_at"]
+        self.after_id = content.get("after_id", 0)
+        for entry in content["queries"]:
+            self._add(IndexedQuery(**entry))
+
+    def _write(self) -> None:
+        """Persists index (caller must hold the lock)"""
+        if self.path is None:
+            return
+        content = {
+            "updated_at": self.updated_at,
+            "after_id": self.after_id,
+            "queries": [asdict(entry) for entry in self._by_id.values()],
+        }
+        write_atomic(self.path, json.dumps(content, indent=2))
+
+    def _add(self, entry: IndexedQuery) -> None:
+        self._remove(entry.query_id)
+        self._by_id[entry.query_id] = entry
+        self._by_name.setdefault(entry.name, set()).add(entry.query_id)
+        self._by_sql.setdefault(entry.sql_hash, set()).add(entry.query_id)
+
+    def _remove(self, query_id: int) -> None:
+        entry = self._by_id.pop(query_id, None)
+        if entry is not None:
+            self._by_name[entry.name].discard(query_id)
+            self._by_sql[entry.sql_hash].discard(query_id)
+
+    def refresh(self, api: DuneAPI, full: bool = False, page_size: int = 500) -> int:
+        """
+        Fetches queries updated since the last refresh (or all queries when
+        `full`, which also drops queries deleted since).
+        :return: number of fetched queries
+        """
+        with self._lock:
+            if full:
+                self._clear()
+            fetched = 0
+            while True:
+                post = list_queries_post(
+                    api.username, self.updated_at, self.after_id, page_size
+                )
+                response = api.post_dune_request(post)
+                page: list[dict[str, Any]] = validate_and_parse_list_response(
+                    response, post.key_map
+                )["queries"]
+                for query_data in page:
+                    if query_data["is_archived"]:
+                        self._remove(int(query_data["id"]))
+                    else:
+                        self._add(IndexedQuery.from_dict(query_data))
+                    self.updated_at, self.after_id = max(
+                        (self.updated_at, self.after_id),
+                        (query_data["updated_at"], int(query_data["id"])),
+                    )
+                fetched += len(page)
+                if len(page) < page_size:
+                    break
+            self._write()
+        log.info(f"Indexed {fetched} updated queries ({len(self)} in total)")
+        return fetched
+
+    def by_id(self, query_id: int) -> Optional[IndexedQuery]:
+        """Returns the indexed query with query_id (if any)"""
+        with self._lock:
+            return self._by_id.get(query_id)
+
+    def by_name(self, name: str) -> list[IndexedQuery]:
+        """Returns all indexed queries named name"""
+        with self._lock:
+            return [self._by_id[i] for i in sorted(self._by_name.get(name, set()))]
+
+    def by_sql(self, raw_sql: str) -> list[IndexedQuery]:
+        """Returns all indexed queries with (whitespace trimmed) SQL raw_sql"""
+        with self._lock:
+            ids = self._by_sql.get(sql_hash(raw_sql), set())
+            return [self._by_id[i] for i in sorted(ids)]
+
+    def find(self, query: DuneQuery) -> list[IndexedQuery]:
+        """Returns indexed queries with the same SQL, network and parameters"""
+        parameters = parameter_keys([p.to_dict() for p in query.parameters])
+        return [
+            entry
+            for entry in self.by_sql(query.raw_sql)
+            if entry.network == query.network.value
+            and parameter_keys(entry.parameters) == parameters
+        ]
+
+    @classmethod
+    def from_environment(cls) -> Optional[QueryIndex]:
+        """Constructs index persisted at DUNE_QUERY_INDEX (if set)"""
+        load_dotenv()
+        path = os.environ.get("DUNE_QUERY_INDEX")
+        return cls(path) if path else None
@@ -1,30 +1,70 @@
 """Handles Validation and partial Generic Response Data Parsing"""
-from typing import Any
+from typing import Any, Optional
 
 from requests import Response
 
 from .types import ListInnerResponse, DictInnerResponse, KeyMap
 
 
+# (Hasura) error codes of requests with a missing, expired or invalid token
+AUTH_ERROR_CODES = {"invalid-jwt", "invalid-headers", "access-denied"}
+
+
+class MissingDataError(ValueError):
+    """
+    Response json without 'data'. Dune responds this way (with 'errors' instead)
+    to requests carrying an expired or otherwise invalid authorization token,
+    but also to invalid requests (e.g. unknown fields or variables).
+    """
+
+    def __init__(self, message: str, errors: Optional[list[Any]] = None):
+        super().__init__(message)
+        self.errors = errors or []
+
+    def is_auth_error(self) -> bool:
+        """Whether the request was rejected for its authorization (token)"""
+        for error in self.errors:
+            if not isinstance(error, dict):
+                continue
+            code = (error.get("extensions") or {}).get("code")
+            if code in AUTH_ERROR_CODES or "jwt" in str(error.get("message")).lower():
+                return True
+        return False
+
+
+def parse_response_data(response: Response) -> dict[str, Any]:
+    """Returns the 'data' of a successful Dune response"""
+    if response.status_code != 200:
+        raise SystemExit("Dune post failed with", response)
+    return parse_response_json(response.json())
+
+
+def parse_response_json(response_json: dict[str, Any]) -> dict[str, Any]:
+    """Returns the 'data' of (already decoded) Dune response json"""
+    if "data" not in response_json.keys():
+        raise MissingDataError(
+            f"response json {response_json} missing 'data' key",
+            response_json.get("errors"),
+        )
+    data: dict[str, Any] = response_json["data"]
+    return data
+
+
 def pre_validate_response(response: Response, key_map: KeyMap) -> dict[str, Any]:
     """
     Validates the outermost (generic) part of Dune response data.
     Expects "data" to be a key in the response json and that the
     first level inner keys agree with what the caller expects.
     """
-    if response.status_code != 200:
-        raise SystemExit("Dune post failed with", response)
+    return pre_validate_data(parse_response_data(response), key_map)
 
-    response_json = response.json()
-    if "data" not in response_json.keys():
-        raise ValueError(f"response json {response_json} missing 'data' key")
 
-    query_errors = response_json["data"].get("query_errors")
+def pre_validate_data(response_data: dict[str, Any], key_map: KeyMap) -> dict[str, Any]:
+    """Validates the first level keys of (already parsed) response data"""
+    query_errors = response_data.get("query_errors")
     if query_errors:
         raise RuntimeError(f"Dune API Request failed with errors {query_errors}")
 
-    response_data: dict[str, Any] = response_json["data"]
-
     assert (
         response_data.keys() == key_map.keys()
     ), f"got={response_data.keys()}, expected={key_map.keys()}"
@@ -39,7 +79,14 @@ def validate_and_parse_dict_response(
     Validates responses of dict inner type, and
     returns partially parsed response data
     """
-    response_data = pre_validate_response(response, key_map)
+    return validate_dict_data(parse_response_data(response), key_map)
+
+
+def validate_dict_data(
+    response_data: dict[str, Any], key_map: KeyMap
+) -> DictInnerResponse:
+    """Validates (already parsed) response data of dict inner type"""
+    response_data = pre_validate_data(response_data, key_map)
     for key, val in key_map.items():
         assert isinstance(
             response_data[key], dict
@@ -50,6 +97,26 @@ def validate_and_parse_dict_response(
     return response_data
 
 
+def validate_and_parse_batch_response(
+    response: Response, key_map: KeyMap, field: str
+) -> list[DictInnerResponse]:
+    """
+    Splits the response to a post combining several operations on `field`
+    (each aliased by its key in key_map) into the responses of the individual
+    operations, i.e. {field: ...}, validating each of them separately.
+    """
+    response_data = parse_response_data(response)
+    results = []
+    for alias, val in key_map.items():
+        try:
+            results.append(
+                validate_dict_data({field: response_data.get(alias)}, {field: val})
+            )
+        except AssertionError as err:
+            raise AssertionError(f"Invalid response for {alias}: {err}") from err
+    return results
+
+
 def validate_and_parse_list_response(
     response: Response, key_map: KeyMap
 ) -> ListInnerResponse:
@@ -57,7 +124,14 @@ def validate_and_parse_list_response(
     Validates responses with list inner type, and
     returns partially parsed response data
     """
-    response_data = pre_validate_response(response, key_map)
+    return validate_list_data(parse_response_data(response), key_map)
+
+
+def validate_list_data(
+    response_data: dict[str, Any], key_map: KeyMap
+) -> ListInnerResponse:
+    """Validates (already parsed) response data of list inner type"""
+    response_data = pre_validate_data(response_data, key_map)
     for key, val in key_map.items():
         assert isinstance(
             response_data[key], list
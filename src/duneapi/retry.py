@@ -0,0 +1,98 @@
+"""
+Error classification and backoff for retrying failed Dune requests.
+"""
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from enum import Enum
+from typing import Optional
+
+from requests import RequestException, Response
+
+from .response import MissingDataError
+
+
+class ErrorKind(Enum):
+    """Categories of failure, each with its own recovery strategy"""
+
+    # Network problems, throttling and server errors: back off and try again.
+    TRANSIENT = "transient"
+    # Expired or rejected session: log in again before retrying.
+    AUTH = "auth"
+    # Dune reported errors executing the query: retrying rarely helps.
+    QUERY = "query"
+    # Anything else is not retried.
+    FATAL = "fatal"
+
+
+class RetriesExceededError(Exception):
+    """Raised when every attempt failed, with the kind of the last failure"""
+
+    def __init__(self, message: str, kind: ErrorKind):
+        super().__init__(message)
+        self.kind = kind
+
+
+def failed_response(err: BaseException) -> Optional[Response]:
+    """Returns the response an exception was raised for (if any)"""
+    response = getattr(err, "response", None)
+    if isinstance(response, Response):
+        return response
+    # pre_validate_response & fetch_auth_token raise SystemExit(..., response)
+    for arg in err.args:
+        if isinstance(arg, Response):
+            return arg
+    return None
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Determines how DuneAPI recovers from failed attempts.
+    Delays grow exponentially from `backoff` (by `backoff_factor`) up to
+    `max_backoff` seconds and, with `jitter`, are drawn uniformly from
+    [0, delay] so that many clients failing together don't retry together.
+    """
+
+    backoff: float = 1.0
+    backoff_factor: float = 2.0
+    max_backoff: float = 30.0
+    jitter: bool = True
+    retry_query_errors: bool = False
+
+    @staticmethod
+    def classify_status(status_code: int) -> ErrorKind:
+        """Determines the kind of failure represented by an HTTP status code"""
+        if status_code in {401, 403}:
+            return ErrorKind.AUTH
+        if status_code == 429 or status_code >= 500:
+            return ErrorKind.TRANSIENT
+        return ErrorKind.FATAL
+
+    @classmethod
+    def classify(cls, err: BaseException) -> ErrorKind:
+        """Determines the kind of failure represented by err"""
+        if isinstance(err, RetriesExceededError):
+            return err.kind
+        response = failed_response(err)
+        if response is not None and response.status_code != 200:
+            return cls.classify_status(response.status_code)
+        if isinstance(err, RequestException):
+            return ErrorKind.TRANSIENT
+        if isinstance(err, MissingDataError):
+            return ErrorKind.AUTH if err.is_auth_error() else ErrorKind.FATAL
+        if isinstance(err, RuntimeError):
+            return ErrorKind.QUERY
+        return ErrorKind.FATAL
+
+    def should_retry(self, kind: ErrorKind) -> bool:
+        """Whether a failure of this kind is worth another attempt"""
+        if kind == ErrorKind.QUERY:
+            return self.retry_query_errors
+        return kind != ErrorKind.FATAL
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait before retrying after the (0-indexed) failed attempt"""
+        delay = min(self.max_backoff, self.backoff * self.backoff_factor**attempt)
+        return random.uniform(0, delay) if self.jitter else delay
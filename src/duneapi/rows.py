@@ -0,0 +1,124 @@
+"""
+Compact records sharing their column schema.
+
+A Row holds its column values in slots of a class generated per column
+schema (column names and positions), rather than a dict per record repeating
+its keys and hash table. This takes about 2.5 times less memory than a dict
+(e.g. 72 vs 184 bytes for 5 columns, values excluded). Rows are read only
+mappings, so that `row["col"]`, `row.col` and `dict(row)` work as for records.
+JSON encoders need `default=json_default` (see util) to encode them.
+"""
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Iterable, Iterator, Optional
+
+from .strings import StringPool
+from .types import DuneRecord
+
+
+@dataclass(frozen=True)
+class RowSchema:
+    """Column names (and the slots holding their values) shared by rows"""
+
+    columns: tuple[str, ...]
+    slots: dict[str, str]
+
+
+class Row(Mapping[str, Any]):
+    """
+    Read only mapping of column names to values. Rows are instances of a
+    subclass per schema (see row_class), holding one value per slot.
+    Columns named like mapping methods (keys, items, values, get) are only
+    accessible as row["col"].
+    """
+
+    __slots__ = ()
+    _schema: RowSchema
+
+    def __init__(self, values: Iterable[Any]):
+        for slot, value in zip(self._schema.slots.values(), values):
+            setattr(self, slot, value)
+
+    def __getitem__(self, column: str) -> Any:
+        return getattr(self, self._schema.slots[column])
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for names which are not attributes of rows.
+        if name == "_schema":
+            raise AttributeError(name)
+        try:
+            return getattr(self, self._schema.slots[name])
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._schema.columns)
+
+    def __len__(self) -> int:
+        return len(self._schema.columns)
+
+    def __contains__(self, column: object) -> bool:
+        return column in self._schema.slots
+
+    def __repr__(self) -> str:
+        return f"Row({self.to_dict()!r})"
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return make_row, (self._schema.columns, self._values())
+
+    def _values(self) -> tuple[Any, ...]:
+        return tuple(getattr(self, slot) for slot in self._schema.slots.values())
+
+    @property
+    def columns(self) -> tuple[str, ...]:
+        """Column names"""
+        return self._schema.columns
+
+    def to_dict(self) -> DuneRecord:
+        """Converts row to a (regular) record"""
+        return dict(zip(self._schema.columns, self._values()))
+
+
+@lru_cache(maxsize=None)
+def row_class(columns: tuple[str, ...]) -> type[Row]:
+    """Returns the (shared) class of rows with columns"""
+    slots = {column: f"_{i}" for i, column in enumerate(columns)}
+    return type(
+        "Row",
+        (Row,),
+        {"__slots__": tuple(slots.values()), "_schema": RowSchema(columns, slots)},
+    )
+
+
+def row_schema(columns: tuple[str, ...]) -> RowSchema:
+    """Returns the (shared) schema of rows with columns"""
+    return row_class(columns)._schema  # pylint: disable=protected-access
+
+
+def make_row(columns: tuple[str, ...], values: Iterable[Any]) -> Row:
+    """Constructs a row of columns with values (in column order)"""
+    return row_class(columns)(values)
+
+
+def to_rows(
+    records: Iterable[DuneRecord], strings: Optional[StringPool] = None
+) -> list[Row]:
+    """
+    Converts records to rows. Records are converted one by one, so that
+    converting a LazyResults never holds more than one decoded record.
+    :param strings: shares repeated strings between rows
+    """
+    rows = []
+    columns: tuple[str, ...] = ()
+    cls = row_class(columns)
+    for record in records:
+        keys = tuple(record)
+        if keys != columns:
+            columns, cls = keys, row_class(keys)
+        if strings is not None:
+            strings.share_record(record)
+        rows.append(cls(record.values()))
+    return rows
@@ -0,0 +1,198 @@
+"""
+Batch execution of a manifest of queries, writing each result set to a file.
+
+Example manifest (JSON, or YAML when PyYAML is installed):
+{
+  "output_dir": "./out",
+  "format": "csv",
+  "max_concurrency": 4,
+  "queries": [
+    {
+      "name": "blocks",
+      "query_file": "./example/query.sql",
+      "network": "mainnet",
+      "parameters": [{"key": "IntParam", "type": "number", "value": "10"}],
+      "output": "blocks.jsonl"
+    }
+  ]
+}
+
+Query files are relative to the manifest, outputs to `output_dir`.
+The output format (csv, jsonl or parquet) is taken from the entry's `format`,
+the extension of its `output`, or the manifest's default `format` (in that order).
+Parquet output requires pyarrow.
+"""
+from __future__ import annotations
+
+import csv
+import importlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Iterator, Optional
+
+from .api import DuneAPI
+from .logger import set_log
+from .pool import QueryIdPool
+from .types import DuneQuery, DuneRecord, Network, QueryParameter
+from .util import json_default, open_query
+
+log = set_log(__name__)
+
+OUTPUT_FORMATS = ("csv", "jsonl", "parquet")
+
+
+def optional_import(module: str, purpose: str) -> Any:
+    """Imports an optional dependency, explaining what it is needed for"""
+    try:
+        return importlib.import_module(module)
+    except ImportError as err:
+        raise ImportError(f"{purpose} requires {module} to be installed") from err
+
+
+@dataclass
+class ManifestEntry:
+    """A single query of the manifest and where to write its results"""
+
+    query: DuneQuery
+    output: str
+    output_format: str
+
+
+@dataclass
+class Manifest:
+    """Queries to be run by the batch runner"""
+
+    entries: list[ManifestEntry]
+    max_concurrency: int = 4
+
+    @classmethod
+    def from_dict(cls, obj: dict[str, Any], path: str = ".") -> Manifest:
+        """
+        Constructs manifest from its (parsed) content
+        :param path: directory against which query files are resolved
+        """
+        output_dir = obj.get("output_dir", "./out")
+        default_format = obj.get("format", "csv")
+        entries = []
+        for item in obj["queries"]:
+            name = item.get(
+                "name", os.path.splitext(os.path.basename(item["query_file"]))[0]
+            )
+            output = item.get("output", f"{name}.{item.get('format', default_format)}")
+            output_format = item.get(
+                "format", os.path.splitext(output)[1].lstrip(".") or default_format
+            )
+            if output_format not in OUTPUT_FORMATS:
+                raise ValueError(f"Unsupported output format {output_format}")
+            query = DuneQuery(
+                name=name,
+                description=item.get("description", ""),
+                raw_sql=open_query(os.path.join(path, item["query_file"])),
+                network=Network.from_string(item.get("network", "mainnet")),
+                parameters=[
+                    QueryParameter.from_dict(p) for p in item.get("parameters", [])
+                ],
+                # Replaced by a query id leased from the pool.
+                query_id=0,
+            )
+            entries.append(
+                ManifestEntry(query, os.path.join(output_dir, output), output_format)
+            )
+        return cls(entries, int(obj.get("max_concurrency", 4)))
+
+    @classmethod
+    def from_file(cls, filename: str) -> Manifest:
+        """Loads manifest from a JSON or YAML file"""
+        with open(filename, "r", encoding="utf-8") as manifest_file:
+            content = manifest_file.read()
+        if filename.endswith((".yaml", ".yml")):
+            yaml = optional_import("yaml", "Reading YAML manifests")
+            obj = yaml.safe_load(content)
+        else:
+            obj = json.loads(content)
+        return cls.from_dict(obj, os.path.dirname(filename) or ".")
+
+
+@dataclass
+class RunResult:
+    """Outcome of a single manifest entry"""
+
+    name: str
+    output: str
+    rows: int
+    seconds: float
+    error: Optional[str] = None
+
+    def __str__(self) -> str:
+        if self.error is not None:
+            return f"{self.name}: failed after {self.seconds:.1f}s ({self.error})"
+        return f"{self.name}: {self.rows} rows in {self.seconds:.1f}s -> {self.output}"
+
+
+def write_records(records: list[DuneRecord], filename: str, output_format: str) -> int:
+    """
+    Writes records to filename in the given format (csv, jsonl or parquet)
+    :return: number of records written
+    """
+    os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+    match output_format:
+        case "csv":
+            with open(filename, "w", encoding="utf-8", newline="") as out_file:
+                writer = csv.writer(out_file)
+                if records:
+                    writer.writerow(records[0].keys())
+                for record in records:
+                    writer.writerow(record.values())
+        case "jsonl":
+            with open(filename, "w", encoding="utf-8") as out_file:
+                for record in records:
+                    out_file.write(json.dumps(record, default=json_default) + "\n")
+        case "parquet":
+            pyarrow = optional_import("pyarrow", "Parquet output")
+            parquet = optional_import("pyarrow.parquet", "Parquet output")
+            parquet.write_table(pyarrow.Table.from_pylist(records), filename)
+        case _:
+            raise ValueError(f"Unsupported output format {output_format}")
+    return len(records)
+
+
+def run_manifest(
+    api: DuneAPI, manifest: Manifest, query_pool: QueryIdPool
+) -> Iterator[RunResult]:
+    """
+    Fetches all manifest queries concurrently (bounded by the manifest's
+    max_concurrency and the size of query_pool), writing each result set
+    to its output file. Results are yielded as queries complete.
+    """
+
+    def run(entry: ManifestEntry) -> RunResult:
+        start = time.monotonic()
+        try:
+            records = api.fetch(entry.query, query_pool=query_pool)
+            rows = write_records(records, entry.output, entry.output_format)
+        except Exception as err:  # pylint: disable=broad-except
+            log.error(f"{entry.query.name} failed with {err}")
+            return RunResult(
+                entry.query.name, entry.output, 0, time.monotonic() - start, str(err)
+            )
+        return RunResult(entry.query.name, entry.output, rows, time.monotonic() - start)
+
+    workers = max(1, min(manifest.max_concurrency, len(query_pool)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run, entry) for entry in manifest.entries]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def summary(results: list[RunResult]) -> str:
+    """One line summary of a manifest run"""
+    failed = [r for r in results if r.error is not None]
+    rows = sum(r.rows for r in results)
+    slowest = max((r.seconds for r in results), default=0.0)
+    return (
+        f"{len(results) - len(failed)} of {len(results)} queries succeeded, "
+        f"{rows} rows written, slowest query took {slowest:.1f}s"
+    )
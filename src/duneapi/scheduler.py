@@ -0,0 +1,241 @@
+"""
+Long-running refresh scheduler for dashboards and queries.
+
+Usage: python -m duneapi.scheduler scheduler.json
+
+Example configuration (query entries take the same form as dashboard queries):
+{
+  "state_file": "./out/scheduler-state.json",
+  "max_concurrency": 4,
+  "dashboards": [
+    {
+      "config": "./example/dashboard/_config.json",
+      "interval": 3600,
+      "priority": 1,
+      "max_concurrency": 2
+    }
+  ],
+  "queries": [
+    {
+      "id": 1234,
+      "name": "Blocks",
+      "query_file": "./example/query.sql",
+      "network": "mainnet",
+      "interval": 600
+    }
+  ]
+}
+
+Due jobs are started in order of priority (highest first) while fewer than
+`max_concurrency` refreshes are running. A job whose previous refresh is still
+in flight skips its turn. A refresh is in flight until its query executions
+have finished (rather than merely been submitted). Start and finish times are
+persisted in `state_file`, so that a restarted scheduler keeps to the intervals.
+"""
+from __future__ import annotations
+
+import argparse
+import heapq
+import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from .api import DuneAPI
+from .dashboard import DuneDashboard
+from .logger import set_log
+from .types import DashboardTile, DuneQuery
+from .util import write_atomic
+
+log = set_log(__name__)
+
+
+@dataclass
+class ScheduledJob:
+    """A refresh action to be run every `interval` seconds"""
+
+    name: str
+    interval: float
+    action: Callable[[], None]
+    priority: int = 0
+    next_run: float = 0.0
+
+
+class Scheduler:
+    """Runs scheduled jobs, bounded by a global concurrency cap"""
+
+    def __init__(
+        self,
+        jobs: list[ScheduledJob],
+        max_concurrency: int = 4,
+        state_file: Optional[str] = None,
+    ):
+        self.jobs = {job.name: job for job in jobs}
+        self.max_concurrency = max_concurrency
+        self.state_file = state_file
+        self.state: dict[str, dict[str, Any]] = self._load_state()
+        for job in jobs:
+            last_started = self.state.get(job.name, {}).get("last_started")
+            if last_started is not None:
+                job.next_run = last_started + job.interval
+        self._lock = threading.Lock()
+        self._running: dict[str, Future[None]] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+
+    def _load_state(self) -> dict[str, dict[str, Any]]:
+        if self.state_file is None:
+            return {}
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as state_file:
+                state: dict[str, dict[str, Any]] = json.load(state_file)
+                return state
+        except FileNotFoundError:
+            return {}
+
+    def _record(self, job: ScheduledJob, started: float, status: str) -> None:
+        with self._lock:
+            self.state[job.name] = {
+                "last_started": started,
+                "last_finished": time.time(),
+                "status": status,
+            }
+            if self.state_file is not None:
+                write_atomic(self.state_file, json.dumps(self.state, indent=2))
+
+    def _run(self, job: ScheduledJob) -> None:
+        started = time.time()
+        log.info(f"Refreshing {job.name}")
+        try:
+            job.action()
+        except Exception as err:  # pylint: disable=broad-except
+            log.error(f"Refresh of {job.name} failed with {err}")
+            self._record(job, started, "failed")
+            return
+        log.info(f"Refreshed {job.name} in {time.time() - started:.1f} seconds")
+        self._record(job, started, "ok")
+
+    def running(self) -> list[str]:
+        """Names of jobs currently in flight"""
+        with self._lock:
+            self._running = {
+                name: future
+                for name, future in self._running.items()
+                if not future.done()
+            }
+            return list(self._running)
+
+    def tick(self, now: Optional[float] = None) -> list[str]:
+        """
+        Starts due jobs (by priority) while capacity remains.
+        :return: names of the started jobs
+        """
+        now = time.time() if now is None else now
+        running = self.running()
+        due = []
+        for job in self.jobs.values():
+            if job.next_run > now:
+                continue
+            if job.name in running:
+                log.info(f"Skipping {job.name}, previous refresh still in flight")
+                job.next_run = now + job.interval
+                continue
+            due.append((-job.priority, job.next_run, job.name))
+        heapq.heapify(due)
+
+        started: list[str] = []
+        while due and len(running) + len(started) < self.max_concurrency:
+            job = self.jobs[heapq.heappop(due)[2]]
+            job.next_run = now + job.interval
+            with self._lock:
+                self._running[job.name] = self._executor.submit(self._run, job)
+            started.append(job.name)
+        return started
+
+    def run_forever(self, poll_interval: float = 1.0) -> None:
+        """Starts due jobs every `poll_interval` seconds until interrupted"""
+        try:
+            while True:
+                self.tick()
+                time.sleep(poll_interval)
+        finally:
+            self.shutdown()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stops starting jobs, waiting for running jobs when `wait`"""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    @classmethod
+    def from_config(cls, api: DuneAPI, config: dict[str, Any]) -> Scheduler:
+        """Constructs scheduler from configuration (see module documentation)"""
+        jobs = []
+        for entry in config.get("dashboards", []):
+            dashboard = DuneDashboard.from_file(api, entry["config"])
+            workers = int(entry.get("max_concurrency", 1))
+
+            def update(
+                board: DuneDashboard = dashboard, max_workers: int = workers
+            ) -> None:
+                board.update(max_workers=max_workers, wait=True)
+
+            jobs.append(
+                ScheduledJob(
+                    name=entry.get("name", dashboard.slug),
+                    interval=float(entry["interval"]),
+                    priority=int(entry.get("priority", 0)),
+                    action=update,
+                )
+            )
+        for entry in config.get("queries", []):
+            query = DuneQuery.from_tile(
+                DashboardTile.from_dict(entry, entry.get("query_path", "."))
+            )
+
+            def refresh(refreshed: DuneQuery = query) -> None:
+                api.initiate_query(refreshed)
+                api.await_job(api.execute_query(refreshed))
+
+            jobs.append(
+                ScheduledJob(
+                    name=entry.get("name", f"query-{query.query_id}"),
+                    interval=float(entry["interval"]),
+                    priority=int(entry.get("priority", 0)),
+                    action=refresh,
+                )
+            )
+        return cls(
+            jobs=jobs,
+            max_concurrency=int(config.get("max_concurrency", 4)),
+            state_file=config.get("state_file"),
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Periodically refresh Dune dashboards and queries"
+    )
+    parser.add_argument("config", type=str, help="Scheduler configuration file")
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=5.0,
+        help="Seconds between checks for due refreshes",
+    )
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="Start all due refreshes, wait for them to finish and exit",
+    )
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as config_file:
+        scheduler_config = json.load(config_file)
+    scheduler = Scheduler.from_config(
+        DuneAPI.new_from_environment(thread_safe=True), scheduler_config
+    )
+    if args.once:
+        scheduler.tick()
+        scheduler.shutdown()
+    else:
+        scheduler.run_forever(args.poll_interval)
@@ -0,0 +1,287 @@
+"""
+Column type inference for query results.
+
+Dune returns values as JSON scalars or strings, and MetaData.columns only
+names the columns. A ResultSchema infers a Python type per column from a
+sample of records once, and then converts all records in a single pass.
+Columns with values (outside the sample) their type does not accept are
+widened, rather than failing the conversion. Inferred schemas are cached by
+query (SQL), so that later fetches skip inference.
+"""
+from __future__ import annotations
+
+import json
+import re
+import threading
+from dataclasses import dataclass
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Optional, Sequence
+
+from .logger import set_log
+from .types import DuneQuery, DuneRecord
+from .util import content_hash, parse_iso_datetime, read_json_file, write_atomic
+
+log = set_log(__name__)
+
+# Numeric strings with leading zeros (e.g. zip codes or ids) are not numbers
+INTEGER = re.compile(r"-?(0|[1-9]\d*)")
+NUMERIC = re.compile(r"-?(0|[1-9]\d*)(\.\d+)?([eE][-+]?\d+)?")
+TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2}")
+ADDRESS = re.compile(r"0x[0-9a-fA-F]{40}")
+INT64 = range(-(2**63), 2**63)
+
+
+def _is_timestamp(value: Any) -> bool:
+    if not isinstance(value, str) or not TIMESTAMP.match(value):
+        return False
+    try:
+        parse_iso_datetime(value)
+    except ValueError:
+        return False
+    return True
+
+
+class ColumnType(Enum):
+    """
+    Python types of result columns, in order of inference:
+    the first type matching all sampled values of a column is chosen.
+    """
+
+    BOOL = "bool"
+    INT = "int"
+    BIG_INT = "bigint"
+    FLOAT = "float"
+    DECIMAL = "decimal"
+    TIMESTAMP = "timestamp"
+    ADDRESS = "address"
+    STRING = "string"
+
+    # pylint: disable=too-many-return-statements
+    def matches(self, value: Any) -> bool:
+        """Whether (non null) value can be converted to this type"""
+        number = isinstance(value, (int, float)) and not isinstance(value, bool)
+        match self:
+            case ColumnType.BOOL:
+                return isinstance(value, bool)
+            case ColumnType.INT:
+                return number and isinstance(value, int) and value in INT64
+            case ColumnType.BIG_INT:
+                if isinstance(value, str):
+                    return INTEGER.fullmatch(value) is not None
+                return number and isinstance(value, int)
+            case ColumnType.FLOAT:
+                return number
+            case ColumnType.DECIMAL:
+                if isinstance(value, str):
+                    return NUMERIC.fullmatch(value) is not None
+                return number
+            case ColumnType.TIMESTAMP:
+                return _is_timestamp(value)
+            case ColumnType.ADDRESS:
+                return isinstance(value, str) and ADDRESS.fullmatch(value) is not None
+        return True
+
+    def accepts(self, value: Any) -> bool:
+        """
+        Whether (non null) value converts to this type: values it matches and,
+        for floats, numeric strings (so that decimal columns can be overridden)
+        """
+        if self is ColumnType.FLOAT:
+            return ColumnType.DECIMAL.matches(value)
+        return self.matches(value)
+
+    def convert(self, value: Any) -> Any:
+        """
+        Converts (non null) value to this type. Raises ValueError for values
+        which do not match it (e.g. values outside the inferred sample).
+        """
+        if not self.accepts(value):
+            raise ValueError(f"{value!r} is not {self.value}")
+        match self:
+            case ColumnType.BOOL:
+                return bool(value)
+            case ColumnType.INT | ColumnType.BIG_INT:
+                return int(value)
+            case ColumnType.FLOAT:
+                return float(value)
+            case ColumnType.DECIMAL:
+                return Decimal(str(value))
+            case ColumnType.TIMESTAMP:
+                return parse_iso_datetime(value)
+            case ColumnType.ADDRESS:
+                return str(value).lower()
+        return value
+
+
+def infer_type(values: Sequence[Any]) -> ColumnType:
+    """Returns the first column type matching all (non null) values"""
+    values = [value for value in values if value is not None]
+    if not values:
+        return ColumnType.STRING
+    return next(
+        column_type
+        for column_type in ColumnType
+        if all(column_type.matches(value) for value in values)
+    )
+
+
+@dataclass
+class ResultSchema:
+    """Column types of a query result"""
+
+    types: dict[str, ColumnType]
+
+    @classmethod
+    def infer(
+        cls, records: Sequence[DuneRecord], sample_size: int = 100
+    ) -> ResultSchema:
+        """Infers column types from (at most) sample_size records spread over records"""
+        sample = records[:: max(len(records) // sample_size, 1)][:sample_size]
+        columns = dict.fromkeys(column for record in sample for column in record)
+        return cls(
+            {
+                column: infer_type([record.get(column) for record in sample])
+                for column in columns
+            }
+        )
+
+    def with_overrides(self, overrides: dict[str, ColumnType]) -> ResultSchema:
+        """Returns schema with the types of some columns replaced"""
+        return ResultSchema({**self.types, **overrides})
+
+    def widen(self, records: Sequence[DuneRecord]) -> ResultSchema:
+        """
+        Returns schema accepting all values of records: the types of columns
+        with values their type does not accept are inferred from all records
+        (falling back to STRING).
+        """
+        types = dict(self.types)
+        for column, column_type in self.types.items():
+            if column_type is ColumnType.STRING:
+                continue
+            values = [record.get(column) for record in records]
+            if all(value is None or column_type.accepts(value) for value in values):
+                continue
+            types[column] = infer_type(values)
+            log.warning(
+                f"Widening column {column} "
+                f"from {column_type.value} to {types[column].value}"
+            )
+        return ResultSchema(types)
+
+    def convert(self, records: Sequence[DuneRecord]) -> list[dict[str, Any]]:
+        """
+        Returns copies of records with their values converted to the column
+        types, widened where values do not match them (see widen).
+        """
+        return self.widen(records).convert_accepted(records)
+
+    def convert_accepted(self, records: Sequence[DuneRecord]) -> list[dict[str, Any]]:
+        """Like convert, for records whose values are all accepted by the schema"""
+        converters = [
+            (column, column_type.convert)
+            for column, column_type in self.types.items()
+            if column_type is not ColumnType.STRING
+        ]
+        converted = []
+        for record in records:
+            values = dict(record)
+            for column, convert in converters:
+                value = values.get(column)
+                if value is not None:
+                    values[column] = convert(value)
+            converted.append(values)
+        return converted
+
+    def to_dict(self) -> dict[str, str]:
+        """Serializable form of the schema"""
+        return {column: column_type.value for column, column_type in self.types.items()}
+
+    @classmethod
+    def from_dict(cls, obj: dict[str, str]) -> ResultSchema:
+        """Constructs schema from its serialized form"""
+        return cls({column: ColumnType(value) for column, value in obj.items()})
+
+
+def schema_key(query: DuneQuery) -> str:
+    """Key of the schema of query results (parameters do not change columns)"""
+    return content_hash(f"{query.network.value}:{query.raw_sql.strip()}")
+
+
+class SchemaCache:
+    """
+    Thread safe cache of inferred result schemas by query, kept in memory
+    only unless a (JSON) file path is provided.
+    """
+
+    def __init__(self, path: Optional[str] = None, sample_size: int = 100):
+        self.path = path
+        self.sample_size = sample_size
+        self._lock = threading.Lock()
+        self._schemas: dict[str, ResultSchema] = self._read()
+        self._dirty = False
+
+    def _read(self) -> dict[str, ResultSchema]:
+        try:
+            content = read_json_file(self.path) or {}
+            return {key: ResultSchema.from_dict(obj) for key, obj in content.items()}
+        except ValueError as err:
+            log.warning(f"Ignoring unreadable schema cache {self.path}: {err}")
+            return {}
+
+    def schema(
+        self,
+        query: DuneQuery,
+        records: Sequence[DuneRecord],
+        overrides: Optional[dict[str, ColumnType]] = None,
+    ) -> ResultSchema:
+        """
+        Returns the cached schema of query results, inferring it from records
+        when there is none (yet). Overrides replace inferred column types.
+        """
+        key = schema_key(query)
+        with self._lock:
+            schema = self._schemas.get(key)
+        if schema is None:
+            schema = ResultSchema.infer(records, self.sample_size)
+            log.debug(f"Inferred schema {schema.to_dict()} of {query.name}")
+            with self._lock:
+                self._schemas[key] = schema
+                self._dirty = True
+        return schema.with_overrides(overrides) if overrides else schema
+
+    def convert(
+        self,
+        query: DuneQuery,
+        records: Sequence[DuneRecord],
+        overrides: Optional[dict[str, ColumnType]] = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Returns copies of records converted to the (cached) schema of query.
+        Cached schemas widened to accept records are cached as such.
+        """
+        schema = self.schema(query, records)
+        widened = schema.widen(records)
+        if widened != schema:
+            with self._lock:
+                self._schemas[schema_key(query)] = widened
+                self._dirty = True
+        if overrides:
+            return widened.with_overrides(overrides).convert(records)
+        return widened.convert_accepted(records)
+
+    def forget(self, query: DuneQuery) -> None:
+        """Drops the cached schema of query (e.g. after changing its columns)"""
+        with self._lock:
+            if self._schemas.pop(schema_key(query), None) is not None:
+                self._dirty = True
+
+    def save(self) -> None:
+        """Persists cache (if it has a path and changed)"""
+        with self._lock:
+            if self.path is None or not self._dirty:
+                return
+            content = {key: schema.to_dict() for key, schema in self._schemas.items()}
+            write_atomic(self.path, json.dumps(content, indent=2))
+            self._dirty = False
@@ -0,0 +1,82 @@
+"""
+Single-flight de-duplication of concurrent, identical calls.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional, TypeVar, cast
+
+from .logger import set_log
+
+log = set_log(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class Flight:
+    """An in-flight (or recently completed) call"""
+
+    result: Future[Any] = field(default_factory=Future)
+    completed_at: Optional[float] = None
+
+
+# pylint: disable=too-few-public-methods
+class SingleFlight:
+    """
+    Coalesces concurrent calls sharing a key into a single execution:
+    the first caller executes, all others wait for and share its result.
+    Successful results are also shared with calls arriving within
+    `grace_period` seconds after completion. Failures are never shared
+    with later callers.
+    """
+
+    def __init__(self, grace_period: float = 0.0):
+        self.grace_period = grace_period
+        self._lock = threading.Lock()
+        self._flights: dict[str, Flight] = {}
+
+    def _join(self, key: str) -> tuple[Flight, bool]:
+        """
+        Returns the flight for key and whether the caller leads it
+        (caller must hold the lock)
+        """
+        flight = self._flights.get(key)
+        if flight is not None and (
+            flight.completed_at is None
+            or time.monotonic() - flight.completed_at < self.grace_period
+        ):
+            return flight, False
+        flight = Flight()
+        self._flights[key] = flight
+        return flight, True
+
+    def do(self, key: str, action: Callable[[], T]) -> T:
+        """
+        Executes action, unless a call with the same key is already in flight
+        (or completed within the grace period), in which case its result is shared.
+        Note that the same result object is returned to all callers.
+        """
+        with self._lock:
+            flight, leader = self._join(key)
+        if not leader:
+            log.debug(f"Joining in-flight call {key}")
+            return cast(T, flight.result.result())
+
+        try:
+            result = action()
+        except BaseException as err:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.result.set_exception(err)
+            raise
+        with self._lock:
+            if self.grace_period > 0:
+                flight.completed_at = time.monotonic()
+            else:
+                self._flights.pop(key, None)
+        flight.result.set_result(result)
+        return result
@@ -0,0 +1,85 @@
+"""
+Sharing of repeated string values in query results.
+
+Results repeat the same token symbols, addresses and labels in many rows, each
+decoded as a string of its own. A StringPool dictionary encodes such columns
+in place: equal values are replaced by one shared string object. Columns with
+mostly distinct values (e.g. transaction hashes) are detected and left alone.
+"""
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass, field
+from typing import Any
+
+from .types import DuneRecord
+
+
+@dataclass
+class ColumnPool:
+    """Distinct string values of a column and what sharing them saved"""
+
+    values: dict[str, str] = field(default_factory=dict)
+    seen: int = 0
+    shared: int = 0
+    saved_bytes: int = 0
+    enabled: bool = True
+
+
+class StringPool:
+    """
+    Shares equal string values per column, for columns in which (after
+    min_values strings) at most a max_ratio fraction of the values are distinct.
+    """
+
+    def __init__(self, max_ratio: float = 0.5, min_values: int = 1000):
+        self.max_ratio = max_ratio
+        self.min_values = min_values
+        self.columns: dict[str, ColumnPool] = {}
+
+    def share(self, column: str, value: Any) -> Any:
+        """Returns the shared string equal to value (or value itself)"""
+        if not isinstance(value, str):
+            return value
+        pool = self.columns.get(column)
+        if pool is None:
+            pool = self.columns[column] = ColumnPool()
+        if not pool.enabled:
+            return value
+        pool.seen += 1
+        shared = pool.values.setdefault(value, value)
+        if shared is not value:
+            pool.shared += 1
+            pool.saved_bytes += sys.getsizeof(value)
+        elif (
+            pool.seen >= self.min_values
+            and len(pool.values) > self.max_ratio * pool.seen
+        ):
+            # Mostly distinct values, which sharing would only keep alive.
+            pool.enabled, pool.values = False, {}
+        return shared
+
+    def share_record(self, record: DuneRecord) -> None:
+        """Replaces the string values of record by their shared equals"""
+        for column, value in record.items():
+            record[column] = self.share(column, value)
+
+    @property
+    def saved_bytes(self) -> int:
+        """Memory released by sharing (once the replaced strings are unreferenced)"""
+        return sum(pool.saved_bytes for pool in self.columns.values())
+
+    def report(self) -> str:
+        """Summary of the memory saved by column"""
+        shared = {
+            column: pool
+            for column, pool in self.columns.items()
+            if pool.enabled and pool.shared
+        }
+        if not shared:
+            return "No repeated strings shared"
+        details = ", ".join(
+            f"{column} ({len(pool.values)} distinct of {pool.seen})"
+            for column, pool in shared.items()
+        )
+        return f"Shared strings saved {self.saved_bytes / 2**20:.1f} MiB in {details}"
@@ -0,0 +1,159 @@
+"""
+Incremental synchronisation of append-only (block or time indexed) query results
+into a local SQLite store.
+
+The high-water mark of every (query, parameter set) is persisted next to the
+records and injected into the watermark parameter on the next run, so that only
+new rows are fetched. Records and watermark are written in a single transaction,
+so an interrupted sync never leaves the store ahead of (or behind) its watermark.
+"""
+from __future__ import annotations
+
+import json
+import sqlite3
+from dataclasses import replace
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from .api import DuneAPI
+from .logger import set_log
+from .types import DuneQuery, DuneRecord, ParameterType, QueryParameter
+from .util import json_default
+
+log = set_log(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS watermarks (
+    sync_key TEXT PRIMARY KEY,
+    query_id INTEGER NOT NULL,
+    watermark TEXT NOT NULL,
+    synced_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS records (
+    sync_key TEXT NOT NULL,
+    watermark TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_sync_key ON records (sync_key);
+"""
+
+
+def parse_watermark(value: Any, parameter_type: ParameterType) -> Any:
+    """
+    Parses a watermark column value (as returned by Dune) into a
+    comparable value accepted by a QueryParameter of `parameter_type`
+    """
+    match parameter_type:
+        case ParameterType.NUMBER:
+            if isinstance(value, (int, float)):
+                return value
+            return float(value) if "." in str(value) else int(value)
+        case ParameterType.DATE:
+            if isinstance(value, datetime):
+                return value.replace(tzinfo=None)
+            # Dune timestamps are UTC, parameters are given without timezone.
+            return datetime.fromisoformat(str(value)).replace(tzinfo=None)
+    raise ValueError(f"Unsupported watermark parameter type {parameter_type}")
+
+
+class IncrementalSync:
+    """Appends new rows of append-only queries to a local SQLite database"""
+
+    def __init__(self, api: DuneAPI, path: str):
+        """
+        :param api: client used to fetch query results
+        :param path: SQLite database file (created if missing)
+        """
+        self.api = api
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """Closes the underlying database connection"""
+        self.connection.close()
+
+    @staticmethod
+    def sync_key(query: DuneQuery, parameter: str) -> str:
+        """
+        Identifies (query, parameter set) excluding the watermark parameter.
+        The key is content based, so it is stable across (scratch) query ids.
+        """
+        others = [p for p in query.parameters if p.key != parameter]
+        return replace(query, parameters=others).fingerprint()
+
+    def watermark(self, query: DuneQuery, parameter: str) -> Optional[str]:
+        """Returns the persisted high-water mark for query (if any)"""
+        row = self.connection.execute(
+            "SELECT watermark FROM watermarks WHERE sync_key = ?",
+            (self.sync_key(query, parameter),),
+        ).fetchone()
+        return str(row[0]) if row else None
+
+    def sync(self, query: DuneQuery, column: str, parameter: str) -> int:
+        """
+        Fetches rows newer than the last watermark and appends them to the store.
+        :param query: append-only query, filtering rows on `parameter`
+            e.g. `where number > '{{MinBlock}}'`
+        :param column: result column holding the watermark (e.g. number or time)
+        :param parameter: name of the (number or date) query parameter into which
+            the watermark is injected. Its value is used for the first sync.
+        :return: number of appended records
+        """
+        watermark_parameter = next(p for p in query.parameters if p.key == parameter)
+        parameter_type = watermark_parameter.type
+        key = self.sync_key(query, parameter)
+
+        stored = self.watermark(query, parameter)
+        mark = None if stored is None else parse_watermark(stored, parameter_type)
+        if mark is not None:
+            query = replace(
+                query,
+                parameters=[
+                    QueryParameter(parameter, parameter_type, mark)
+                    if p.key == parameter
+                    else p
+                    for p in query.parameters
+                ],
+            )
+        log.info(f"Syncing {query.name} from {parameter}={stored}")
+        records = self.api.fetch(query)
+
+        new_records = []
+        for record in records:
+            value = parse_watermark(record[column], parameter_type)
+            # Guard against inclusive filters re-delivering the last rows.
+            if mark is None or value > mark:
+                new_records.append((value, record))
+        if not new_records:
+            log.info(f"No new records for {query.name}")
+            return 0
+
+        high = max(value for value, _ in new_records)
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO records (sync_key, watermark, record) VALUES (?, ?, ?)",
+                [
+                    (key, str(value), json.dumps(record, default=json_default))
+                    for value, record in new_records
+                ],
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO watermarks "
+                "(sync_key, query_id, watermark, synced_at) VALUES (?, ?, ?, ?)",
+                (
+                    key,
+                    query.query_id,
+                    str(high),
+                    datetime.now(timezone.utc).isoformat(),
+                ),
+            )
+        log.info(f"Appended {len(new_records)} records up to {parameter}={high}")
+        return len(new_records)
+
+    def records(self, query: DuneQuery, parameter: str) -> list[DuneRecord]:
+        """Returns all locally stored records for query (in insertion order)"""
+        rows = self.connection.execute(
+            "SELECT record FROM records WHERE sync_key = ? ORDER BY rowid",
+            (self.sync_key(query, parameter),),
+        )
+        return [json.loads(row[0]) for row in rows]
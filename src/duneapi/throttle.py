@@ -0,0 +1,228 @@
+"""
+Client side throttling of Dune requests.
+
+A token bucket rate limiter (per operation type) keeps bursts of workers from
+being throttled by Dune all at once, and a circuit breaker fails fast for a
+cool-down period after repeated throttling or server errors, rather than
+letting every worker retry at the same moment.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None  # type: ignore
+
+from .logger import set_log
+
+log = set_log(__name__)
+
+
+class TokenBucket:
+    """
+    Thread safe token bucket, refilled at `rate` tokens per second
+    and holding at most `capacity` tokens (i.e. the maximum burst).
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError(f"Invalid rate {rate}")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _take(self, tokens: float) -> float:
+        """
+        Takes tokens if available (caller must hold the lock)
+        :return: 0 if tokens were taken, otherwise seconds until they will be
+        """
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return 0.0
+        return (tokens - self._tokens) / self.rate
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """
+        Attempts to take tokens without waiting.
+        :return: 0 if tokens were taken, otherwise seconds until they will be
+        """
+        with self._lock:
+            return self._take(tokens)
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """Takes tokens, waiting for them to become available"""
+        if tokens > self.capacity:
+            raise ValueError(f"Can not acquire {tokens} of {self.capacity} tokens")
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0:
+                return
+            log.debug(f"Rate limited, waiting {wait:.3f} seconds")
+            time.sleep(wait)
+
+
+class FileTokenBucket(TokenBucket):
+    """
+    Token bucket whose state lives in a (locked) local file,
+    so that it is shared by every process using the same path.
+    """
+
+    def __init__(self, path: str, rate: float, capacity: Optional[float] = None):
+        if fcntl is None:
+            raise NotImplementedError("FileTokenBucket requires fcntl (POSIX)")
+        super().__init__(rate, capacity)
+        self.path = path
+
+    def _take(self, tokens: float) -> float:
+        with open(self.path, "a+", encoding="utf-8") as state_file:
+            fcntl.flock(state_file, fcntl.LOCK_EX)
+            try:
+                state_file.seek(0)
+                try:
+                    state = json.loads(state_file.read())
+                    self._tokens, self._updated = state["tokens"], state["updated"]
+                except (ValueError, KeyError):
+                    self._tokens, self._updated = self.capacity, time.time()
+                # Wall clock, since monotonic clocks are not shared by processes.
+                now = time.time()
+                self._tokens = min(
+                    self.capacity,
+                    self._tokens + max(now - self._updated, 0) * self.rate,
+                )
+                self._updated = now
+                wait = 0.0
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                else:
+                    wait = (tokens - self._tokens) / self.rate
+                state_file.seek(0)
+                state_file.truncate()
+                state_file.write(
+                    json.dumps({"tokens": self._tokens, "updated": self._updated})
+                )
+                state_file.flush()
+                os.fsync(state_file.fileno())
+            finally:
+                fcntl.flock(state_file, fcntl.LOCK_UN)
+        return wait
+
+
+# pylint: disable=too-few-public-methods
+class RateLimiter:
+    """
+    Token buckets per operation type (i.e. the operationName of a request).
+    Operations without a bucket of their own share the default bucket.
+    """
+
+    def __init__(
+        self,
+        default: Optional[TokenBucket] = None,
+        operations: Optional[dict[str, TokenBucket]] = None,
+    ):
+        self.default = default
+        self.operations = operations if operations is not None else {}
+
+    def acquire(self, operation: str) -> None:
+        """Waits until a request of type `operation` may be sent"""
+        bucket = self.operations.get(operation, self.default)
+        if bucket is not None:
+            bucket.acquire()
+
+
+class CircuitOpenError(Exception):
+    """Raised, without making a request, while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures (429 or 5xx responses
+    and transport errors) and rejects all requests for `cooldown` seconds.
+    Afterwards a single trial request is let through: success closes the
+    circuit again, whereas failure re-opens it for another cool-down.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._state = self.CLOSED
+
+    @property
+    def state(self) -> str:
+        """One of closed, open or half-open"""
+        with self._lock:
+            return self._state
+
+    def before_request(self) -> None:
+        """Raises CircuitOpenError if requests are currently rejected"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            remaining = self._opened_at + self.cooldown - time.monotonic()
+            if self._state == self.OPEN and remaining <= 0:
+                # Let this request through as the trial.
+                self._state = self.HALF_OPEN
+                return
+            raise CircuitOpenError(
+                f"Circuit open after {self._failures} failures, "
+                f"cooling down for {max(remaining, 0):.1f} more seconds"
+            )
+
+    def record_success(self) -> None:
+        """Closes the circuit"""
+        with self._lock:
+            self._failures = 0
+            self._state = self.CLOSED
+
+    def record_failure(self) -> None:
+        """Counts a failure, opening the circuit when the threshold is reached"""
+        with self._lock:
+            self._failures += 1
+            if (
+                self._state == self.HALF_OPEN
+                or self._failures >= self.failure_threshold
+            ):
+                if self._state != self.OPEN:
+                    log.warning(f"Opening circuit after {self._failures} failures")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def end_trial(self) -> None:
+        """
+        Ends a half-open trial without counting its outcome (e.g. a request
+        failing locally), so that the next request is let through as trial
+        """
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._state = self.OPEN
+
+    @staticmethod
+    def is_failure(status_code: int) -> bool:
+        """Whether a response status code counts as failure"""
+        return status_code == 429 or status_code >= 500
+
+    def record(self, status_code: int) -> None:
+        """Records the outcome of a request by its response status code"""
+        if self.is_failure(status_code):
+            self.record_failure()
+        else:
+            self.record_success()
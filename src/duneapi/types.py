@@ -6,18 +6,26 @@ All operations/routes available for interaction with Dune API - looks like graph
 """
 from __future__ import annotations
 
+import hashlib
 import json
 import os
 import re
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from datetime import datetime
 from enum import Enum
 from typing import Any, Collection, Optional
 
 from dotenv import load_dotenv
 
+from .constants import (
+    EXECUTE_QUERY_FIELD,
+    UPSERT_QUERY_FIELD,
+    UPSERT_QUERY_FRAGMENTS,
+    UPSERT_QUERY_KEYS,
+    UPSERT_QUERY_SELECTION,
+)
 from .logger import set_log
-from .util import datetime_parser, open_query, postgres_date
+from .util import datetime_parser, open_query, postgres_date, split_range
 
 log = set_log(__name__)
 
@@ -31,6 +39,11 @@ DictInnerResponse = dict[str, dict[str, Any]]
 DuneRecord = dict[str, str]
 
 
+def batch_alias(index: int) -> str:
+    """Response key of the index-th operation combined into a single post"""
+    return f"q{index}"
+
+
 # pylint: disable=too-few-public-methods
 # TODO - use namedtuple for MetaData and QueryResults
 class MetaData:
@@ -357,11 +370,98 @@ class DuneQuery:
             query_id=tile.query_id,
         )
 
+    def _wrapped(self, select: str, clause: str = "") -> DuneQuery:
+        """Copy of query selecting from (the result of) raw_sql as subquery"""
+        inner = self.raw_sql.strip().rstrip(";").rstrip()
+        # The newline ends any trailing line comment of the inner query.
+        return replace(
+            self, raw_sql=f"select {select} from (\n{inner}\n) as subquery{clause}"
+        )
+
+    def select(self, columns: list[str]) -> DuneQuery:
+        """Copy of query returning only the given (result) columns"""
+        if not columns:
+            raise ValueError("Projection requires at least one column")
+        quoted = ", ".join('"' + column.replace('"', '""') + '"' for column in columns)
+        return self._wrapped(quoted)
+
+    def where(self, condition: str) -> DuneQuery:
+        """
+        Copy of query returning only rows satisfying condition,
+        an SQL expression over the result columns (e.g. "value > 0")
+        """
+        return self._wrapped("*", f"\nwhere {condition}")
+
+    def limit(self, rows: int) -> DuneQuery:
+        """Copy of query returning at most `rows` rows"""
+        if rows < 0:
+            raise ValueError(f"Invalid limit {rows}")
+        return self._wrapped("*", f"\nlimit {int(rows)}")
+
+    def fingerprint(self) -> str:
+        """
+        Canonical hash of the query content (raw_sql, network and parameters).
+        Name, description and query_id are not considered.
+        """
+        content = json.dumps(
+            {
+                "raw_sql": self.raw_sql,
+                "network": self.network.value,
+                "parameters": sorted(
+                    self._request_parameters(), key=lambda p: p["key"]
+                ),
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def partition(
+        self, start_key: str, end_key: str, partitions: int
+    ) -> list[DuneQuery]:
+        """
+        Splits query into copies covering contiguous sub-ranges of the range
+        between its `start_key` and `end_key` parameters (date or number type).
+        Integer ranges are inclusive (as selected by `between`) and split into
+        disjoint inclusive sub-ranges, e.g. [1, 5] into [1, 2] and [3, 5].
+        Date (and fractional number) ranges are half-open: neighbouring
+        sub-ranges share their boundary, so the query must select >= start
+        and < end to avoid duplicate records.
+        """
+        params = {p.key: p for p in self.parameters}
+        start, end = params[start_key], params[end_key]
+        if start.type != end.type or start.type not in {
+            ParameterType.DATE,
+            ParameterType.NUMBER,
+        }:
+            raise ValueError(
+                f"Can not partition range of types {start.type} and {end.type}"
+            )
+        inclusive = isinstance(start.value, int) and isinstance(end.value, int)
+        if inclusive:
+            ranges = [
+                (lower, upper - 1)
+                for lower, upper in split_range(start.value, end.value + 1, partitions)
+            ]
+        else:
+            ranges = split_range(start.value, end.value, partitions)
+        partitioned = []
+        for lower, upper in ranges:
+            bounds = {
+                start.key: QueryParameter(start.key, start.type, lower),
+                end.key: QueryParameter(end.key, end.type, upper),
+            }
+            partitioned.append(
+                replace(
+                    self, parameters=[bounds.get(p.key, p) for p in self.parameters]
+                )
+            )
+        return partitioned
+
     def _request_parameters(self) -> list[dict[str, str]]:
         return [p.to_dict() for p in self.parameters]
 
-    def upsert_query_post(self) -> Post:
-        """Returns json data for a post of type UpsertQuery"""
+    def upsert_variables(self) -> dict[str, Any]:
+        """Variables (object and on_conflict) of an UpsertQuery mutation"""
         object_data: dict[str, Any] = {
             "id": self.query_id,
             "schedule": None,
@@ -382,131 +482,74 @@ class DuneQuery:
                 },
             },
         }
-        key_map = {
-            "insert_queries_one": {
-                "id",
-                "dataset_id",
-                "name",
-                "description",
-                "query",
-                "is_private",
-                "is_temp",
-                "is_archived",
-                "created_at",
-                "updated_at",
-                "schedule",
-                "tags",
-                "parameters",
-                "visualizations",
-                "forked_query",
-                "user",
-                "query_favorite_count_all",
-                "favorite_queries",
-            }
+        return {
+            "object": object_data,
+            "on_conflict": {
+                "constraint": "queries_pkey",
+                "update_columns": [
+                    "dataset_id",
+                    "name",
+                    "description",
+                    "query",
+                    "schedule",
+                    "is_archived",
+                    "is_temp",
+                    "tags",
+                    "parameters",
+                ],
+            },
+        }
+
+    def upsert_query_post(self) -> Post:
+        """Returns json data for a post of type UpsertQuery"""
+        return self._upsert_post([self], batched=False)
+
+    @classmethod
+    def upsert_queries_post(cls, queries: list[DuneQuery]) -> Post:
+        """
+        Returns json data for a single post upserting all queries.
+        The result of the i-th query is aliased as batch_alias(i).
+        """
+        return cls._upsert_post(queries, batched=True)
+
+    @staticmethod
+    def _upsert_post(queries: list[DuneQuery], batched: bool) -> Post:
+        variables: dict[str, Any] = {
+            "session_id": 0,  # must be an int, but value is irrelevant
         }
+        definitions = [
+            "$session_id: Int!",
+            "$favs_last_24h: Boolean! = false",
+            "$favs_last_7d: Boolean! = false",
+            "$favs_last_30d: Boolean! = false",
+            "$favs_all_time: Boolean! = true",
+        ]
+        fields, key_map = [], {}
+        for i, query in enumerate(queries):
+            key, suffix = (batch_alias(i), str(i)) if batched else ("", "")
+            for name, value in query.upsert_variables().items():
+                variables[name + suffix] = value
+            definitions += [
+                f"$object{suffix}: queries_insert_input!",
+                f"$on_conflict{suffix}: queries_on_conflict!",
+            ]
+            fields.append(
+                (f"{key}: " if batched else "")
+                + f"{UPSERT_QUERY_FIELD}(object: $object{suffix}, "
+                + f"on_conflict: $on_conflict{suffix}) {UPSERT_QUERY_SELECTION}"
+            )
+            key_map[key or UPSERT_QUERY_FIELD] = set(UPSERT_QUERY_KEYS)
+        operation = "UpsertQueries" if batched else "UpsertQuery"
         return Post(
             data={
-                "operationName": "UpsertQuery",
-                "variables": {
-                    "object": object_data,
-                    "on_conflict": {
-                        "constraint": "queries_pkey",
-                        "update_columns": [
-                            "dataset_id",
-                            "name",
-                            "description",
-                            "query",
-                            "schedule",
-                            "is_archived",
-                            "is_temp",
-                            "tags",
-                            "parameters",
-                        ],
-                    },
-                    "session_id": 0,  # must be an int, but value is irrelevant
-                },
-                "query": """
-                mutation UpsertQuery(
-                  $session_id: Int!
-                  $object: queries_insert_input!
-                  $on_conflict: queries_on_conflict!
-                  $favs_last_24h: Boolean! = false
-                  $favs_last_7d: Boolean! = false
-                  $favs_last_30d: Boolean! = false
-                  $favs_all_time: Boolean! = true
-                ) {
-                  insert_queries_one(object: $object, on_conflict: $on_conflict) {
-                    ...Query
-                    favorite_queries(where: { user_id: { _eq: $session_id } }, limit: 1) {
-                      created_at
-                    }
-                  }
-                }
-                fragment Query on queries {
-                  ...BaseQuery
-                  ...QueryVisualizations
-                  ...QueryForked
-                  ...QueryUsers
-                  ...QueryFavorites
-                }
-                fragment BaseQuery on queries {
-                  id
-                  dataset_id
-                  name
-                  description
-                  query
-                  is_private
-                  is_temp
-                  is_archived
-                  created_at
-                  updated_at
-                  schedule
-                  tags
-                  parameters
-                }
-                fragment QueryVisualizations on queries {
-                  visualizations {
-                    id
-                    type
-                    name
-                    options
-                    created_at
-                  }
-                }
-                fragment QueryForked on queries {
-                  forked_query {
-                    id
-                    name
-                    user {
-                      name
-                    }
-                  }
-                }
-                fragment QueryUsers on queries {
-                  user {
-                    ...User
-                  }
-                }
-                fragment User on users {
-                  id
-                  name
-                  profile_image_url
-                }
-                fragment QueryFavorites on queries {
-                  query_favorite_count_all @include(if: $favs_all_time) {
-                    favorite_count
-                  }
-                  query_favorite_count_last_24h @include(if: $favs_last_24h) {
-                    favorite_count
-                  }
-                  query_favorite_count_last_7d @include(if: $favs_last_7d) {
-                    favorite_count
-                  }
-                  query_favorite_count_last_30d @include(if: $favs_last_30d) {
-                    favorite_count
-                  }
-                }
-                """,
+                "operationName": operation,
+                "variables": variables,
+                "query": f"mutation {operation}(\n  "
+                + "\n  ".join(definitions)
+                + "\n) {\n"
+                + "\n".join(fields)
+                + "\n}\n"
+                + UPSERT_QUERY_FRAGMENTS,
             },
             key_map=key_map,
         )
@@ -564,6 +607,32 @@ class DuneQuery:
             },
         )
 
+    @staticmethod
+    def get_result_post(query_id: int, parameters: list[QueryParameter]) -> Post:
+        """Returns json data for a post of type GetResult
+        This refers to the most recent execution of query_id with parameters.
+        """
+        query = """
+        query GetResult($query_id: Int!, $parameters: [Parameter!]) {
+          get_result_v2(query_id: $query_id, parameters: $parameters) {
+            job_id
+            result_id
+            error_id
+          }
+        }
+        """
+        return Post(
+            data={
+                "operationName": "GetResult",
+                "variables": {
+                    "query_id": query_id,
+                    "parameters": [p.to_dict() for p in parameters],
+                },
+                "query": query,
+            },
+            key_map={"get_result_v2": {"job_id", "result_id", "error_id"}},
+        )
+
     @staticmethod
     def get_queue_position(job_id: str) -> Post:
         """Returns json data for a post of type GetQueuePosition
@@ -594,21 +663,44 @@ class DuneQuery:
 
     def execute_query_post(self) -> Post:
         """Returns json data for a post of type ExecuteQuery"""
-        query = """
-        mutation ExecuteQuery($query_id: Int!, $parameters: [Parameter!]!) {
-          execute_query(query_id: $query_id, parameters: $parameters) {
-            job_id
-          }
-        }
+        return self._execute_post([self], batched=False)
+
+    @classmethod
+    def execute_queries_post(cls, queries: list[DuneQuery]) -> Post:
         """
+        Returns json data for a single post executing all queries.
+        The job of the i-th query is aliased as batch_alias(i).
+        """
+        return cls._execute_post(queries, batched=True)
+
+    @staticmethod
+    def _execute_post(queries: list[DuneQuery], batched: bool) -> Post:
+        variables: dict[str, Any] = {}
+        definitions, fields, key_map = [], [], {}
+        for i, query in enumerate(queries):
+            key, suffix = (batch_alias(i), str(i)) if batched else ("", "")
+            variables[f"query_id{suffix}"] = query.query_id
+            variables[f"parameters{suffix}"] = [p.to_dict() for p in query.parameters]
+            definitions += [
+                f"$query_id{suffix}: Int!",
+                f"$parameters{suffix}: [Parameter!]!",
+            ]
+            fields.append(
+                (f"{key}: " if batched else "")
+                + f"{EXECUTE_QUERY_FIELD}(query_id: $query_id{suffix}, "
+                + f"parameters: $parameters{suffix}) {{ job_id }}"
+            )
+            key_map[key or EXECUTE_QUERY_FIELD] = {"job_id"}
+        operation = "ExecuteQueries" if batched else "ExecuteQuery"
         return Post(
             data={
-                "operationName": "ExecuteQuery",
-                "variables": {
-                    "query_id": self.query_id,
-                    "parameters": [p.to_dict() for p in self.parameters],
-                },
-                "query": query,
+                "operationName": operation,
+                "variables": variables,
+                "query": f"mutation {operation}("
+                + ", ".join(definitions)
+                + ") {\n"
+                + "\n".join(fields)
+                + "\n}\n",
             },
-            key_map={"execute_query": {"job_id"}},
+            key_map=key_map,
         )
@@ -1,9 +1,23 @@
 """Utility methods to support Dune API"""
+import base64
+import binascii
 import collections
+import collections.abc
+import hashlib
+import json
+import os
+import re
+import uuid
 from datetime import datetime
-from typing import Any, Hashable
+from typing import Any, Hashable, Optional, TypeVar
+
+RangeValue = TypeVar("RangeValue", int, float, datetime)
 
 DUNE_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Fractional seconds of ISO timestamps
+ISO_FRACTION = re.compile(r"\.(\d+)")
+# Content hashes of the files written by sync_files
+MANIFEST_FILE = "_manifest.json"
 
 
 def postgres_date(date_str: str) -> datetime:
@@ -11,6 +25,20 @@ def postgres_date(date_str: str) -> datetime:
     return datetime.strptime(date_str, DUNE_DATE_FORMAT)
 
 
+def parse_iso_datetime(value: str) -> datetime:
+    """
+    Parses ISO timestamps (as returned by Dune, e.g. 2022-03-10T23:50:16.12+00:00).
+    Unlike datetime.fromisoformat (before Python 3.11), this accepts a Z suffix
+    and fractional seconds of any length (postgres drops trailing zeros).
+    """
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    value = ISO_FRACTION.sub(
+        lambda match: "." + match.group(1)[:6].ljust(6, "0"), value, count=1
+    )
+    return datetime.fromisoformat(value)
+
+
 def datetime_parser(dct: dict[str, Any]) -> dict[str, Any]:
     """
     Used as object hook in json loads method to parse postgres dates strings
@@ -33,3 +61,150 @@ def open_query(filepath: str) -> str:
 def duplicates(arr: list[Hashable]) -> list[Hashable]:
     """Detects and returns duplicates in array"""
     return [item for item, count in collections.Counter(arr).items() if count > 1]
+
+
+def split_range(
+    start: RangeValue, end: RangeValue, partitions: int
+) -> list[tuple[RangeValue, RangeValue]]:
+    """
+    Splits the range [start, end) into (at most) `partitions` contiguous,
+    non-empty sub-ranges of (roughly) equal size.
+    Integer ranges are split on integer boundaries.
+    """
+    if partitions < 1:
+        raise ValueError(f"Invalid number of partitions {partitions}")
+    if not start < end:
+        raise ValueError(f"Invalid range [{start}, {end})")
+    boundaries: list[RangeValue] = []
+    for i in range(partitions + 1):
+        if isinstance(start, int) and isinstance(end, int):
+            boundary: Any = start + (end - start) * i // partitions
+        else:
+            boundary = start + (end - start) * i / partitions
+        if not boundaries or boundary != boundaries[-1]:
+            boundaries.append(boundary)
+    return list(zip(boundaries, boundaries[1:]))
+
+
+def write_atomic(filepath: str, content: str, mode: Optional[int] = None) -> None:
+    """
+    Writes `content` to `filepath` by way of a temporary file in the same
+    directory, so that readers never observe a partially written file.
+    When `mode` is provided, the file is created with those permissions,
+    otherwise the permissions of an existing file are kept (and new files
+    are created as by open, i.e. 0o666 less the umask).
+    """
+    directory = os.path.dirname(filepath) or "."
+    os.makedirs(directory, exist_ok=True)
+    if mode is None:
+        try:
+            mode = os.stat(filepath).st_mode & 0o7777
+        except FileNotFoundError:
+            pass
+    tmp_path = os.path.join(directory, f".tmp-{uuid.uuid4().hex}")
+    file_descriptor = os.open(
+        tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666 if mode is None else mode
+    )
+    try:
+        with os.fdopen(file_descriptor, "w", encoding="utf-8") as tmp_file:
+            tmp_file.write(content)
+        if mode is not None:
+            # The umask may have removed some of the requested permissions.
+            os.chmod(tmp_path, mode)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def token_expiry(token: str) -> Optional[float]:
+    """Expiry (unix) time of a JSON web token, or None if it does not state one"""
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(
+            base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4))
+        )
+        return float(claims["exp"])
+    except (IndexError, KeyError, TypeError, ValueError, binascii.Error):
+        return None
+
+
+def json_default(obj: Any) -> Any:
+    """
+    Encodes values json does not (e.g. in json.dumps(record, default=json_default)):
+    mappings which are not dicts (such as rows) as objects, anything else as string
+    """
+    if isinstance(obj, collections.abc.Mapping):
+        return dict(obj)
+    return str(obj)
+
+
+def read_json_file(filepath: Optional[str]) -> Any:
+    """
+    Returns the decoded content of the JSON file at `filepath`, or None
+    when there is no such file. Raises ValueError for invalid content.
+    """
+    if filepath is None:
+        return None
+    try:
+        with open(filepath, "r", encoding="utf-8") as json_file:
+            return json.load(json_file)
+    except FileNotFoundError:
+        return None
+
+
+def topological_waves(dependencies: dict[int, set[int]]) -> list[list[int]]:
+    """
+    Orders nodes into waves (Kahn's algorithm), such that every node comes in
+    a later wave than all of the nodes it depends on. Nodes of the same wave
+    are independent of one another.
+    :param dependencies: node -> nodes it depends on (all of which must be keys)
+    """
+    remaining = {node: set(required) for node, required in dependencies.items()}
+    waves = []
+    while remaining:
+        wave = sorted(node for node, required in remaining.items() if not required)
+        if not wave:
+            raise ValueError(f"Dependency cycle among {sorted(remaining)}")
+        for node in wave:
+            del remaining[node]
+        for required in remaining.values():
+            required.difference_update(wave)
+        waves.append(wave)
+    return waves
+
+
+def content_hash(content: str) -> str:
+    """Hex encoded sha256 hash of content"""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def sync_files(directory: str, files: dict[str, str]) -> list[str]:
+    """
+    Makes `directory` contain `files` (name -> content), writing only files whose
+    content hash differs from the one recorded by the previous sync in the
+    directory's manifest. Files recorded in the manifest but no longer among
+    `files` are removed. Other files in `directory` are left untouched.
+    :return: paths of the files written
+    """
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+            manifest: dict[str, str] = json.load(manifest_file)
+    except (FileNotFoundError, ValueError):
+        manifest = {}
+
+    hashes = {name: content_hash(content) for name, content in files.items()}
+    written = []
+    for name, content in files.items():
+        path = os.path.join(directory, name)
+        if manifest.get(name) != hashes[name] or not os.path.exists(path):
+            write_atomic(path, content)
+            written.append(path)
+    for name in manifest.keys() - files.keys():
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            os.remove(path)
+    if hashes != manifest:
+        write_atomic(manifest_path, json.dumps(hashes, indent=2, sort_keys=True) + "\n")
+    return written
@@ -0,0 +1,88 @@
+import os
+import stat
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from requests import Response
+
+from src.duneapi.api import DuneAPI
+from src.duneapi.credentials import CachedCredentials, CredentialCache
+
+
+class TestCredentialCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "credentials.json")
+        self.cache = CredentialCache(self.path)
+        self.credentials = CachedCredentials(auth_refresh="refresh", token="token")
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_store_and_load(self):
+        self.assertIsNone(self.cache.load("user"))
+        self.cache.store("user", self.credentials)
+        self.cache.store("other", CachedCredentials(auth_refresh="x"))
+        self.assertEqual(self.cache.load("user"), self.credentials)
+        self.assertEqual(self.cache.load("other"), CachedCredentials("x", None))
+
+        self.cache.clear("user")
+        self.assertIsNone(self.cache.load("user"))
+        self.assertIsNotNone(self.cache.load("other"))
+
+    def test_file_permissions(self):
+        self.cache.store("user", self.credentials)
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+
+    def test_unreadable_cache(self):
+        with open(self.path, "w", encoding="utf-8") as cache_file:
+            cache_file.write("not json")
+        self.assertIsNone(self.cache.load("user"))
+
+
+class TestCachedLogin(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = CredentialCache(os.path.join(self.tmp_dir.name, "cache.json"))
+        self.dune = DuneAPI("user", "password", credential_cache=self.cache)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    @staticmethod
+    def response(status_code: int, token: str = "new-token") -> Response:
+        response = Response()
+        response.status_code = status_code
+        response.json = MagicMock(return_value={"token": token})
+        return response
+
+    def test_no_cache(self):
+        self.assertFalse(DuneAPI("user", "password").login_from_cache())
+        self.assertFalse(self.dune.login_from_cache())
+
+    def test_cached_session_accepted(self):
+        self.cache.store("user", CachedCredentials("refresh", "old-token"))
+        self.dune.session.post = MagicMock(return_value=self.response(200))
+        self.dune.session.get = MagicMock()
+
+        self.dune.login()
+        self.dune.session.get.assert_not_called()
+        self.assertEqual(self.dune.auth_refresh, "refresh")
+        self.assertEqual(self.dune.token, "new-token")
+        # The refreshed token is written back to the cache
+        self.assertEqual(
+            self.cache.load("user"), CachedCredentials("refresh", "new-token")
+        )
+
+    def test_cached_session_rejected(self):
+        self.cache.store("user", CachedCredentials("refresh", "old-token"))
+        self.dune.session.post = MagicMock(return_value=self.response(401))
+
+        self.assertFalse(self.dune.login_from_cache())
+        self.assertIsNone(self.dune.token)
+        self.assertIsNone(self.cache.load("user"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,13 @@
 import json
+import os
+import tempfile
 import unittest
+from unittest.mock import MagicMock
 
 from src.duneapi.api import DuneAPI
 from src.duneapi.dashboard import DuneDashboard
-from src.duneapi.types import DashboardTile, DuneQuery
+from src.duneapi.types import DashboardTile, DuneQuery, Network
+from src.duneapi.util import open_query
 
 
 class MyTestCase(unittest.TestCase):
@@ -100,6 +104,96 @@ class MyTestCase(unittest.TestCase):
             ],
         )
 
+    def test_refresh_waves(self):
+        base = {
+            "id": 3,
+            "name": "Base",
+            "query_file": "base_query.sql",
+            "network": "mainnet",
+        }
+        self.valid_input["queries"].append(base)
+        dashboard = DuneDashboard.from_json(self.dune, self.valid_input)
+        example_1, example_2, base_query = dashboard.queries
+
+        self.assertEqual(dashboard.dependencies(), {0: {2}, 1: set(), 2: set()})
+        self.assertEqual(
+            dashboard.refresh_waves(), [[example_2, base_query], [example_1]]
+        )
+        # Changes fan out to dependent queries only.
+        self.assertEqual(
+            dashboard.refresh_waves(["example/dashboard/base_query.sql"]),
+            [[base_query], [example_1]],
+        )
+        self.assertEqual(
+            dashboard.refresh_waves(["./example/dashboard/query2-polygon.sql"]),
+            [[example_2]],
+        )
+        self.assertEqual(dashboard.refresh_waves(["unrelated.sql"]), [])
+
+        events = []
+
+        def execute(batch, batch_size):
+            events.extend(("execute", query.name) for query in batch)
+            return [query.name for query in batch]
+
+        self.dune.initiate_queries = MagicMock()
+        self.dune.execute_queries = MagicMock(side_effect=execute)
+        self.dune.await_job = MagicMock(
+            side_effect=lambda job_id: events.append(("await", job_id))
+        )
+        dashboard.update(max_workers=2, batch_size=1)
+        self.assertEqual(
+            [c.args[0] for c in self.dune.execute_queries.call_args_list][-1],
+            [example_1],
+        )
+        self.assertEqual(self.dune.execute_queries.call_count, 3)
+        # The second wave starts once the jobs it depends on are done.
+        self.assertEqual(
+            sorted(events[:3]),
+            sorted(
+                [("execute", example_2.name), ("execute", base_query.name)]
+                + [("await", base_query.name)]
+            ),
+        )
+        self.assertEqual(events[3:], [("execute", example_1.name)])
+
+        events.clear()
+        dashboard.update(wait=True)
+        self.assertEqual(len([e for e in events if e[0] == "await"]), 3)
+
+    def test_dump_config(self):
+        queries = [
+            DuneQuery("Same Name", "", "select 1\n", Network.MAINNET, [], 2),
+            DuneQuery("Same Name", "", "select 2", Network.MAINNET, [], 1),
+            DuneQuery("Other", "", "select 1", Network.POLYGON, [], 3),
+        ]
+        with tempfile.TemporaryDirectory() as out_dir:
+            written = DuneDashboard.dump_config(
+                "Demo", self.user, "demo", queries, out_dir
+            )
+            self.assertEqual(len(written), 3)
+            config = json.loads(open_query(os.path.join(out_dir, "_config.json")))
+            files = [q["query_file"] for q in config["queries"]]
+            self.assertEqual(files[0], "same-name.sql")
+            self.assertTrue(files[1].startswith("same-name-"))
+            # Identical SQL shares a single file
+            self.assertEqual(files[1], files[2])
+
+            # Repeated dumps (in any order) don't write anything
+            self.assertEqual(
+                DuneDashboard.dump_config(
+                    "Demo", self.user, "demo", queries[::-1], out_dir
+                ),
+                [],
+            )
+            loaded = DuneDashboard.from_file(
+                self.dune, os.path.join(out_dir, "_config.json")
+            )
+            self.assertEqual(
+                sorted(q.raw_sql for q in loaded.queries),
+                ["select 1\n", "select 1\n", "select 2\n"],
+            )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,100 @@
+import json
+import unittest
+
+from requests import Response
+
+from src.duneapi.decode import (
+    DecodeOptions,
+    decode_chunk,
+    decode_records,
+    decode_results,
+    split_records,
+)
+from src.duneapi.types import DuneQuery
+
+KEY_MAP = DuneQuery.find_result_by_job("job").key_map
+META = {
+    "id": "result",
+    "job_id": "job",
+    "runtime": 0,
+    "generated_at": "2022-03-19T07:11:37.344998+00:00",
+    "columns": ["number", "name"],
+}
+
+
+def payload(records: list[dict]) -> bytes:
+    data = {
+        "query_results": [META],
+        "get_result_by_job_id": [{"data": r} for r in records],
+        "query_errors": [],
+    }
+    return json.dumps({"data": data}, ensure_ascii=False).encode("utf-8")
+
+
+def json_response(content: bytes) -> Response:
+    response = Response()
+    response.status_code = 200
+    response._content = content
+    return response
+
+
+class TestDecode(unittest.TestCase):
+    def setUp(self) -> None:
+        self.records = [{"number": i, "name": f"tök€n {i}"} for i in range(50)]
+        self.content = payload(self.records)
+
+    def test_split_records(self):
+        array_start, chunks = split_records(self.content, 4)
+        self.assertEqual(self.content[array_start : array_start + 1], b"[")
+        self.assertEqual(len(chunks), 4)
+        self.assertIsNone(chunks[-1][1])
+
+        records, offset = [], 0
+        for start, end in chunks:
+            text = self.content[start:end].decode("utf-8")
+            chunk_records, offset = decode_chunk(text, end is None)
+            records.extend(chunk_records)
+        self.assertEqual(records, self.records)
+        self.assertEqual(self.content[chunks[-1][0] + offset :][:1], b"]")
+
+    def test_split_empty_results(self):
+        content = payload([])
+        _, chunks = split_records(content, 4)
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(decode_chunk(content[chunks[0][0] :].decode(), True)[0], [])
+
+    def test_decode_records(self):
+        remainder, records = decode_records(self.content, DecodeOptions(workers=2))
+        self.assertEqual(records, self.records)
+        self.assertEqual(remainder["data"]["get_result_by_job_id"], [])
+        self.assertEqual(remainder["data"]["query_results"], [META])
+
+    def test_decode_results(self):
+        options = DecodeOptions(workers=2, min_bytes=0)
+        response = json_response(self.content)
+        self.assertEqual(decode_results(response, KEY_MAP, options).data, self.records)
+        # Payloads smaller than min_bytes (or without options) are decoded serially.
+        self.assertEqual(decode_results(response, KEY_MAP).data, self.records)
+        options.min_bytes = len(self.content) + 1
+        self.assertEqual(decode_results(response, KEY_MAP, options).data, self.records)
+
+    def test_decode_results_sharing_strings(self):
+        records = [{"symbol": "WETH", "number": i} for i in range(4)]
+        response = json_response(payload(records))
+        options = DecodeOptions(share_strings=True, min_bytes=2**30)
+        with self.assertLogs("src.duneapi.decode", level="INFO") as logs:
+            data = decode_results(response, KEY_MAP, options).data
+        self.assertEqual(data, records)
+        self.assertIs(data[0]["symbol"], data[3]["symbol"])
+        self.assertIn("symbol (1 distinct of 4)", logs.output[0])
+
+    def test_decode_results_fallback(self):
+        # Nested records look like record boundaries, but do not split into valid JSON.
+        records = [{"data": {"data": i}} for i in range(50)]
+        response = json_response(payload(records))
+        options = DecodeOptions(workers=2, min_bytes=0, chunks_per_worker=8)
+        self.assertEqual(decode_results(response, KEY_MAP, options).data, records)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,20 @@
+import threading
 import unittest
-from unittest.mock import MagicMock, Mock
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, Mock, patch
+
+from requests import Response, Session
 
 from src.duneapi.api import DuneAPI
-from src.duneapi.types import DuneQuery, Network
+from src.duneapi.response import MissingDataError
+from src.duneapi.types import DuneQuery, Network, Post, QueryParameter
+
+JWT_EXPIRED = {
+    "extensions": {"path": "$", "code": "invalid-jwt"},
+    "message": "Could not verify JWT: JWTExpired",
+}
 
 
 class TestDuneAnalytics(unittest.TestCase):
@@ -17,6 +29,11 @@ class TestDuneAnalytics(unittest.TestCase):
             name="Test",
         )
 
+    def test_keyword_only_options(self):
+        self.assertTrue(DuneAPI("user", "password", 1, 1, thread_safe=True).thread_safe)
+        with self.assertRaises(TypeError):
+            DuneAPI("user", "password", 1, 1, None, True)
+
     def test_retry(self):
         self.dune.execute_and_await_results = MagicMock(return_value=1)
         self.dune.initiate_query = MagicMock(return_value=None)
@@ -32,6 +49,251 @@ class TestDuneAnalytics(unittest.TestCase):
         with self.assertRaises(Exception):
             self.dune.fetch(self.query)
 
+    def test_sweep(self):
+        self.dune.initiate_query = MagicMock(return_value=True)
+        self.dune.execute_query = MagicMock(
+            side_effect=lambda q: str(q.parameters[0].value)
+        )
+        self.dune.get_results = MagicMock(side_effect=lambda job: [{"job": job}])
+        parameter_sets = [[QueryParameter.number_type("N", n)] for n in range(10)]
+
+        results = list(self.dune.sweep(self.query, parameter_sets, max_in_flight=3))
+
+        # The query is upserted once, but executed for every parameter set.
+        self.dune.initiate_query.assert_called_once_with(self.query)
+        self.assertEqual(self.dune.execute_query.call_count, 10)
+        self.assertEqual(
+            sorted((p[0].value, r) for p, r in results),
+            [(n, [{"job": str(n)}]) for n in range(10)],
+        )
+
+    def test_sweep_failure(self):
+        self.dune.initiate_query = MagicMock(return_value=True)
+        self.dune.execute_query = MagicMock(side_effect=RuntimeError("query error"))
+        with self.assertRaises(RuntimeError):
+            list(self.dune.sweep(self.query, [[]]))
+
+    def test_partitioned(self):
+        query = DuneQuery(
+            raw_sql="",
+            description="",
+            network=Network.MAINNET,
+            query_id=0,
+            parameters=[
+                QueryParameter.date_type("Start", datetime(2022, 1, 1)),
+                QueryParameter.text_type("Other", "x"),
+                QueryParameter.date_type("End", datetime(2022, 1, 5)),
+            ],
+            name="Test",
+        )
+        self.dune.initiate_query = MagicMock(return_value=True)
+        self.dune.execute_and_await_results = MagicMock(
+            side_effect=lambda q: [{"day": p.value.day} for p in q.parameters[::2]]
+        )
+
+        results = self.dune.fetch_partitioned(query, "Start", "End", partitions=4)
+
+        self.dune.initiate_query.assert_called_once_with(query)
+        self.assertEqual(
+            [r["day"] for r in results],
+            [1, 2, 2, 3, 3, 4, 4, 5],
+        )
+        with self.assertRaises(ValueError):
+            self.dune.fetch_partitioned(query, "Start", "Other", partitions=4)
+
+    def test_partitioned_retry(self):
+        query = DuneQuery(
+            raw_sql="",
+            description="",
+            network=Network.MAINNET,
+            query_id=0,
+            parameters=[
+                QueryParameter.number_type("Start", 0),
+                QueryParameter.number_type("End", 10),
+            ],
+            name="Test",
+        )
+        self.dune.initiate_query = MagicMock(return_value=True)
+        self.dune.login = MagicMock()
+        self.dune.refresh_auth_token = MagicMock()
+        self.dune.execute_and_await_results = MagicMock(
+            side_effect=[
+                MissingDataError("expired", [JWT_EXPIRED]),
+                [{"x": 1}],
+                [{"x": 2}],
+            ]
+        )
+        results = self.dune.fetch_partitioned(
+            query, "Start", "End", partitions=2, max_in_flight=1
+        )
+        self.assertEqual(results, [{"x": 1}, {"x": 2}])
+        self.dune.login.assert_called_once()
+
+    def test_execute_queries_in_batches(self):
+        def respond(post: Post) -> Response:
+            response = Response()
+            response.status_code = 200
+            response.json = MagicMock(
+                return_value={
+                    "data": {
+                        alias: {
+                            "job_id": post.data["variables"][f"query_id{alias[1:]}"]
+                        }
+                        for alias in post.key_map
+                    }
+                }
+            )
+            return response
+
+        self.dune.post_dune_request = MagicMock(side_effect=respond)
+        queries = [replace(self.query, query_id=i) for i in range(5)]
+        job_ids = self.dune.execute_queries(queries, batch_size=2)
+        self.assertEqual(job_ids, ["0", "1", "2", "3", "4"])
+        self.assertEqual(self.dune.post_dune_request.call_count, 3)
+
+    def test_preview(self):
+        self.dune.fetch = MagicMock(return_value=[{"x": 1}])
+        self.assertEqual(self.dune.preview(self.query, 5), [{"x": 1}])
+        previewed = self.dune.fetch.call_args[0][0]
+        self.assertTrue(previewed.raw_sql.endswith("limit 5"))
+
+    def mock_latest(self, age: timedelta, data: list) -> None:
+        generated_at = datetime.now(timezone.utc) - age
+        self.dune.latest_results = MagicMock(
+            return_value=Mock(
+                meta=Mock(generated_at=generated_at.isoformat()), data=data
+            )
+        )
+        self.dune.execute_query = MagicMock(return_value="job")
+        self.dune.get_results = MagicMock(return_value=[{"fresh": 1}])
+
+    def test_fetch_latest_fresh(self):
+        self.mock_latest(timedelta(minutes=1), [{"cached": 1}])
+        results = self.dune.fetch_latest(1, max_age=timedelta(minutes=5))
+        self.assertEqual(results, [{"cached": 1}])
+        self.dune.execute_query.assert_not_called()
+
+    def test_fetch_latest_stale_while_revalidate(self):
+        self.mock_latest(timedelta(hours=1), [{"cached": 1}])
+        release = threading.Event()
+        self.dune.get_results.side_effect = lambda job: release.wait()
+
+        results = self.dune.fetch_latest(1, max_age=timedelta(minutes=5))
+        self.assertEqual(results, [{"cached": 1}])
+        # Stale readers share the re-execution in progress.
+        self.dune.fetch_latest(1, max_age=timedelta(minutes=5))
+        thread = self.dune._revalidate(1, [])
+        release.set()
+        thread.join()
+        self.dune.execute_query.assert_called_once()
+        self.assertEqual(self.dune.execute_query.call_args[0][0].query_id, 1)
+
+    def test_fetch_latest_stale_without_revalidate(self):
+        self.mock_latest(timedelta(hours=1), [{"cached": 1}])
+        results = self.dune.fetch_latest(
+            1, max_age=timedelta(minutes=5), revalidate=False
+        )
+        self.assertEqual(results, [{"fresh": 1}])
+        self.dune.get_results.assert_called_once_with("job")
+
+    def test_fetch_latest_without_results(self):
+        self.dune.latest_results = MagicMock(return_value=None)
+        self.dune.execute_query = MagicMock(return_value="job")
+        self.dune.get_results = MagicMock(return_value=[{"fresh": 1}])
+        results = self.dune.fetch_latest(1, max_age=timedelta(minutes=5))
+        self.assertEqual(results, [{"fresh": 1}])
+
+    def test_fetch_latest_failed_execution(self):
+        def respond(post: Post) -> Response:
+            response = Response()
+            response.status_code = 200
+            if post.data["operationName"] == "GetResult":
+                latest = {"job_id": "failed", "result_id": None, "error_id": "e"}
+                data = {"get_result_v2": latest}
+            else:
+                data = {
+                    "query_results": [],
+                    "get_result_by_job_id": [],
+                    "query_errors": [{"message": "syntax error"}],
+                }
+            response.json = MagicMock(return_value={"data": data})
+            return response
+
+        self.dune.post_dune_request = MagicMock(side_effect=respond)
+        self.assertIsNone(self.dune.latest_results(1))
+        self.dune.execute_query = MagicMock(return_value="job")
+        self.dune.get_results = MagicMock(return_value=[{"fresh": 1}])
+        results = self.dune.fetch_latest(1, max_age=timedelta(minutes=5))
+        self.assertEqual(results, [{"fresh": 1}])
+        self.dune.execute_query.assert_called_once()
+
+    def test_generated_at(self):
+        meta = Mock(generated_at="2022-03-19T07:11:37.34+00:00")
+        self.assertEqual(
+            DuneAPI._generated_at(meta),
+            datetime(2022, 3, 19, 7, 11, 37, 340000, tzinfo=timezone.utc),
+        )
+
+
+class TestThreadSafeDuneAPI(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dune = DuneAPI("user", "password", thread_safe=True)
+        self.token_count = 0
+
+        def next_token(*_args, **_kwargs) -> Response:
+            response = Response()
+            response.status_code = 200
+            self.token_count += 1
+            response.json = MagicMock(return_value={"token": str(self.token_count)})
+            return response
+
+        self.dune.session.post = MagicMock(side_effect=next_token)
+
+    def test_sessions_are_thread_local(self):
+        sessions = {}
+
+        def record_session(_):
+            sessions[threading.get_ident()] = self.dune.graph_session()
+            return self.dune.graph_session()
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(record_session, range(32)))
+
+        self.assertEqual(len(set(map(id, sessions.values()))), len(sessions))
+        self.assertNotIn(self.dune.session, sessions.values())
+        self.assertEqual(
+            DuneAPI("user", "password").graph_session().headers,
+            self.dune.graph_session().headers,
+        )
+
+    def test_per_request_auth_header(self):
+        post = Post(data={"operationName": "Test"}, key_map={})
+        graph_posts = []
+
+        def graph_post(_url, json, headers):
+            graph_posts.append(headers["authorization"])
+            response = Response()
+            response.json = MagicMock(return_value={})
+            return response
+
+        with patch.object(Session, "post", side_effect=graph_post):
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                list(pool.map(lambda _: self.dune.post_dune_request(post), range(32)))
+
+        # Requests share one (cached) token and shared headers are untouched.
+        self.assertEqual(graph_posts, ["Bearer 1"] * 32)
+        self.assertEqual(self.token_count, 1)
+        self.assertNotIn("authorization", self.dune.session.headers)
+
+    def test_token_refreshed_on_expiry_and_login(self):
+        self.assertEqual([self.dune.auth_token() for _ in range(3)], ["1"] * 3)
+        self.dune._token_cache = ("1", 0.0)
+        self.assertEqual(self.dune.auth_token(), "2")
+        # Logging in again (e.g. after an authentication error) drops the token.
+        self.dune.login_from_cache = MagicMock(return_value=True)
+        self.dune.login()
+        self.assertEqual(self.dune.auth_token(), "3")
+
 
 if __name__ == "__main__":
     unittest.main()
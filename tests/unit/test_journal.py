@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+from datetime import timedelta
+from unittest.mock import MagicMock
+
+from src.duneapi.api import DuneAPI
+from src.duneapi.journal import JobJournal, JobState
+from src.duneapi.types import DuneQuery, Network
+
+
+class TestJobJournal(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "journal.json")
+        self.query = DuneQuery("Test", "", "select 1", Network.MAINNET, [], 1)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_lifecycle(self):
+        journal = JobJournal(self.path)
+        self.assertIsNone(journal.pending(self.query))
+
+        journal.submitted(self.query, "job-1")
+        self.assertEqual(journal.pending(self.query).job_id, "job-1")
+        # Persisted across instances (i.e. process restarts)
+        self.assertEqual(JobJournal(self.path).pending(self.query).job_id, "job-1")
+
+        # Completion of a superseded job is ignored
+        journal.complete(self.query, "job-0")
+        self.assertEqual(journal.pending(self.query).job_id, "job-1")
+
+        journal.complete(self.query, "job-1")
+        self.assertIsNone(journal.pending(self.query))
+        self.assertIsNone(JobJournal(self.path).pending(self.query))
+
+    def test_failed_and_expired(self):
+        journal = JobJournal()
+        journal.submitted(self.query, "job-1")
+        journal.failed(self.query, "job-1")
+        self.assertIsNone(journal.pending(self.query))
+
+        expired = JobJournal(self.path, max_age=timedelta(0))
+        expired.submitted(self.query, "job-2")
+        self.assertIsNone(expired.pending(self.query))
+
+
+class TestJournaledFetch(unittest.TestCase):
+    def setUp(self) -> None:
+        self.journal = JobJournal()
+        self.dune = DuneAPI("user", "password", journal=self.journal)
+        self.query = DuneQuery("Test", "", "select 1", Network.MAINNET, [], 1)
+        self.dune.initiate_query = MagicMock(return_value=True)
+        self.dune.execute_query = MagicMock(return_value="new-job")
+        self.dune.get_results = MagicMock(return_value=[{"x": 1}])
+
+    def test_resume_pending_job(self):
+        self.journal.submitted(self.query, "old-job")
+        self.assertEqual(self.dune.fetch(self.query), [{"x": 1}])
+        self.dune.initiate_query.assert_not_called()
+        self.dune.execute_query.assert_not_called()
+        self.dune.get_results.assert_called_once_with("old-job")
+        self.assertIsNone(self.journal.pending(self.query))
+
+    def test_resume_never_executes_unleased(self):
+        # The job completes (e.g. by an identical fetch) while resuming it.
+        self.journal.submitted(self.query, "old-job")
+        pending = self.journal.pending(self.query)
+        self.journal.pending = MagicMock(side_effect=[pending, None])
+        self.assertEqual(self.dune.fetch(self.query), [{"x": 1}])
+        self.dune.execute_query.assert_not_called()
+        self.dune.get_results.assert_called_once_with("old-job")
+
+    def test_new_job_is_journaled(self):
+        self.dune.get_results = MagicMock(side_effect=RuntimeError("query error"))
+        self.dune.login = MagicMock()
+        self.dune.refresh_auth_token = MagicMock()
+        with self.assertRaises(Exception):
+            self.dune.fetch(self.query)
+        entry = self.journal._entries[self.query.fingerprint()]
+        self.assertEqual(entry.job_id, "new-job")
+        self.assertEqual(entry.state, JobState.FAILED.value)
+
+
+if __name__ == "__main__":
+    unittest.main()
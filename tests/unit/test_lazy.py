@@ -0,0 +1,110 @@
+import json
+import unittest
+from unittest.mock import MagicMock
+
+from requests import Response
+
+from src.duneapi.api import DuneAPI
+from src.duneapi.decode import records_array_start
+from src.duneapi.lazy import LazyResults, _index_by_tokens, index_records
+from src.duneapi.response import MissingDataError
+from src.duneapi.types import DuneQuery
+
+KEY_MAP = DuneQuery.find_result_by_job("job").key_map
+META = {
+    "id": "result",
+    "job_id": "job",
+    "runtime": 0,
+    "generated_at": "2022-03-19T07:11:37.344998+00:00",
+    "columns": ["number", "name"],
+}
+
+
+def json_response(content: bytes) -> Response:
+    response = Response()
+    response.status_code = 200
+    response._content = content
+    return response
+
+
+def payload(records: list[dict], indent=None) -> bytes:
+    data = {
+        "query_results": [META],
+        "get_result_by_job_id": [{"data": r} for r in records],
+        "query_errors": [],
+    }
+    return json.dumps({"data": data}, ensure_ascii=False, indent=indent).encode()
+
+
+class TestLazyResults(unittest.TestCase):
+    def setUp(self) -> None:
+        self.records = [{"number": i, "name": f"tök€n {i}"} for i in range(10)]
+
+    def test_sequence(self):
+        results = LazyResults.from_response(
+            json_response(payload(self.records)), KEY_MAP
+        )
+        self.assertEqual(len(results), 10)
+        self.assertEqual(results[0], self.records[0])
+        self.assertEqual(results[-1], self.records[-1])
+        self.assertEqual(list(results), self.records)
+        self.assertEqual(results.meta.job_id, "job")
+        with self.assertRaises(IndexError):
+            results[10]
+
+        view = results[2:8:2]
+        self.assertIsInstance(view, LazyResults)
+        self.assertEqual(len(view), 3)
+        self.assertEqual(list(view), self.records[2:8:2])
+        self.assertEqual(view[-1], self.records[6])
+        self.assertEqual(list(view[::-1]), self.records[6:1:-2])
+
+    def test_index(self):
+        records = [
+            *self.records,
+            # Nested records and brackets within strings can not be indexed by prefix.
+            {"nested": [{"data": 1}, {"data": {"x": "}"}}]},
+            {"name": "[{"},
+        ]
+        for content in [payload(records), payload(records, indent=2)]:
+            array_start = records_array_start(content)
+            index = index_records(content, array_start)
+            self.assertEqual(index, _index_by_tokens(content, array_start))
+            self.assertEqual(len(index[0]), 12)
+            self.assertEqual(content[index[2] : index[2] + 1], b"]")
+            results = LazyResults.from_response(json_response(content), KEY_MAP)
+            self.assertEqual(list(results), records)
+
+    def test_empty_and_invalid(self):
+        results = LazyResults.from_response(json_response(payload([])), KEY_MAP)
+        self.assertEqual(len(results), 0)
+        self.assertEqual(list(results), [])
+
+        with self.assertRaises(MissingDataError):
+            LazyResults.from_response(json_response(b'{"errors": []}'), KEY_MAP)
+        content = json.dumps(
+            {
+                "data": {
+                    "query_results": [],
+                    "get_result_by_job_id": [],
+                    "query_errors": [{"message": "syntax error"}],
+                }
+            }
+        ).encode()
+        with self.assertRaises(RuntimeError):
+            LazyResults.from_response(json_response(content), KEY_MAP)
+
+    def test_get_lazy_results(self):
+        dune = DuneAPI("user", "password")
+        queue = Response()
+        queue.status_code = 200
+        queue.json = MagicMock(return_value={"data": {"jobs_by_pk": None}})
+        dune.post_dune_request = MagicMock(
+            side_effect=[queue, json_response(payload(self.records))]
+        )
+        results = dune.get_lazy_results("job")
+        self.assertEqual(results[3], self.records[3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,194 @@
+import os
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+from requests import ConnectionError as RequestsConnectionError
+
+from src.duneapi.api import DuneAPI
+from src.duneapi.pool import DuneClientPool, PoolSaturatedError, QueryIdPool
+from src.duneapi.retry import RetryPolicy
+from src.duneapi.types import DuneQuery, Network
+
+
+class TestQueryIdPool(unittest.TestCase):
+    def test_constructor(self):
+        pool = QueryIdPool([1, 2, 2, 3])
+        self.assertEqual(pool.query_ids, (1, 2, 3))
+        self.assertEqual(len(pool), 3)
+        with self.assertRaises(ValueError):
+            QueryIdPool([])
+
+    def test_parse_ids(self):
+        self.assertEqual(QueryIdPool.parse_ids("1, 5-7,"), [1, 5, 6, 7])
+        with patch.dict(os.environ, {"DUNE_QUERY_IDS": "10-11"}):
+            self.assertEqual(QueryIdPool.from_environment().query_ids, (10, 11))
+        with patch.dict(os.environ, {"DUNE_QUERY_IDS": "", "DUNE_QUERY_ID": "3"}):
+            self.assertEqual(QueryIdPool.from_environment().query_ids, (3,))
+
+    def test_lease_and_release(self):
+        pool = QueryIdPool([1, 2])
+        with pool.lease() as first, pool.lease() as second:
+            self.assertEqual({first, second}, {1, 2})
+            self.assertEqual(pool.available, 0)
+            with self.assertRaises(TimeoutError):
+                pool.acquire(timeout=0.01)
+        self.assertEqual(pool.available, 2)
+
+        with self.assertRaises(ValueError):
+            pool.release(1)
+        with self.assertRaises(ValueError):
+            pool.release(99)
+
+    def test_waiters_served_in_order(self):
+        pool = QueryIdPool([1])
+        leased = []
+
+        def wait(_):
+            query_id = pool.acquire(timeout=5)
+            leased.append(threading.current_thread().name)
+            pool.release(query_id)
+
+        query_id = pool.acquire()
+        threads = [
+            threading.Thread(target=wait, args=(i,), name=str(i)) for i in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+            while len(pool._waiters) < int(thread.name) + 1:
+                time.sleep(0.001)
+        pool.release(query_id)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(leased, ["0", "1", "2", "3", "4"])
+        self.assertEqual(pool.available, 1)
+
+    def test_exclusive_leases(self):
+        pool = QueryIdPool(range(3))
+        in_use = set()
+        lock = threading.Lock()
+        clashes = []
+
+        def work(_):
+            with pool.lease() as query_id:
+                with lock:
+                    clashes.append(query_id in in_use)
+                    in_use.add(query_id)
+                time.sleep(0.001)
+                with lock:
+                    in_use.remove(query_id)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(work, range(50)))
+        self.assertFalse(any(clashes))
+        self.assertEqual(pool.available, 3)
+
+    def test_fetch_with_pool(self):
+        dune = DuneAPI("user", "password")
+        query = DuneQuery("Test", "", "select 1", Network.MAINNET, [], query_id=0)
+        pool = QueryIdPool([7])
+        dune.initiate_query = MagicMock(return_value=True)
+        dune.execute_and_await_results = MagicMock(
+            side_effect=lambda q: [{"query_id": q.query_id}]
+        )
+        self.assertEqual(dune.fetch(query, query_pool=pool), [{"query_id": 7}])
+        self.assertEqual(pool.available, 1)
+        self.assertEqual(query.query_id, 0)
+
+
+class TestDuneClientPool(unittest.TestCase):
+    def setUp(self) -> None:
+        self.accounts = [DuneAPI(f"user{i}", "password") for i in range(3)]
+        self.pool = DuneClientPool(
+            [
+                (self.accounts[0], QueryIdPool([1, 2])),
+                (self.accounts[1], QueryIdPool([3])),
+                (self.accounts[2], QueryIdPool([4, 5, 6])),
+            ],
+            max_queued=0,
+        )
+        self.query = DuneQuery("Test", "", "select 1", Network.MAINNET, [], 0)
+
+    def test_least_loaded_routing(self):
+        release = threading.Event()
+        used = []
+
+        def fetch(api):
+            def _fetch(query, query_pool):
+                with query_pool.lease() as query_id:
+                    used.append((api.username, query_id))
+                    release.wait()
+                return [{"user": api.username}]
+
+            return _fetch
+
+        for api in self.accounts:
+            api.fetch = MagicMock(side_effect=fetch(api))
+
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            futures = [executor.submit(self.pool.fetch, self.query) for _ in range(6)]
+            while len(used) < 6:
+                time.sleep(0.001)
+            # Pool is full, and no callers may be queued.
+            with self.assertRaises(PoolSaturatedError):
+                self.pool.fetch(self.query)
+            release.set()
+            [f.result() for f in futures]
+
+        self.assertEqual(sorted(q for _, q in used), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(
+            sorted(u for u, _ in used), ["user0"] * 2 + ["user1"] + ["user2"] * 3
+        )
+
+    def test_failover(self):
+        # Account 2 retries its connection errors, gives up and is cooled down.
+        self.accounts[2].retry_policy = RetryPolicy(backoff=0)
+        self.accounts[2].post_dune_request = MagicMock(
+            side_effect=RequestsConnectionError("down")
+        )
+        for api in self.accounts[:2]:
+            api.initiate_query = MagicMock(return_value=True)
+            api.execute_and_await_results = MagicMock(return_value=[{"x": 1}])
+        # Account 2 is the least loaded initially.
+        self.pool.members[0].in_flight = 1
+        self.pool.members[1].in_flight = 1
+        self.assertEqual(self.pool.fetch(self.query), [{"x": 1}])
+        self.assertEqual(self.accounts[2].post_dune_request.call_count, 2)
+        self.assertEqual(self.pool.members[2].failures, 1)
+        self.assertFalse(self.pool.members[2].healthy(time.monotonic()))
+        self.assertEqual(self.pool.members[2].in_flight, 0)
+
+    def test_query_errors_do_not_fail_over(self):
+        for api in self.accounts:
+            api.fetch = MagicMock(side_effect=RuntimeError("syntax error"))
+        with self.assertRaises(RuntimeError):
+            self.pool.fetch(self.query)
+        self.assertEqual(sum(api.fetch.call_count for api in self.accounts), 1)
+        self.assertTrue(all(m.failures == 0 for m in self.pool.members))
+
+    def test_fatal_errors_do_not_fail_over(self):
+        for api in self.accounts:
+            api.fetch = MagicMock(side_effect=KeyError("get_result_by_job_id"))
+        with self.assertRaises(KeyError):
+            self.pool.fetch(self.query)
+        self.assertEqual(sum(api.fetch.call_count for api in self.accounts), 1)
+        now = time.monotonic()
+        self.assertTrue(all(m.healthy(now) for m in self.pool.members))
+        self.assertTrue(all(m.in_flight == 0 for m in self.pool.members))
+
+    def test_update_dashboard(self):
+        dashboard = MagicMock()
+        dashboard.api = DuneAPI("user1", "password")
+        self.pool.update_dashboard(dashboard)
+        dashboard.update.assert_called_once()
+        self.assertIs(dashboard.api, self.accounts[1])
+
+        dashboard.api = DuneAPI("stranger", "password")
+        with self.assertRaises(ValueError):
+            self.pool.update_dashboard(dashboard)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from requests import Response
+
+from src.duneapi.api import DuneAPI
+from src.duneapi.dashboard import DuneDashboard
+from src.duneapi.query_cache import QueryMetadataCache
+
+
+def json_response(data: dict) -> Response:
+    response = Response()
+    response.status_code = 200
+    response.json = MagicMock(return_value={"data": data})
+    return response
+
+
+def query_data(query_id: int, updated_at: str, user: str = "user") -> dict:
+    return {
+        "id": query_id,
+        "updated_at": updated_at,
+        "name": f"Query {query_id}",
+        "description": "",
+        "query": f"select {query_id}",
+        "dataset_id": 4,
+        "parameters": [],
+        "user": {"name": user},
+    }
+
+
+class TestQueryMetadataCache(unittest.TestCase):
+    def test_get_store_save(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "cache.json")
+            cache = QueryMetadataCache(path)
+            cache.store(query_data(1, "t1"))
+            self.assertEqual(cache.get(1, "t1")["query"], "select 1")
+            self.assertIsNone(cache.get(1, "t2"))
+            self.assertIsNone(cache.get(2, "t1"))
+            cache.save()
+
+            self.assertEqual(QueryMetadataCache(path).get(1, "t1"), cache.get(1, "t1"))
+
+    def test_incremental_dashboard_pull(self):
+        dune = DuneAPI("user", "password")
+        cache = QueryMetadataCache()
+        cache.store(query_data(1, "t1"))
+        cache.store(query_data(2, "t1"))
+        widgets = [
+            {"visualization": {"query_details": {"query_id": query_id}}}
+            for query_id in [1, 2, 2, 3]
+        ]
+        updates = [{"id": 1, "updated_at": "t1"}, {"id": 2, "updated_at": "t2"}]
+        updates.append({"id": 3, "updated_at": "t1"})
+
+        def respond(post) -> Response:
+            match post.data["operationName"]:
+                case "FindDashboard":
+                    return json_response(
+                        {
+                            "dashboards": [
+                                {
+                                    "name": "Dashboard",
+                                    "user": {"name": "user"},
+                                    "visualization_widgets": widgets,
+                                }
+                            ]
+                        }
+                    )
+                case "FindQueryUpdates":
+                    return json_response({"queries": updates})
+                case "FindQuery":
+                    query_id = post.data["variables"]["id"]
+                    return json_response({"queries": [query_data(query_id, "t2")]})
+
+        dune.post_dune_request = MagicMock(side_effect=respond)
+        dashboard = DuneDashboard.from_dune(
+            dune, "dashboard", save_config=False, cache=cache
+        )
+        self.assertEqual(sorted(q.query_id for q in dashboard.queries), [1, 2, 3])
+        fetched = [
+            c.args[0].data["variables"]["id"]
+            for c in dune.post_dune_request.call_args_list
+            if c.args[0].data["operationName"] == "FindQuery"
+        ]
+        # Query 1 is unchanged, query 2 was updated and query 3 was never cached.
+        self.assertEqual(fetched, [2, 3])
+        self.assertEqual(cache.get(2, "t2")["id"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
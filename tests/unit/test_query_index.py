@@ -0,0 +1,113 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from requests import Response
+
+from src.duneapi.api import DuneAPI
+from src.duneapi.query_index import QueryIndex
+from src.duneapi.types import DuneQuery, Network, QueryParameter
+
+
+def query_data(query_id: int, updated_at: str, sql: str, **kwargs) -> dict:
+    return {
+        "id": query_id,
+        "name": kwargs.get("name", f"Query {query_id}"),
+        "dataset_id": kwargs.get("dataset_id", 4),
+        "parameters": kwargs.get("parameters", []),
+        "query": sql,
+        "is_archived": kwargs.get("is_archived", False),
+        "updated_at": updated_at,
+    }
+
+
+class TestQueryIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dune = DuneAPI("user", "password")
+        self.pages: list[list[dict]] = []
+
+        def respond(post) -> Response:
+            response = Response()
+            response.status_code = 200
+            page = self.pages.pop(0) if self.pages else []
+            response.json = MagicMock(return_value={"data": {"queries": page}})
+            return response
+
+        self.dune.post_dune_request = MagicMock(side_effect=respond)
+
+    def since(self) -> list[str]:
+        return [
+            c.args[0].data["variables"]["since"]
+            for c in self.dune.post_dune_request.call_args_list
+        ]
+
+    def test_incremental_refresh(self):
+        parameter = {"key": "N", "type": "number", "value": "1", "enumOptions": []}
+        self.pages = [
+            [
+                query_data(1, "2022-01-01", "select 1", name="One"),
+                query_data(2, "2022-01-02", "select 2\n", parameters=[parameter]),
+            ],
+            [query_data(3, "2022-01-03", "select 1", name="One", dataset_id=7)],
+        ]
+        index = QueryIndex()
+        self.assertEqual(index.refresh(self.dune, page_size=2), 3)
+        self.assertEqual(self.since(), ["1970-01-01T00:00:00+00:00", "2022-01-02"])
+
+        self.assertEqual(index.by_id(2).name, "Query 2")
+        self.assertEqual([q.query_id for q in index.by_name("One")], [1, 3])
+        self.assertEqual([q.query_id for q in index.by_sql("select 1")], [1, 3])
+        query = DuneQuery(
+            "x",
+            "",
+            "select 2",
+            Network.MAINNET,
+            [QueryParameter.number_type("N", 1)],
+            0,
+        )
+        self.assertEqual([q.query_id for q in index.find(query)], [2])
+        query.network = Network.POLYGON
+        self.assertEqual(index.find(query), [])
+
+        # Only queries updated since the last refresh are fetched.
+        self.pages = [
+            [
+                query_data(1, "2022-02-01", "select 10", name="Renamed"),
+                query_data(3, "2022-02-02", "select 1", is_archived=True),
+            ]
+        ]
+        self.assertEqual(index.refresh(self.dune), 2)
+        self.assertEqual(self.since()[-1], "2022-01-03")
+        self.assertEqual(index.by_name("One"), [])
+        self.assertEqual(index.by_sql("select 1"), [])
+        self.assertEqual(index.by_name("Renamed")[0].query_id, 1)
+        self.assertEqual(len(index), 2)
+
+    def test_pages_sharing_update_time(self):
+        self.pages = [
+            [query_data(1, "2022-01-01", "select 1"), query_data(2, "2022-01-02", "")],
+            [query_data(3, "2022-01-02", "select 3")],
+        ]
+        index = QueryIndex()
+        self.assertEqual(index.refresh(self.dune, page_size=2), 3)
+        self.assertEqual(self.since()[-1], "2022-01-02")
+        # The next page continues after query 2, rather than after its update time.
+        variables = self.dune.post_dune_request.call_args.args[0].data["variables"]
+        self.assertEqual(variables["after_id"], 2)
+        self.assertEqual((index.updated_at, index.after_id), ("2022-01-02", 3))
+        self.assertEqual(index.by_id(3).name, "Query 3")
+
+    def test_persistence(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "index.json")
+            self.pages = [[query_data(1, "2022-01-01", "select 1")]]
+            QueryIndex(path).refresh(self.dune)
+
+            index = QueryIndex(path)
+            self.assertEqual((index.updated_at, index.after_id), ("2022-01-01", 1))
+            self.assertEqual(index.by_sql(" select 1 ")[0].query_id, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
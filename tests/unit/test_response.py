@@ -5,6 +5,7 @@ from requests import Response
 
 from src.duneapi.response import (
     pre_validate_response,
+    validate_and_parse_batch_response,
     validate_and_parse_dict_response,
     validate_and_parse_list_response,
 )
@@ -96,6 +97,27 @@ class TestOperations(unittest.TestCase):
             validate_and_parse_list_response(self.response, key_map=self.key_map)
         self.assertEqual(str(err.exception), "Fail dict_keys(['a']) != {'y'}")
 
+    def test_batch_validation(self):
+        self.response.status_code = 200
+        key_map = {"q0": {"y"}, "q1": {"y"}}
+        self.response.json = MagicMock(
+            return_value={"data": {"q0": {"y": "a"}, "q1": {"y": "b"}}}
+        )
+        self.assertEqual(
+            validate_and_parse_batch_response(self.response, key_map, "x"),
+            [{"x": {"y": "a"}}, {"x": {"y": "b"}}],
+        )
+
+        self.response.json = MagicMock(
+            return_value={"data": {"q0": {"y": "a"}, "q1": {"a": "b"}}}
+        )
+        with self.assertRaises(AssertionError) as err:
+            validate_and_parse_batch_response(self.response, key_map, "x")
+        self.assertEqual(
+            str(err.exception),
+            "Invalid response for q1: Fail dict_keys(['a']) != {'y'}",
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
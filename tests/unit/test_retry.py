@@ -0,0 +1,119 @@
+import unittest
+from unittest.mock import MagicMock
+
+from requests import ConnectionError as RequestsConnectionError, Response
+
+from src.duneapi.api import DuneAPI
+from src.duneapi.response import MissingDataError, parse_response_json
+from src.duneapi.retry import ErrorKind, RetriesExceededError, RetryPolicy
+from src.duneapi.types import DuneQuery, Network
+
+JWT_EXPIRED = {
+    "extensions": {"path": "$", "code": "invalid-jwt"},
+    "message": "Could not verify JWT: JWTExpired",
+}
+
+
+def response(status_code: int) -> Response:
+    result = Response()
+    result.status_code = status_code
+    return result
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_classify(self):
+        classify = RetryPolicy.classify
+        self.assertEqual(classify(RequestsConnectionError()), ErrorKind.TRANSIENT)
+        self.assertEqual(
+            classify(SystemExit("Dune post failed with", response(503))),
+            ErrorKind.TRANSIENT,
+        )
+        self.assertEqual(classify(SystemExit(response(429))), ErrorKind.TRANSIENT)
+        self.assertEqual(classify(SystemExit(response(401))), ErrorKind.AUTH)
+        self.assertEqual(classify(SystemExit(response(400))), ErrorKind.FATAL)
+        self.assertEqual(
+            classify(MissingDataError("expired", [JWT_EXPIRED])), ErrorKind.AUTH
+        )
+        # Invalid requests are rejected the same way, but logging in won't help.
+        invalid = {"extensions": {"code": "validation-failed"}, "message": "x"}
+        self.assertEqual(
+            classify(MissingDataError("invalid", [invalid])), ErrorKind.FATAL
+        )
+        self.assertEqual(classify(MissingDataError("no errors")), ErrorKind.FATAL)
+        with self.assertRaises(MissingDataError) as err:
+            parse_response_json({"errors": [JWT_EXPIRED]})
+        self.assertEqual(classify(err.exception), ErrorKind.AUTH)
+        self.assertEqual(classify(RuntimeError("query errors")), ErrorKind.QUERY)
+        self.assertEqual(classify(KeyError("x")), ErrorKind.FATAL)
+        exceeded = RetriesExceededError("exceeded", ErrorKind.TRANSIENT)
+        self.assertEqual(classify(exceeded), ErrorKind.TRANSIENT)
+
+    def test_should_retry(self):
+        self.assertFalse(RetryPolicy().should_retry(ErrorKind.QUERY))
+        self.assertTrue(
+            RetryPolicy(retry_query_errors=True).should_retry(ErrorKind.QUERY)
+        )
+        self.assertFalse(RetryPolicy().should_retry(ErrorKind.FATAL))
+        self.assertTrue(RetryPolicy().should_retry(ErrorKind.TRANSIENT))
+
+    def test_delay(self):
+        policy = RetryPolicy(backoff=1, backoff_factor=2, max_backoff=5, jitter=False)
+        self.assertEqual([policy.delay(i) for i in range(4)], [1, 2, 4, 5])
+        jittered = RetryPolicy(backoff=1, max_backoff=5)
+        self.assertTrue(all(0 <= jittered.delay(10) <= 5 for _ in range(20)))
+
+
+class TestFetchRetries(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dune = DuneAPI(
+            "user", "password", max_retries=3, retry_policy=RetryPolicy(backoff=0)
+        )
+        self.query = DuneQuery("Test", "", "select 1", Network.MAINNET, [], 1)
+        self.dune.initiate_query = MagicMock(return_value=True)
+        self.dune.execute_query = MagicMock(return_value="job-1")
+        self.dune.login = MagicMock()
+
+    def test_transient_failure_resumes_job(self):
+        self.dune.get_results = MagicMock(
+            side_effect=[RequestsConnectionError(), [{"x": 1}]]
+        )
+        self.assertEqual(self.dune.fetch(self.query), [{"x": 1}])
+        # The query is executed only once, the retry awaits the same job.
+        self.dune.execute_query.assert_called_once()
+        self.assertEqual(self.dune.get_results.call_args_list[1][0], ("job-1",))
+        self.dune.login.assert_not_called()
+
+    def test_auth_failure_logs_in(self):
+        self.dune.get_results = MagicMock(
+            side_effect=[MissingDataError("expired", [JWT_EXPIRED]), [{"x": 1}]]
+        )
+        self.assertEqual(self.dune.fetch(self.query), [{"x": 1}])
+        self.dune.execute_query.assert_called_once()
+        self.dune.login.assert_called_once()
+
+    def test_query_error_not_retried(self):
+        self.dune.get_results = MagicMock(side_effect=RuntimeError("syntax error"))
+        with self.assertRaises(RuntimeError):
+            self.dune.fetch(self.query)
+        self.dune.get_results.assert_called_once()
+
+        # When enabled, query errors lead to a new execution
+        self.dune.retry_policy.retry_query_errors = True
+        self.dune.get_results = MagicMock(
+            side_effect=[RuntimeError("timeout"), [{"x": 1}]]
+        )
+        self.dune.execute_query = MagicMock(side_effect=["job-2", "job-3"])
+        self.assertEqual(self.dune.fetch(self.query), [{"x": 1}])
+        self.assertEqual(self.dune.execute_query.call_count, 2)
+
+    def test_max_retries(self):
+        self.dune.get_results = MagicMock(side_effect=RequestsConnectionError())
+        with self.assertRaises(Exception) as err:
+            self.dune.fetch(self.query)
+        self.assertEqual(str(err.exception), "Maximum retries (3) exceeded")
+        self.assertEqual(self.dune.get_results.call_count, 3)
+        self.dune.execute_query.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import copy
+import json
+import pickle
+import sys
+import unittest
+from collections.abc import Mapping
+
+from src.duneapi.rows import make_row, row_schema, to_rows
+from src.duneapi.util import json_default
+
+
+class TestRows(unittest.TestCase):
+    def setUp(self) -> None:
+        self.records = [
+            {"number": i, "block_hash": f"0x{i}", "tx_fees": i / 2} for i in range(3)
+        ]
+
+    def test_mapping(self):
+        row = to_rows(self.records)[1]
+        self.assertIsInstance(row, Mapping)
+        self.assertEqual(row["block_hash"], "0x1")
+        self.assertEqual(row.block_hash, "0x1")
+        self.assertEqual(dict(row), self.records[1])
+        self.assertEqual(row, self.records[1])
+        self.assertEqual(self.records[1], row)
+        self.assertNotEqual(row, self.records[0])
+        self.assertEqual(list(row), ["number", "block_hash", "tx_fees"])
+        self.assertEqual(list(row.values()), [1, "0x1", 0.5])
+        self.assertEqual(len(row), 3)
+        self.assertIn("tx_fees", row)
+        self.assertNotIn("missing", row)
+        self.assertIsNone(row.get("missing"))
+        with self.assertRaises(KeyError):
+            row["missing"]
+        with self.assertRaises(AttributeError):
+            row.missing
+
+    def test_shared_schema(self):
+        rows = to_rows([*self.records, {"block_hash": "0x9", "number": 9}])
+        self.assertIs(rows[0]._schema, rows[2]._schema)
+        self.assertIs(rows[0]._schema, row_schema(("number", "block_hash", "tx_fees")))
+        self.assertEqual(rows[3], {"number": 9, "block_hash": "0x9"})
+
+    def test_compact(self):
+        row = to_rows(self.records)[0]
+        self.assertFalse(hasattr(row, "__dict__"))
+        self.assertLess(sys.getsizeof(row) * 2, sys.getsizeof(self.records[0]))
+        self.assertIs(type(row), type(make_row(tuple(self.records[0]), [0, 0, 0])))
+
+    def test_columns_named_like_tuple_methods(self):
+        row = make_row(("index", "count"), [7, 8])
+        self.assertEqual((row.index, row.count), (7, 8))
+        self.assertEqual(list(row.values()), [7, 8])
+
+    def test_json(self):
+        row = make_row(("number", "index", "count"), [1, 2, 3])
+        self.assertEqual(
+            json.dumps([row], default=json_default),
+            '[{"number": 1, "index": 2, "count": 3}]',
+        )
+        # Without a default rows are refused rather than encoded as column names.
+        with self.assertRaises(TypeError):
+            json.dumps(row)
+
+    def test_copy_and_pickle(self):
+        row = make_row(("a", "b"), [1, [2]])
+        self.assertEqual(pickle.loads(pickle.dumps(row)), row)
+        self.assertEqual(copy.deepcopy(row), {"a": 1, "b": [2]})
+        self.assertEqual(repr(row), "Row({'a': 1, 'b': [2]})")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import csv
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from src.duneapi.pool import QueryIdPool
+from src.duneapi.runner import Manifest, RunResult, run_manifest, summary
+from src.duneapi.types import Network
+
+
+class TestRunner(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.query_file = os.path.join(self.tmp.name, "blocks.sql")
+        with open(self.query_file, "w", encoding="utf-8") as query_file:
+            query_file.write("select * from ethereum.blocks")
+        self.manifest = {
+            "output_dir": os.path.join(self.tmp.name, "out"),
+            "format": "csv",
+            "max_concurrency": 2,
+            "queries": [
+                {"name": "blocks", "query_file": "blocks.sql"},
+                {
+                    "name": "gnosis",
+                    "query_file": "blocks.sql",
+                    "network": "gchain",
+                    "output": "gnosis.jsonl",
+                    "parameters": [{"key": "N", "type": "number", "value": "1"}],
+                },
+            ],
+        }
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_from_file(self):
+        filename = os.path.join(self.tmp.name, "manifest.json")
+        with open(filename, "w", encoding="utf-8") as manifest_file:
+            json.dump(self.manifest, manifest_file)
+        manifest = Manifest.from_file(filename)
+        self.assertEqual(manifest.max_concurrency, 2)
+        blocks, gnosis = manifest.entries
+        self.assertEqual(blocks.query.raw_sql, "select * from ethereum.blocks")
+        self.assertEqual(blocks.output_format, "csv")
+        self.assertTrue(blocks.output.endswith("blocks.csv"))
+        self.assertEqual(gnosis.output_format, "jsonl")
+        self.assertEqual(gnosis.query.network, Network.GCHAIN)
+        self.assertEqual(gnosis.query.parameters[0].value, 1)
+
+    def test_default_name(self):
+        os.mkdir(os.path.join(self.tmp.name, "queries"))
+        os.rename(self.query_file, os.path.join(self.tmp.name, "queries", "blocks.sql"))
+        self.manifest["queries"] = [{"query_file": "./queries/blocks.sql"}]
+        (entry,) = Manifest.from_dict(self.manifest, self.tmp.name).entries
+        self.assertEqual(entry.query.name, "blocks")
+        self.assertEqual(entry.output, os.path.join(self.tmp.name, "out", "blocks.csv"))
+
+    def test_unsupported_format(self):
+        self.manifest["queries"][0]["format"] = "xlsx"
+        with self.assertRaises(ValueError):
+            Manifest.from_dict(self.manifest, self.tmp.name)
+
+    def test_run_manifest(self):
+        manifest = Manifest.from_dict(self.manifest, self.tmp.name)
+        api = MagicMock()
+        records = [{"number": "1", "hash": "0x1"}, {"number": "2", "hash": "0x2"}]
+        api.fetch.side_effect = lambda query, query_pool: (
+            records if query.name == "blocks" else []
+        )
+        results = list(run_manifest(api, manifest, QueryIdPool([1, 2])))
+
+        self.assertEqual(sorted(r.rows for r in results), [0, 2])
+        with open(manifest.entries[0].output, "r", encoding="utf-8") as out_file:
+            self.assertEqual(list(csv.DictReader(out_file)), records)
+        self.assertTrue(os.path.exists(manifest.entries[1].output))
+        self.assertEqual(summary(results).split(",")[0], "2 of 2 queries succeeded")
+
+    def test_failures_are_reported(self):
+        manifest = Manifest.from_dict(self.manifest, self.tmp.name)
+        api = MagicMock()
+        api.fetch.side_effect = RuntimeError("Query failed")
+        results = list(run_manifest(api, manifest, QueryIdPool([1])))
+        self.assertTrue(all(r.error == "Query failed" for r in results))
+        self.assertIn("failed", str(results[0]))
+        self.assertIn("0 of 2", summary(results))
+        self.assertEqual(
+            str(RunResult("q", "q.csv", 3, 1.0)), "q: 3 rows in 1.0s -> q.csv"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+from src.duneapi.scheduler import ScheduledJob, Scheduler
+
+
+class TestScheduler(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.state_file = os.path.join(self.tmp.name, "state.json")
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_priority_and_concurrency_cap(self):
+        release = threading.Event()
+        jobs = [
+            ScheduledJob("low", 60, action=release.wait, priority=0),
+            ScheduledJob("high", 60, action=release.wait, priority=2),
+            ScheduledJob("mid", 60, action=release.wait, priority=1),
+        ]
+        scheduler = Scheduler(jobs, max_concurrency=2)
+        self.assertEqual(scheduler.tick(now=1000), ["high", "mid"])
+        # No capacity left, "low" remains due.
+        self.assertEqual(scheduler.tick(now=1001), [])
+        self.assertEqual(jobs[0].next_run, 0)
+        release.set()
+        scheduler.shutdown()
+
+    def test_skips_runs_still_in_flight(self):
+        release = threading.Event()
+        job = ScheduledJob("slow", 10, action=release.wait)
+        scheduler = Scheduler([job], max_concurrency=2)
+        self.assertEqual(scheduler.tick(now=1000), ["slow"])
+        self.assertEqual(scheduler.tick(now=1005), [])
+        # Due again, but the previous refresh has not finished.
+        self.assertEqual(scheduler.tick(now=1010), [])
+        self.assertEqual(job.next_run, 1020)
+        release.set()
+        scheduler._running["slow"].result()
+        self.assertEqual(scheduler.running(), [])
+        self.assertEqual(scheduler.tick(now=1020), ["slow"])
+        scheduler.shutdown()
+
+    def test_persists_state_across_restarts(self):
+        action = MagicMock()
+        scheduler = Scheduler(
+            [ScheduledJob("q", 60, action=action)], state_file=self.state_file
+        )
+        scheduler.tick()
+        scheduler.shutdown()
+        action.assert_called_once()
+
+        with open(self.state_file, "r", encoding="utf-8") as state_file:
+            state = json.load(state_file)
+        self.assertEqual(state["q"]["status"], "ok")
+
+        job = ScheduledJob("q", 60, action=action)
+        Scheduler([job], state_file=self.state_file)
+        self.assertEqual(job.next_run, state["q"]["last_started"] + 60)
+
+    def test_failed_refresh_is_recorded(self):
+        scheduler = Scheduler(
+            [ScheduledJob("q", 60, action=MagicMock(side_effect=RuntimeError))],
+            state_file=self.state_file,
+        )
+        scheduler.tick()
+        scheduler.shutdown()
+        self.assertEqual(scheduler.state["q"]["status"], "failed")
+
+    def test_from_config(self):
+        api = MagicMock()
+        api.execute_query.return_value = "job"
+        config = {
+            "max_concurrency": 3,
+            "queries": [
+                {
+                    "id": 7,
+                    "query_file": "example/query.sql",
+                    "network": "mainnet",
+                    "interval": 30,
+                    "priority": 5,
+                }
+            ],
+        }
+        scheduler = Scheduler.from_config(api, config)
+        self.assertEqual(scheduler.max_concurrency, 3)
+        job = scheduler.jobs["query-7"]
+        self.assertEqual((job.interval, job.priority), (30, 5))
+        job.action()
+        self.assertEqual(api.initiate_query.call_args[0][0].query_id, 7)
+        api.execute_query.assert_called_once()
+        # The refresh is in flight until the execution finished.
+        api.await_job.assert_called_once_with("job")
+        scheduler.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from src.duneapi.schema import ColumnType, ResultSchema, SchemaCache, infer_type
+from src.duneapi.types import DuneQuery, Network
+
+ADDRESS = "0xDE0B295669A9FD93D5F28D9EC85E40F4CB697BAE"
+
+
+def records() -> list[dict]:
+    return [
+        {
+            "number": i,
+            "supply": str(2**255 + i),
+            "fee": i / 2,
+            "amount": f"{i}.25",
+            "time": f"2022-03-10T23:50:{i:02}+00:00",
+            "flag": i % 2 == 0,
+            "address": ADDRESS,
+            "symbol": "WETH",
+            "empty": None,
+        }
+        for i in range(10)
+    ]
+
+
+class TestSchema(unittest.TestCase):
+    def test_infer_type(self):
+        self.assertEqual(infer_type([1, None, 2]), ColumnType.INT)
+        self.assertEqual(infer_type([1, 2**64]), ColumnType.BIG_INT)
+        self.assertEqual(infer_type(["1", "-2"]), ColumnType.BIG_INT)
+        self.assertEqual(infer_type([1, 2.5]), ColumnType.FLOAT)
+        self.assertEqual(infer_type(["1", "2.5", 3]), ColumnType.DECIMAL)
+        self.assertEqual(infer_type(["2022-03-10"]), ColumnType.TIMESTAMP)
+        self.assertEqual(infer_type(["2022-13-10"]), ColumnType.STRING)
+        self.assertEqual(infer_type([True, False]), ColumnType.BOOL)
+        self.assertEqual(infer_type([True, 1]), ColumnType.STRING)
+        self.assertEqual(infer_type([ADDRESS, ADDRESS[:-1]]), ColumnType.STRING)
+        self.assertEqual(infer_type([None]), ColumnType.STRING)
+
+    def test_infer_and_convert(self):
+        schema = ResultSchema.infer(records(), sample_size=3)
+        self.assertEqual(
+            schema.to_dict(),
+            {
+                "number": "int",
+                "supply": "bigint",
+                "fee": "float",
+                "amount": "decimal",
+                "time": "timestamp",
+                "flag": "bool",
+                "address": "address",
+                "symbol": "string",
+                "empty": "string",
+            },
+        )
+        self.assertEqual(ResultSchema.from_dict(schema.to_dict()), schema)
+
+        converted = schema.convert(records())[3]
+        self.assertEqual(converted["supply"], 2**255 + 3)
+        self.assertEqual(converted["fee"], 1.5)
+        self.assertEqual(converted["amount"], Decimal("3.25"))
+        self.assertEqual(
+            converted["time"], datetime(2022, 3, 10, 23, 50, 3, tzinfo=timezone.utc)
+        )
+        self.assertEqual(converted["address"], ADDRESS.lower())
+        self.assertIsNone(converted["empty"])
+
+    def test_widening(self):
+        records = [{"number": 1}, {"number": "x"}]
+        schema = ResultSchema({"number": ColumnType.INT})
+        self.assertEqual(schema.widen(records).types["number"], ColumnType.STRING)
+        self.assertEqual(schema.convert(records), records)
+
+    def test_values_outside_sample(self):
+        data = [{"fee": i, "flag": True} for i in range(200)]
+        records = [*data, {"fee": 0.75, "flag": "false"}]
+        schema = ResultSchema.infer(records)
+        self.assertEqual(schema.types["fee"], ColumnType.INT)
+        converted = schema.convert(records)
+        self.assertEqual(
+            schema.widen(records).types,
+            {"fee": ColumnType.FLOAT, "flag": ColumnType.STRING},
+        )
+        self.assertEqual(converted[-1], {"fee": 0.75, "flag": "false"})
+        self.assertEqual(type(converted[0]["fee"]), float)
+        # Records are left unchanged
+        self.assertEqual(records[-1], {"fee": 0.75, "flag": "false"})
+        # Numeric strings may be converted to floats (by override).
+        float_schema = ResultSchema({"fee": ColumnType.FLOAT})
+        self.assertEqual(float_schema.convert([{"fee": "0.5"}]), [{"fee": 0.5}])
+
+    def test_leading_zeros_and_fractional_seconds(self):
+        self.assertEqual(infer_type(["00501", "12"]), ColumnType.STRING)
+        self.assertEqual(infer_type(["0", "-12"]), ColumnType.BIG_INT)
+        self.assertEqual(infer_type(["01.5"]), ColumnType.STRING)
+        schema = ResultSchema.infer([{"time": "2022-03-10T23:50:16.12+00:00"}])
+        self.assertEqual(
+            schema.convert([{"time": "2022-03-10T23:50:16.12Z"}])[0]["time"],
+            datetime(2022, 3, 10, 23, 50, 16, 120000, tzinfo=timezone.utc),
+        )
+
+    def test_cache(self):
+        query = DuneQuery("Query", "", "select 1", Network.MAINNET, [], 1)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "schemas.json")
+            cache = SchemaCache(path)
+            converted = cache.convert(query, records())
+            self.assertEqual(converted[1]["amount"], Decimal("1.25"))
+            cache.save()
+
+            # Cached schemas are reused (rather than inferred from these records).
+            cache = SchemaCache(path)
+            overrides = {"amount": ColumnType.FLOAT}
+            converted = cache.convert(query, [{"amount": "1", "fee": "2"}], overrides)
+            self.assertEqual(converted, [{"amount": 1.0, "fee": 2.0}])
+            self.assertEqual(
+                cache.schema(query, []).types["amount"], ColumnType.DECIMAL
+            )
+
+            # Schemas are widened to accept (and cached as such).
+            cache.convert(query, [{"amount": "x"}])
+            self.assertEqual(cache.schema(query, []).types["amount"], ColumnType.STRING)
+
+            cache.forget(query)
+            self.assertEqual(
+                cache.schema(query, [{"number": 1}]).types, {"number": ColumnType.INT}
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
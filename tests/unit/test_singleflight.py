@@ -0,0 +1,71 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+from src.duneapi.api import DuneAPI
+from src.duneapi.singleflight import SingleFlight
+from src.duneapi.types import DuneQuery, Network
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_coalesces_concurrent_calls(self):
+        flight = SingleFlight()
+        calls = []
+        release = threading.Event()
+
+        def action():
+            calls.append(1)
+            release.wait()
+            return [1, 2, 3]
+
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            futures = [pool.submit(flight.do, "key", action) for _ in range(5)]
+            time.sleep(0.05)
+            release.set()
+            results = [f.result() for f in futures]
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(r is results[0] for r in results))
+        # Once completed (without grace period) the next call executes again.
+        flight.do("key", action)
+        self.assertEqual(len(calls), 2)
+
+    def test_grace_period(self):
+        flight = SingleFlight(grace_period=0.05)
+        action = MagicMock(return_value=1)
+        flight.do("key", action)
+        flight.do("key", action)
+        flight.do("other", action)
+        self.assertEqual(action.call_count, 2)
+        time.sleep(0.06)
+        flight.do("key", action)
+        self.assertEqual(action.call_count, 3)
+
+    def test_failures_are_not_cached(self):
+        flight = SingleFlight(grace_period=10)
+        action = MagicMock(side_effect=[RuntimeError("fail"), 1])
+        with self.assertRaises(RuntimeError):
+            flight.do("key", action)
+        self.assertEqual(flight.do("key", action), 1)
+
+
+class TestCoalescedFetch(unittest.TestCase):
+    def test_identical_queries_share_execution(self):
+        dune = DuneAPI("user", "password", single_flight=SingleFlight(grace_period=10))
+        dune.initiate_query = MagicMock(return_value=True)
+        dune.execute_and_await_results = MagicMock(return_value=[{"x": 1}])
+        query = DuneQuery("A", "", "select 1", Network.MAINNET, [], 1)
+        renamed = DuneQuery("B", "other", "select 1", Network.MAINNET, [], 2)
+        different = DuneQuery("A", "", "select 2", Network.MAINNET, [], 1)
+
+        self.assertEqual(dune.fetch(query), [{"x": 1}])
+        self.assertEqual(dune.fetch(renamed), [{"x": 1}])
+        dune.execute_and_await_results.assert_called_once()
+        dune.fetch(different)
+        self.assertEqual(dune.execute_and_await_results.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import json
+import unittest
+
+from src.duneapi.rows import to_rows
+from src.duneapi.strings import StringPool
+
+
+def records(rows: int) -> list[dict]:
+    # Decoding (rather than literals) yields distinct but equal strings.
+    return json.loads(
+        json.dumps(
+            [
+                {"symbol": ["WETH", "USDC"][i % 2], "hash": f"0x{i:064x}", "n": i}
+                for i in range(rows)
+            ]
+        )
+    )
+
+
+class TestStringPool(unittest.TestCase):
+    def test_share_low_cardinality(self):
+        strings = StringPool(min_values=10)
+        data = records(100)
+        self.assertIsNot(data[0]["symbol"], data[2]["symbol"])
+        for record in data:
+            strings.share_record(record)
+
+        self.assertIs(data[0]["symbol"], data[2]["symbol"])
+        self.assertEqual([r["symbol"] for r in data[:3]], ["WETH", "USDC", "WETH"])
+        # Distinct hashes are not pooled beyond min_values.
+        self.assertFalse(strings.columns["hash"].enabled)
+        self.assertEqual(strings.columns["hash"].values, {})
+        self.assertNotIn("n", strings.columns)
+
+        self.assertEqual(strings.columns["symbol"].shared, 98)
+        self.assertEqual(strings.saved_bytes, 98 * (len("WETH") + 49))
+        self.assertIn("symbol (2 distinct of 100)", strings.report())
+        self.assertNotIn("hash", strings.report())
+
+    def test_report_without_sharing(self):
+        strings = StringPool()
+        self.assertEqual(strings.share("n", 1), 1)
+        self.assertEqual(strings.report(), "No repeated strings shared")
+
+    def test_to_rows(self):
+        strings = StringPool()
+        rows = to_rows(records(10), strings)
+        self.assertIs(rows[1]["symbol"], rows[3].symbol)
+        self.assertEqual(strings.columns["symbol"].shared, 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from src.duneapi.api import DuneAPI
+from src.duneapi.sync import IncrementalSync, parse_watermark
+from src.duneapi.types import DuneQuery, Network, ParameterType, QueryParameter
+
+
+class TestIncrementalSync(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "store.db")
+        self.dune = DuneAPI("user", "password")
+        self.query = DuneQuery(
+            name="Blocks",
+            description="",
+            raw_sql="select number, time from blocks where number >= '{{MinBlock}}'",
+            network=Network.MAINNET,
+            parameters=[
+                QueryParameter.number_type("MinBlock", 10),
+                QueryParameter.text_type("Other", "x"),
+            ],
+            query_id=1,
+        )
+        self.rows = [
+            {"number": n, "time": f"2022-03-10T00:00:{n:02d}+00:00"}
+            for n in range(10, 20)
+        ]
+
+        def fetch(query):
+            min_block = query.parameters[0].value
+            return [r for r in self.rows if r["number"] >= min_block]
+
+        self.dune.fetch = MagicMock(side_effect=fetch)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_parse_watermark(self):
+        self.assertEqual(parse_watermark("12", ParameterType.NUMBER), 12)
+        self.assertEqual(parse_watermark("1.5", ParameterType.NUMBER), 1.5)
+        self.assertEqual(
+            parse_watermark("2022-03-10T23:50:16+00:00", ParameterType.DATE),
+            datetime(2022, 3, 10, 23, 50, 16),
+        )
+        with self.assertRaises(ValueError):
+            parse_watermark("x", ParameterType.TEXT)
+
+    def test_incremental_sync(self):
+        store = IncrementalSync(self.dune, self.path)
+        self.assertEqual(store.sync(self.query, "number", "MinBlock"), 10)
+        self.assertEqual(store.watermark(self.query, "MinBlock"), "19")
+
+        # Nothing new, although the inclusive filter re-delivers the last row.
+        self.assertEqual(store.sync(self.query, "number", "MinBlock"), 0)
+        self.assertEqual(self.dune.fetch.call_args[0][0].parameters[0].value, 19)
+
+        self.rows.append({"number": 20, "time": "2022-03-10T00:00:20+00:00"})
+        self.assertEqual(store.sync(self.query, "number", "MinBlock"), 1)
+        store.close()
+
+        # Progress survives re-opening the store.
+        reopened = IncrementalSync(self.dune, self.path)
+        self.assertEqual(reopened.watermark(self.query, "MinBlock"), "20")
+        self.assertEqual(reopened.records(self.query, "MinBlock"), self.rows)
+        reopened.close()
+
+    def test_parameter_sets_are_independent(self):
+        store = IncrementalSync(self.dune, self.path)
+        store.sync(self.query, "number", "MinBlock")
+        other = DuneQuery(
+            **{
+                **self.query.__dict__,
+                "parameters": [
+                    QueryParameter.number_type("MinBlock", 10),
+                    QueryParameter.text_type("Other", "y"),
+                ],
+            }
+        )
+        self.assertIsNone(store.watermark(other, "MinBlock"))
+        self.assertEqual(store.records(other, "MinBlock"), [])
+        store.close()
+
+    def test_failed_fetch_keeps_watermark(self):
+        store = IncrementalSync(self.dune, self.path)
+        store.sync(self.query, "number", "MinBlock")
+        self.dune.fetch = MagicMock(side_effect=RuntimeError("fail"))
+        with self.assertRaises(RuntimeError):
+            store.sync(self.query, "number", "MinBlock")
+        self.assertEqual(store.watermark(self.query, "MinBlock"), "19")
+        store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from requests import ConnectionError as RequestsConnectionError, Response
+
+from src.duneapi.api import DuneAPI
+from src.duneapi.throttle import (
+    CircuitBreaker,
+    CircuitOpenError,
+    FileTokenBucket,
+    RateLimiter,
+    TokenBucket,
+)
+from src.duneapi.types import Post
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_and_refill(self):
+        bucket = TokenBucket(rate=100, capacity=2)
+        self.assertEqual(bucket.try_acquire(), 0)
+        self.assertEqual(bucket.try_acquire(), 0)
+        self.assertGreater(bucket.try_acquire(), 0)
+
+        start = time.monotonic()
+        bucket.acquire()
+        self.assertGreater(time.monotonic() - start, 0.005)
+
+        with self.assertRaises(ValueError):
+            bucket.acquire(3)
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=0)
+
+    def test_file_bucket_is_shared(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "bucket.json")
+            first = FileTokenBucket(path, rate=0.001, capacity=2)
+            second = FileTokenBucket(path, rate=0.001, capacity=2)
+            self.assertEqual(first.try_acquire(), 0)
+            self.assertEqual(second.try_acquire(), 0)
+            self.assertGreater(first.try_acquire(), 0)
+            self.assertGreater(second.try_acquire(), 0)
+
+    def test_rate_limiter(self):
+        default, execute = MagicMock(), MagicMock()
+        limiter = RateLimiter(default=default, operations={"ExecuteQuery": execute})
+        limiter.acquire("ExecuteQuery")
+        limiter.acquire("UpsertQuery")
+        execute.acquire.assert_called_once()
+        default.acquire.assert_called_once()
+        RateLimiter().acquire("UpsertQuery")
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_open_and_recover(self):
+        breaker = CircuitBreaker(failure_threshold=2, cooldown=0.01)
+        breaker.record(429)
+        breaker.before_request()
+        breaker.record(503)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_request()
+
+        time.sleep(0.02)
+        breaker.before_request()
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        # Only a single trial request is let through.
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_request()
+        breaker.record(200)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_failed_trial_reopens(self):
+        breaker = CircuitBreaker(failure_threshold=1, cooldown=0.01)
+        breaker.record_failure()
+        time.sleep(0.02)
+        breaker.before_request()
+        breaker.record(500)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+
+class TestThrottledRequests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.breaker = CircuitBreaker(failure_threshold=2, cooldown=60)
+        self.limiter = RateLimiter(default=MagicMock())
+        self.dune = DuneAPI(
+            "user",
+            "password",
+            rate_limiter=self.limiter,
+            circuit_breaker=self.breaker,
+        )
+        self.dune.refresh_auth_token = MagicMock(return_value="token")
+        self.post = Post(data={"operationName": "ExecuteQuery"}, key_map={})
+
+    def test_post_dune_request(self):
+        throttled = Response()
+        throttled.status_code = 429
+        throttled.json = MagicMock(return_value={})
+        self.dune.session.post = MagicMock(
+            side_effect=[throttled, RequestsConnectionError()]
+        )
+        self.dune.post_dune_request(self.post)
+        with self.assertRaises(RequestsConnectionError):
+            self.dune.post_dune_request(self.post)
+        self.assertEqual(self.limiter.default.acquire.call_count, 2)
+
+        with self.assertRaises(CircuitOpenError):
+            self.dune.post_dune_request(self.post)
+        self.assertEqual(self.dune.session.post.call_count, 2)
+
+    def test_failed_token_refresh_resolves_trial(self):
+        self.breaker.cooldown = 0.01
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        time.sleep(0.02)
+        unavailable = Response()
+        unavailable.status_code = 503
+        self.dune.refresh_auth_token = MagicMock(side_effect=SystemExit(unavailable))
+        with self.assertRaises(SystemExit):
+            self.dune.post_dune_request(self.post)
+        # The failed trial re-opens the circuit (rather than staying half-open).
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.dune.post_dune_request(self.post)
+
+        time.sleep(0.02)
+        # Authentication (and local) errors end the trial without counting.
+        unauthorized = Response()
+        unauthorized.status_code = 401
+        self.dune.refresh_auth_token = MagicMock(side_effect=SystemExit(unauthorized))
+        with self.assertRaises(SystemExit):
+            self.dune.post_dune_request(self.post)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(self.breaker._failures, 3)
+
+        self.dune.refresh_auth_token = MagicMock(return_value="token")
+        ok = Response()
+        ok.status_code = 200
+        self.dune.session.post = MagicMock(return_value=ok)
+        self.dune.post_dune_request(self.post)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+
+if __name__ == "__main__":
+    unittest.main()
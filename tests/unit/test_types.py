@@ -2,7 +2,13 @@ import datetime
 import json
 import unittest
 
-from src.duneapi.types import Network, MetaData, QueryResults, QueryParameter
+from src.duneapi.types import (
+    Network,
+    MetaData,
+    QueryResults,
+    QueryParameter,
+    DuneQuery,
+)
 
 
 class TestNetworkEnum(unittest.TestCase):
@@ -102,5 +108,113 @@ class TestQueryParameter(unittest.TestCase):
         )
 
 
+class TestDuneQuery(unittest.TestCase):
+    def setUp(self) -> None:
+        self.query = DuneQuery(
+            name="Name",
+            description="",
+            raw_sql="select 1",
+            network=Network.MAINNET,
+            parameters=[
+                QueryParameter.number_type("A", 1),
+                QueryParameter.text_type("B", "x"),
+            ],
+            query_id=1,
+        )
+
+    def test_fingerprint(self):
+        same_content = DuneQuery(
+            name="Other Name",
+            description="Other description",
+            raw_sql="select 1",
+            network=Network.MAINNET,
+            parameters=list(reversed(self.query.parameters)),
+            query_id=2,
+        )
+        self.assertEqual(self.query.fingerprint(), same_content.fingerprint())
+
+        same_content.network = Network.POLYGON
+        self.assertNotEqual(self.query.fingerprint(), same_content.fingerprint())
+
+    def test_batched_posts(self):
+        other = DuneQuery(
+            name="Other",
+            description="",
+            raw_sql="select 2",
+            network=Network.GCHAIN,
+            parameters=[],
+            query_id=2,
+        )
+        upsert = DuneQuery.upsert_queries_post([self.query, other])
+        self.assertEqual(upsert.key_map.keys(), {"q0", "q1"})
+        self.assertEqual(
+            upsert.key_map["q0"],
+            self.query.upsert_query_post().key_map["insert_queries_one"],
+        )
+        variables = upsert.data["variables"]
+        self.assertEqual(variables["object0"]["query"], "select 1")
+        self.assertEqual(variables["object1"]["query"], "select 2")
+        self.assertEqual(upsert.data["query"].count("fragment Query on queries"), 1)
+
+        execute = DuneQuery.execute_queries_post([self.query, other])
+        self.assertEqual(execute.key_map, {"q0": {"job_id"}, "q1": {"job_id"}})
+        self.assertEqual(execute.data["variables"]["query_id1"], 2)
+        self.assertIn(
+            "q1: execute_query(query_id: $query_id1, parameters: $parameters1)",
+            execute.data["query"],
+        )
+        single = self.query.execute_query_post()
+        self.assertEqual(single.key_map, {"execute_query": {"job_id"}})
+        self.assertEqual(
+            single.data["variables"],
+            {"query_id": 1, "parameters": [p.to_dict() for p in self.query.parameters]},
+        )
+
+    def test_projection_and_limit(self):
+        self.query.raw_sql = "select * from blocks -- all blocks;\n;\n"
+        query = self.query.select(["number", 'odd"name']).where("number > 5").limit(3)
+        self.assertEqual(
+            query.raw_sql,
+            "select * from (\n"
+            "select * from (\n"
+            'select "number", "odd""name" from (\n'
+            "select * from blocks -- all blocks;\n"
+            ") as subquery\n"
+            ") as subquery\n"
+            "where number > 5\n"
+            ") as subquery\n"
+            "limit 3",
+        )
+        # The original query is left untouched
+        self.assertEqual(self.query.raw_sql, "select * from blocks -- all blocks;\n;\n")
+        self.assertEqual(query.parameters, self.query.parameters)
+        with self.assertRaises(ValueError):
+            self.query.select([])
+        with self.assertRaises(ValueError):
+            self.query.limit(-1)
+
+    def test_partition(self):
+        self.query.parameters.append(QueryParameter.number_type("C", 5))
+        partitions = self.query.partition("A", "C", 2)
+        self.assertEqual(
+            [[p.value for p in q.parameters] for q in partitions],
+            [[1, "x", 2], [3, "x", 5]],
+        )
+        # Integer partitions are disjoint (for inclusive between queries)
+        partitions = self.query.partition("A", "C", 10)
+        self.assertEqual(
+            [(q.parameters[0].value, q.parameters[2].value) for q in partitions],
+            [(1, 1), (2, 2), (3, 3), (4, 4), (5, 5)],
+        )
+        self.query.parameters[2] = QueryParameter.number_type("C", 5.0)
+        partitions = self.query.partition("A", "C", 2)
+        self.assertEqual(
+            [(q.parameters[0].value, q.parameters[2].value) for q in partitions],
+            [(1, 3.0), (3.0, 5.0)],
+        )
+        with self.assertRaises(ValueError):
+            self.query.partition("A", "B", 2)
+
+
 if __name__ == "__main__":
     unittest.main()
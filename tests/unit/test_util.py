@@ -1,7 +1,23 @@
+import base64
+import json
+import os
+import stat
+import tempfile
 import unittest
 from datetime import datetime
+from unittest.mock import patch
 
-from src.duneapi.util import datetime_parser, open_query, duplicates, DUNE_DATE_FORMAT
+from src.duneapi.util import (
+    datetime_parser,
+    open_query,
+    duplicates,
+    write_atomic,
+    split_range,
+    sync_files,
+    token_expiry,
+    topological_waves,
+    DUNE_DATE_FORMAT,
+)
 
 
 class TestUtilities(unittest.TestCase):
@@ -33,6 +49,78 @@ class TestUtilities(unittest.TestCase):
         with self.assertRaises(TypeError) as err:
             duplicates([{"x": 1, "y": 2}])
 
+    def test_split_range(self):
+        self.assertEqual(split_range(0, 10, 3), [(0, 3), (3, 6), (6, 10)])
+        self.assertEqual(split_range(0, 2, 5), [(0, 1), (1, 2)])
+        self.assertEqual(split_range(0.0, 1.0, 2), [(0.0, 0.5), (0.5, 1.0)])
+        self.assertEqual(
+            split_range(datetime(2022, 1, 1), datetime(2022, 1, 3), 2),
+            [
+                (datetime(2022, 1, 1), datetime(2022, 1, 2)),
+                (datetime(2022, 1, 2), datetime(2022, 1, 3)),
+            ],
+        )
+        with self.assertRaises(ValueError):
+            split_range(1, 1, 2)
+        with self.assertRaises(ValueError):
+            split_range(0, 1, 0)
+
+    def test_write_atomic(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "nested", "file.txt")
+            write_atomic(path, "hello")
+            write_atomic(path, "world", mode=0o600)
+            self.assertEqual(open_query(path), "world")
+            self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o600)
+            self.assertEqual(os.listdir(os.path.dirname(path)), ["file.txt"])
+
+    def test_write_atomic_default_mode(self):
+        umask = os.umask(0o022)
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = os.path.join(tmp_dir, "file.txt")
+                # The process umask is never changed (other threads create files).
+                with patch("os.umask", side_effect=AssertionError):
+                    write_atomic(path, "hello")
+                self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o644)
+                # Existing permissions are kept
+                os.chmod(path, 0o640)
+                write_atomic(path, "world")
+                self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o640)
+        finally:
+            os.umask(umask)
+
+    def test_token_expiry(self):
+        payload = base64.urlsafe_b64encode(json.dumps({"exp": 1650000000}).encode())
+        token = f"header.{payload.decode().rstrip('=')}.signature"
+        self.assertEqual(token_expiry(token), 1650000000.0)
+        self.assertIsNone(token_expiry("token"))
+        self.assertIsNone(token_expiry("header.e30.signature"))
+        self.assertIsNone(token_expiry("header.!.signature"))
+
+    def test_topological_waves(self):
+        self.assertEqual(
+            topological_waves({0: {2}, 1: set(), 2: {1}, 3: set()}),
+            [[1, 3], [2], [0]],
+        )
+        self.assertEqual(topological_waves({}), [])
+        with self.assertRaises(ValueError):
+            topological_waves({0: {1}, 1: {0}, 2: set()})
+
+    def test_sync_files(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            a, b = os.path.join(tmp_dir, "a.sql"), os.path.join(tmp_dir, "b.sql")
+            self.assertEqual(sync_files(tmp_dir, {"a.sql": "1", "b.sql": "2"}), [a, b])
+            # Unchanged content is not rewritten
+            self.assertEqual(sync_files(tmp_dir, {"a.sql": "1", "b.sql": "2"}), [])
+            self.assertEqual(sync_files(tmp_dir, {"a.sql": "1", "b.sql": "3"}), [b])
+            # Files of previous syncs that are no longer wanted are removed
+            self.assertEqual(sync_files(tmp_dir, {"b.sql": "3"}), [])
+            self.assertFalse(os.path.exists(a))
+            os.remove(b)
+            self.assertEqual(sync_files(tmp_dir, {"b.sql": "3"}), [b])
+            self.assertEqual(open_query(b), "3")
+
 
 if __name__ == "__main__":
     unittest.main()